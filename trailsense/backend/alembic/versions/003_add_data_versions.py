@@ -0,0 +1,28 @@
+"""add data versions
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'data_versions',
+        sa.Column('name', sa.String(), primary_key=True),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+    op.execute("INSERT INTO data_versions (name, version) VALUES ('trails', 1)")
+
+
+def downgrade() -> None:
+    op.drop_table('data_versions')
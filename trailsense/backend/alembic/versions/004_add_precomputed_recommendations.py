@@ -0,0 +1,36 @@
+"""add precomputed recommendations
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'precomputed_recommendations',
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('forecast_date', sa.Date(), primary_key=True),
+        sa.Column('profile_fingerprint', sa.String(), nullable=False),
+        sa.Column('catalog_version', sa.BigInteger(), nullable=False),
+        sa.Column('weather_version', sa.BigInteger(), nullable=False),
+        sa.Column('max_drive_time_minutes', sa.Integer(), nullable=False),
+        sa.Column('trail_rows', sa.LargeBinary(), nullable=False),
+        sa.Column('confidence', sa.LargeBinary(), nullable=False),
+        sa.Column('computed_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+    op.execute("INSERT INTO data_versions (name, version) VALUES ('weather', 1) ON CONFLICT DO NOTHING")
+
+
+def downgrade() -> None:
+    op.drop_table('precomputed_recommendations')
+    op.execute("DELETE FROM data_versions WHERE name = 'weather'")
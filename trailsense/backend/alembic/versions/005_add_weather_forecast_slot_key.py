@@ -0,0 +1,38 @@
+"""unique forecast slot per trail
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep only the newest row for each trail/location/date/hour, and drop past dates
+    op.execute("""
+        DELETE FROM weather_forecasts w
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY trail_id, location_type, forecast_date, forecast_hour
+                ORDER BY fetched_at DESC NULLS LAST, id DESC
+            ) AS rank
+            FROM weather_forecasts
+        ) ranked
+        WHERE w.id = ranked.id AND ranked.rank > 1
+    """)
+    op.execute("DELETE FROM weather_forecasts WHERE forecast_date < CURRENT_DATE")
+    op.create_unique_constraint(
+        'uq_weather_forecasts_slot',
+        'weather_forecasts',
+        ['trail_id', 'location_type', 'forecast_date', 'forecast_hour']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_weather_forecasts_slot', 'weather_forecasts', type_='unique')
@@ -0,0 +1,31 @@
+"""add nws gridpoints
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'nws_gridpoints',
+        sa.Column('lat', sa.DECIMAL(7, 4), primary_key=True),
+        sa.Column('lon', sa.DECIMAL(8, 4), primary_key=True),
+        sa.Column('grid_id', sa.String(), nullable=False),
+        sa.Column('grid_x', sa.Integer(), nullable=False),
+        sa.Column('grid_y', sa.Integer(), nullable=False),
+        sa.Column('forecast_hourly_url', sa.String(), nullable=False),
+        sa.Column('resolved_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('nws_gridpoints')
@@ -0,0 +1,28 @@
+"""add forecast validators to nws gridpoints
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('nws_gridpoints', sa.Column('etag', sa.String()))
+    op.add_column('nws_gridpoints', sa.Column('last_modified', sa.String()))
+    op.add_column('nws_gridpoints', sa.Column('checked_at', sa.TIMESTAMP()))
+    op.add_column('nws_gridpoints', sa.Column('changed_at', sa.TIMESTAMP()))
+
+
+def downgrade() -> None:
+    op.drop_column('nws_gridpoints', 'changed_at')
+    op.drop_column('nws_gridpoints', 'checked_at')
+    op.drop_column('nws_gridpoints', 'last_modified')
+    op.drop_column('nws_gridpoints', 'etag')
@@ -0,0 +1,35 @@
+"""add packed forecast series
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'forecast_series',
+        sa.Column('trail_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('trails.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('temperature', sa.LargeBinary(), nullable=False),
+        sa.Column('precipitation', sa.LargeBinary(), nullable=False),
+        sa.Column('wind_speed', sa.LargeBinary(), nullable=False),
+        sa.Column('wind_gust', sa.LargeBinary(), nullable=False),
+        sa.Column('sky_cover', sa.LargeBinary(), nullable=False),
+        sa.Column('summary_codes', sa.LargeBinary(), nullable=False),
+        sa.Column('summaries', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('fetched_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('forecast_series')
@@ -0,0 +1,43 @@
+"""drop stored summit forecast rows
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Summit forecasts are derived from the trailhead rows on read
+    op.execute("DELETE FROM weather_forecasts WHERE location_type = 'summit'")
+
+
+def downgrade() -> None:
+    # Rebuild summit rows with the lapse rate and wind multipliers readers apply
+    op.execute("""
+        INSERT INTO weather_forecasts (
+            id, trail_id, location_type, forecast_date, forecast_hour,
+            temperature_f, precipitation_prob, precipitation_type,
+            wind_speed_mph, wind_gust_mph, sky_cover, weather_summary, fetched_at
+        )
+        SELECT
+            gen_random_uuid(), w.trail_id, 'summit', w.forecast_date, w.forecast_hour,
+            w.temperature_f - trunc((t.highest_point_elevation - t.trailhead_elevation) / 1000.0 * 3.5)::int,
+            w.precipitation_prob, w.precipitation_type,
+            trunc(w.wind_speed_mph * 1.3)::int,
+            trunc(trunc(w.wind_speed_mph * 1.3) * 1.5)::int,
+            w.sky_cover, w.weather_summary, w.fetched_at
+        FROM weather_forecasts w
+        JOIN trails t ON t.id = w.trail_id
+        WHERE w.location_type = 'trailhead'
+          AND t.highest_point_elevation IS NOT NULL
+          AND t.trailhead_elevation IS NOT NULL
+          AND t.highest_point_elevation <> 0
+          AND t.trailhead_elevation <> 0
+    """)
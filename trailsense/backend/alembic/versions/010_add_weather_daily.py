@@ -0,0 +1,61 @@
+"""add daily weather aggregates
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'weather_daily',
+        sa.Column('trail_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('trails.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('forecast_date', sa.Date(), primary_key=True),
+        sa.Column('temperature_min', sa.Integer()),
+        sa.Column('temperature_max', sa.Integer()),
+        sa.Column('precipitation_max', sa.Integer()),
+        sa.Column('wind_speed_max', sa.Integer()),
+        sa.Column('wind_gust_max', sa.Integer()),
+        sa.Column('has_thunder', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('weather_summary', sa.String()),
+        sa.Column('hours', sa.Integer(), nullable=False),
+        sa.Column('fetched_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+    op.create_index('idx_weather_daily_date', 'weather_daily', ['forecast_date'])
+
+    # Backfill from stored hourly rows; series storage fills in on the next refresh
+    op.execute("""
+        INSERT INTO weather_daily (
+            trail_id, forecast_date, temperature_min, temperature_max, precipitation_max,
+            wind_speed_max, wind_gust_max, has_thunder, weather_summary, hours, fetched_at
+        )
+        SELECT
+            trail_id,
+            forecast_date,
+            min(temperature_f),
+            max(temperature_f),
+            max(precipitation_prob),
+            max(wind_speed_mph),
+            max(wind_gust_mph),
+            coalesce(bool_or(weather_summary ILIKE '%thunder%'), false),
+            (array_agg(weather_summary ORDER BY coalesce(weather_summary ILIKE '%thunder%', false) DESC, forecast_hour))[1],
+            count(*),
+            max(fetched_at)
+        FROM weather_forecasts
+        WHERE location_type = 'trailhead' AND forecast_date >= CURRENT_DATE
+        GROUP BY trail_id, forecast_date
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_weather_daily_date', table_name='weather_daily')
+    op.drop_table('weather_daily')
@@ -0,0 +1,33 @@
+"""add llm parse cache
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'llm_parse_cache',
+        sa.Column('cache_key', sa.String(64), primary_key=True),
+        sa.Column('model', sa.String(), nullable=False),
+        sa.Column('prompt_version', sa.String(), nullable=False),
+        sa.Column('parsed', postgresql.JSONB(), nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP(), server_default=sa.text('now()')),
+        sa.Column('last_used_at', sa.TIMESTAMP(), server_default=sa.text('now()'))
+    )
+    op.create_index('idx_llm_parse_cache_last_used', 'llm_parse_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_llm_parse_cache_last_used', table_name='llm_parse_cache')
+    op.drop_table('llm_parse_cache')
@@ -0,0 +1,27 @@
+"""add conditions version to precomputed recommendations
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'precomputed_recommendations',
+        sa.Column('conditions_version', sa.BigInteger(), nullable=False, server_default='0')
+    )
+    op.execute("INSERT INTO data_versions (name, version) VALUES ('conditions', 1) ON CONFLICT DO NOTHING")
+
+
+def downgrade() -> None:
+    op.drop_column('precomputed_recommendations', 'conditions_version')
+    op.execute("DELETE FROM data_versions WHERE name = 'conditions'")
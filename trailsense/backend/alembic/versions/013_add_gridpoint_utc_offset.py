@@ -0,0 +1,22 @@
+"""add forecast utc offset to nws gridpoints
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('nws_gridpoints', sa.Column('utc_offset_minutes', sa.Integer()))
+
+
+def downgrade() -> None:
+    op.drop_column('nws_gridpoints', 'utc_offset_minutes')
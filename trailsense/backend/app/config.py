@@ -7,6 +7,31 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080
     groq_api_key: str = ""
+    groq_api_url: str = "https://api.groq.com/openai/v1/chat/completions"
+    llm_model: str = "llama-3.1-70b-versatile"
+    llm_concurrency: int = 8
+    llm_requests_per_minute: int = 30
+    llm_tokens_per_minute: int = 6000
+    llm_max_retries: int = 3
+    # Reports packed into one extraction request; 1 sends each report on its own
+    llm_batch_size: int = 8
+    # Parsed reports kept in llm_parse_cache; least recently used beyond this are evicted
+    llm_parse_cache_size: int = 100_000
+    catalog_poll_seconds: int = 30
+    recommendation_cache_size: int = 1024
+    recommendation_cache_ttl_seconds: int = 900
+    summit_cache_size: int = 4096
+    nws_api_url: str = "https://api.weather.gov"
+    nws_user_agent: str = "TrailSense/1.0 (contact@example.com)"
+    nws_requests_per_second: float = 5.0
+    nws_max_retries: int = 3
+    weather_refresh_enabled: bool = False
+    weather_refresh_interval_minutes: int = 60
+    weather_refresh_concurrency: int = 8
+    # Forecasts not confirmed current for this long are refreshed in the background when read
+    weather_ttl_minutes: int = 90
+    # "rows": one weather_forecasts row per hour; "series": one packed forecast_series row per trail
+    weather_storage: str = "rows"
 
     class Config:
         env_file = ".env"
@@ -1,12 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.config import settings
+from app.database import async_session_maker
 from app.routes import auth, profile, trails, weather, assessments, recommendations, conditions, hikes
+from app.services.llm_service import close_llm_client
+from app.services.trail_catalog import load_catalog, poll_catalog_version
+from app.services.weather_refresh import weather_refresh_loop
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with async_session_maker() as session:
+        await load_catalog(session)
+
+    background_tasks = [asyncio.create_task(poll_catalog_version())]
+    if settings.weather_refresh_enabled:
+        background_tasks.append(asyncio.create_task(weather_refresh_loop()))
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    await close_llm_client()
+
 
 app = FastAPI(
     title="TrailSense API",
     description="Hiking decision support system API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -4,5 +4,13 @@ from app.models.weather import WeatherForecast
 from app.models.condition import TrailCondition
 from app.models.assessment import Assessment
 from app.models.hike_log import HikeLog
+from app.models.data_version import DataVersion
+from app.models.precomputed_recommendation import PrecomputedRecommendation
+from app.models.nws_gridpoint import NwsGridpoint
+from app.models.forecast_series import ForecastSeries
+from app.models.weather_daily import WeatherDaily
+from app.models.llm_parse_cache import LLMParseCache
 
-__all__ = ["User", "Trail", "WeatherForecast", "TrailCondition", "Assessment", "HikeLog"]
+__all__ = ["User", "Trail", "WeatherForecast", "TrailCondition", "Assessment", "HikeLog", "DataVersion",
+           "PrecomputedRecommendation", "NwsGridpoint", "ForecastSeries",
+           "WeatherDaily", "LLMParseCache"]
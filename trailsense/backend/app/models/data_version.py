@@ -0,0 +1,11 @@
+from sqlalchemy import Column, String, BigInteger, TIMESTAMP, func
+
+from app.database import Base
+
+
+class DataVersion(Base):
+    __tablename__ = "data_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=1)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Date, TIMESTAMP, ForeignKey, ARRAY, LargeBinary, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class ForecastSeries(Base):
+    """
+    A trail's whole hourly trailhead forecast in one row.
+
+    Each value column is a packed little-endian int16 array indexed by hours
+    since midnight of start_date, with -32768 for hours the forecast doesn't
+    cover. weather_summary is dictionary-encoded: summary_codes index into
+    summaries.
+    """
+    __tablename__ = "forecast_series"
+
+    trail_id = Column(UUID(as_uuid=True), ForeignKey("trails.id", ondelete="CASCADE"), primary_key=True)
+    start_date = Column(Date, nullable=False)
+    temperature = Column(LargeBinary, nullable=False)
+    precipitation = Column(LargeBinary, nullable=False)
+    wind_speed = Column(LargeBinary, nullable=False)
+    wind_gust = Column(LargeBinary, nullable=False)
+    sky_cover = Column(LargeBinary, nullable=False)
+    summary_codes = Column(LargeBinary, nullable=False)
+    summaries = Column(ARRAY(String), nullable=False)
+    fetched_at = Column(TIMESTAMP, server_default=func.now())
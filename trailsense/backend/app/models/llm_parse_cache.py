@@ -0,0 +1,22 @@
+from sqlalchemy import Column, String, TIMESTAMP, Index, func
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.database import Base
+
+
+class LLMParseCache(Base):
+    """
+    Parsed trip reports, keyed by a hash of the normalized report text, the
+    model and the prompt version, so a report already seen costs no LLM call.
+    """
+    __tablename__ = "llm_parse_cache"
+    __table_args__ = (
+        Index("idx_llm_parse_cache_last_used", "last_used_at"),
+    )
+
+    cache_key = Column(String(64), primary_key=True)
+    model = Column(String, nullable=False)
+    prompt_version = Column(String, nullable=False)
+    parsed = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    last_used_at = Column(TIMESTAMP, server_default=func.now())
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, String, Integer, DECIMAL, TIMESTAMP, func
+
+from app.database import Base
+
+
+class NwsGridpoint(Base):
+    """Which NWS forecast grid cell a trailhead coordinate falls in"""
+    __tablename__ = "nws_gridpoints"
+
+    lat = Column(DECIMAL(7, 4), primary_key=True)
+    lon = Column(DECIMAL(8, 4), primary_key=True)
+    grid_id = Column(String, nullable=False)
+    grid_x = Column(Integer, nullable=False)
+    grid_y = Column(Integer, nullable=False)
+    forecast_hourly_url = Column(String, nullable=False)
+    resolved_at = Column(TIMESTAMP, server_default=func.now())
+    # Validators from the last 200, sent back so an unchanged forecast costs a 304
+    etag = Column(String)
+    last_modified = Column(String)
+    checked_at = Column(TIMESTAMP)
+    changed_at = Column(TIMESTAMP)
+    # UTC offset of the forecast's local hours as of the last 200, for trail-local "now"
+    utc_offset_minutes = Column(Integer)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, ForeignKey, LargeBinary, TIMESTAMP
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+
+from app.database import Base
+
+
+class PrecomputedRecommendation(Base):
+    __tablename__ = "precomputed_recommendations"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    forecast_date = Column(Date, primary_key=True)
+    profile_fingerprint = Column(String, nullable=False)
+    catalog_version = Column(BigInteger, nullable=False)
+    weather_version = Column(BigInteger, nullable=False)
+    conditions_version = Column(BigInteger, nullable=False, default=0)
+    max_drive_time_minutes = Column(Integer, nullable=False)
+    trail_rows = Column(LargeBinary, nullable=False)
+    confidence = Column(LargeBinary, nullable=False)
+    computed_at = Column(TIMESTAMP, server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Date, TIMESTAMP, ForeignKey, func
+from sqlalchemy import Column, String, Integer, Date, TIMESTAMP, ForeignKey, UniqueConstraint, func
 from sqlalchemy.dialects.postgresql import UUID
 
 from app.database import Base
@@ -6,6 +6,12 @@ from app.database import Base
 
 class WeatherForecast(Base):
     __tablename__ = "weather_forecasts"
+    __table_args__ = (
+        UniqueConstraint(
+            "trail_id", "location_type", "forecast_date", "forecast_hour",
+            name="uq_weather_forecasts_slot"
+        ),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, server_default=func.gen_random_uuid())
     trail_id = Column(UUID(as_uuid=True), ForeignKey("trails.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Integer, Boolean, Date, TIMESTAMP, ForeignKey, Index, func
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.database import Base
+
+
+class WeatherDaily(Base):
+    """
+    Per-day trailhead forecast aggregates, maintained as forecasts are stored.
+
+    weather_summary is the day's first thunder summary if any hour mentions
+    thunder, and its first hour's summary otherwise.
+    """
+    __tablename__ = "weather_daily"
+    __table_args__ = (
+        Index("idx_weather_daily_date", "forecast_date"),
+    )
+
+    trail_id = Column(UUID(as_uuid=True), ForeignKey("trails.id", ondelete="CASCADE"), primary_key=True)
+    forecast_date = Column(Date, primary_key=True)
+    temperature_min = Column(Integer)
+    temperature_max = Column(Integer)
+    precipitation_max = Column(Integer)
+    wind_speed_max = Column(Integer)
+    wind_gust_max = Column(Integer)
+    has_thunder = Column(Boolean, nullable=False, default=False)
+    weather_summary = Column(String)
+    hours = Column(Integer, nullable=False)
+    fetched_at = Column(TIMESTAMP, server_default=func.now())
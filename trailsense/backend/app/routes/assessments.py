@@ -1,19 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from pydantic import BaseModel
+from sqlalchemy import select, insert
+from pydantic import BaseModel, Field
 from typing import Optional
-from datetime import date
+from datetime import date, timedelta
 from decimal import Decimal
+import uuid
 
 from app.database import get_db
 from app.models.user import User
-from app.models.trail import Trail
 from app.models.assessment import Assessment
 from app.models.condition import TrailCondition
+from app.services import trail_service
 from app.services.auth_service import get_current_user
-from app.services.decision_engine import apply_hard_rules, generate_breakdown, get_recommendation, calculate_naismith_time
-from app.services.recommendation_service import get_latest_weather, get_latest_conditions
+from app.services.decision_engine import evaluate, trail_rule_input
+from app.services.recommendation_cache import assessment_range_cache, profile_fingerprint
+from app.services.recommendation_service import (
+    get_latest_weather,
+    get_latest_conditions,
+    get_latest_weather_for_days,
+    get_latest_conditions_bulk
+)
+from app.services.start_time_optimizer import get_hourly_series_bulk, optimize_start_time
+from app.services.trail_catalog import get_catalog
+from app.services.weather_refresh import within_forecast_horizon, refresh_in_background
 
 
 router = APIRouter(prefix="/api/assessments", tags=["assessments"])
@@ -23,6 +33,21 @@ class CreateAssessmentRequest(BaseModel):
     trail_id: str
     date: str
     gear: list[str]
+    optimize_start_time: bool = False
+
+
+class BatchAssessmentRequest(BaseModel):
+    items: list[CreateAssessmentRequest] = Field(..., min_length=1, max_length=500)
+
+
+class RangeAssessmentRequest(BaseModel):
+    trail_id: str
+    start_date: str
+    end_date: str
+    gear: list[str]
+
+
+MAX_RANGE_DAYS = 14
 
 
 class AssessmentResponse(BaseModel):
@@ -34,6 +59,7 @@ class AssessmentResponse(BaseModel):
     estimated_time_hours: float
     weather_summary: Optional[dict]
     recent_reports: list[dict]
+    start_time: Optional[dict] = None
 
 
 @router.post("", response_model=AssessmentResponse)
@@ -43,9 +69,7 @@ async def create_assessment(
     db: AsyncSession = Depends(get_db)
 ):
     """Create a trail assessment for a specific date"""
-    query = select(Trail).where(Trail.id == request.trail_id)
-    result = await db.execute(query)
-    trail = result.scalar_one_or_none()
+    trail = await trail_service.get_trail_by_id(db, request.trail_id)
 
     if not trail:
         raise HTTPException(status_code=404, detail="Trail not found")
@@ -53,36 +77,30 @@ async def create_assessment(
     forecast_date = date.fromisoformat(request.date)
 
     weather = await get_latest_weather(request.trail_id, forecast_date, db)
+    if weather is None and within_forecast_horizon(forecast_date):
+        # Assess without weather now; the next request will have it
+        refresh_in_background(trail, conditional=False)
     conditions = await get_latest_conditions(request.trail_id, db)
 
-    trail_dict = {
-        "distance_miles": float(trail.distance_miles),
-        "elevation_gain_ft": trail.elevation_gain_ft,
-        "exposure_level": trail.exposure_level,
-        "technical_class": trail.technical_class,
-        "required_gear": trail.required_gear or []
-    }
-
-    confidence, concerns = apply_hard_rules(
-        trail_dict,
-        current_user.profile,
-        weather,
-        conditions,
-        request.gear
-    )
+    evaluation = evaluate(trail_rule_input(trail), current_user.profile, weather, conditions, request.gear)
+    confidence = evaluation["confidence"]
+    concerns = evaluation["concerns"]
+    breakdown = evaluation["breakdown"]
+    recommendation = evaluation["recommendation"]
+    estimated_time = evaluation["estimated_time_hours"]
 
-    breakdown = generate_breakdown(
-        trail_dict,
-        current_user.profile,
-        weather,
-        conditions,
-        request.gear,
-        confidence,
-        concerns
-    )
-
-    recommendation = get_recommendation(confidence)
-    estimated_time = calculate_naismith_time(trail_dict, current_user.profile)
+    start_time = None
+    if request.optimize_start_time:
+        series = await get_hourly_series_bulk([trail.id], [forecast_date], db)
+        start_time = optimize_start_time(
+            trail_rule_input(trail), current_user.profile, conditions, request.gear,
+            series[(str(trail.id), forecast_date)], forecast_date
+        )
+        if start_time is not None:
+            confidence = start_time["confidence"]
+            concerns = start_time["concerns"]
+            breakdown = start_time["breakdown"]
+            recommendation = start_time["recommendation"]
 
     assessment = Assessment(
         user_id=current_user.id,
@@ -121,10 +139,198 @@ async def create_assessment(
         concerns=concerns,
         estimated_time_hours=estimated_time,
         weather_summary=weather,
-        recent_reports=recent_reports
+        recent_reports=recent_reports,
+        start_time=start_time
     )
 
 
+@router.post("/batch")
+async def create_assessments_batch(
+    request: BatchAssessmentRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Assess many (trail, date) pairs in one request.
+
+    Trails come from the catalog, weather and conditions are loaded with one
+    query each for the whole batch, and every assessment is written with a
+    single insert. Items for unknown trails come back with an error instead
+    of failing the batch.
+    """
+    try:
+        forecast_dates = [date.fromisoformat(item.date) for item in request.items]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    catalog = await get_catalog(db)
+    trails = [catalog.get(item.trail_id) for item in request.items]
+    trail_ids = list({trail.id for trail in trails if trail})
+
+    weather_by_day = await get_latest_weather_for_days(trail_ids, list(set(forecast_dates)), db)
+    conditions_by_trail = await get_latest_conditions_bulk(trail_ids, db)
+
+    optimized = [
+        (trail.id, forecast_date)
+        for item, trail, forecast_date in zip(request.items, trails, forecast_dates)
+        if trail and item.optimize_start_time
+    ]
+    series_by_day = {}
+    if optimized:
+        series_by_day = await get_hourly_series_bulk(
+            list({t for t, _ in optimized}), list({d for _, d in optimized}), db
+        )
+
+    results = []
+    values = []
+    for item, trail, forecast_date in zip(request.items, trails, forecast_dates):
+        if not trail:
+            results.append({"trail_id": item.trail_id, "date": item.date, "error": "Trail not found"})
+            continue
+
+        weather = weather_by_day.get((str(trail.id), forecast_date))
+        if weather is None and within_forecast_horizon(forecast_date):
+            refresh_in_background(trail, conditional=False)
+        conditions = conditions_by_trail.get(str(trail.id))
+        trail_dict = trail_rule_input(trail)
+        evaluation = evaluate(trail_dict, current_user.profile, weather, conditions, item.gear)
+
+        start_time = None
+        if item.optimize_start_time:
+            start_time = optimize_start_time(
+                trail_dict, current_user.profile, conditions, item.gear,
+                series_by_day[(str(trail.id), forecast_date)], forecast_date
+            )
+            if start_time is not None:
+                evaluation.update(
+                    confidence=start_time["confidence"],
+                    concerns=start_time["concerns"],
+                    breakdown=start_time["breakdown"],
+                    recommendation=start_time["recommendation"]
+                )
+
+        assessment_id = uuid.uuid4()
+        values.append({
+            "id": assessment_id,
+            "user_id": current_user.id,
+            "trail_id": trail.id,
+            "assessment_date": forecast_date,
+            "confidence_score": Decimal(str(evaluation["confidence"])),
+            "recommendation": evaluation["recommendation"],
+            "breakdown": evaluation["breakdown"],
+            "concerns": evaluation["concerns"]
+        })
+        results.append({
+            "assessment_id": str(assessment_id),
+            "trail_id": str(trail.id),
+            "date": item.date,
+            "confidence_score": float(evaluation["confidence"]),
+            "recommendation": evaluation["recommendation"],
+            "breakdown": evaluation["breakdown"],
+            "concerns": evaluation["concerns"],
+            "estimated_time_hours": evaluation["estimated_time_hours"],
+            "weather_summary": weather,
+            "start_time": start_time
+        })
+
+    if values:
+        await db.execute(insert(Assessment).values(values))
+        await db.commit()
+
+    return {"assessments": results}
+
+
+@router.post("/range")
+async def create_assessment_range(
+    request: RangeAssessmentRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Assess one trail for every day in a date range, best day first.
+
+    The trail is read from the catalog, the forecasts for the whole range
+    come from one query and the newest condition report is read once. All
+    days are persisted with a single insert. The result is cached until a
+    new forecast or condition report for the trail arrives, from any process.
+    """
+    try:
+        start_date = date.fromisoformat(request.start_date)
+        end_date = date.fromisoformat(request.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid date format")
+
+    num_days = (end_date - start_date).days + 1
+    if num_days < 1 or num_days > MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Date range must cover 1 to {MAX_RANGE_DAYS} days"
+        )
+
+    catalog = await get_catalog(db)
+    trail = catalog.get(request.trail_id)
+    if not trail:
+        raise HTTPException(status_code=404, detail="Trail not found")
+
+    profile = current_user.profile or {}
+    cache_key = (
+        str(current_user.id),
+        str(trail.id),
+        start_date,
+        end_date,
+        tuple(sorted(set(request.gear))),
+        profile_fingerprint(profile),
+        catalog.version
+    )
+    cached = assessment_range_cache.get(cache_key)
+    if cached is not None:
+        return {"trail_id": str(trail.id), "days": cached, "cached": True}
+
+    forecast_dates = [start_date + timedelta(days=offset) for offset in range(num_days)]
+    weather_by_day = await get_latest_weather_for_days([trail.id], forecast_dates, db)
+    conditions = await get_latest_conditions(trail.id, db)
+    trail_dict = trail_rule_input(trail)
+
+    days = []
+    values = []
+    for forecast_date in forecast_dates:
+        weather = weather_by_day.get((str(trail.id), forecast_date))
+        if weather is None and within_forecast_horizon(forecast_date):
+            refresh_in_background(trail, conditional=False)
+        evaluation = evaluate(trail_dict, profile, weather, conditions, request.gear)
+
+        assessment_id = uuid.uuid4()
+        values.append({
+            "id": assessment_id,
+            "user_id": current_user.id,
+            "trail_id": trail.id,
+            "assessment_date": forecast_date,
+            "confidence_score": Decimal(str(evaluation["confidence"])),
+            "recommendation": evaluation["recommendation"],
+            "breakdown": evaluation["breakdown"],
+            "concerns": evaluation["concerns"]
+        })
+        days.append({
+            "assessment_id": str(assessment_id),
+            "date": str(forecast_date),
+            "confidence_score": float(evaluation["confidence"]),
+            "recommendation": evaluation["recommendation"],
+            "breakdown": evaluation["breakdown"],
+            "concerns": evaluation["concerns"],
+            "estimated_time_hours": evaluation["estimated_time_hours"],
+            "weather_summary": weather
+        })
+
+    await db.execute(insert(Assessment).values(values))
+    await db.commit()
+
+    # Stable sort: equal scores keep the earlier day first
+    days.sort(key=lambda d: d["confidence_score"], reverse=True)
+    assessment_range_cache.put(cache_key, days, [trail.id])
+
+    return {"trail_id": str(trail.id), "days": days, "cached": False}
+
+
 @router.get("/{assessment_id}")
 async def get_assessment(
     assessment_id: str,
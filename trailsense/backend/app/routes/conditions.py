@@ -8,7 +8,10 @@ from datetime import date
 from app.database import get_db
 from app.models.user import User
 from app.models.condition import TrailCondition
+from app.services import data_versions
+from app.services.data_versions import bump_data_version
 from app.services.auth_service import get_current_user
+from app.services.recommendation_cache import invalidate_trails
 
 
 router = APIRouter(prefix="/api/trails", tags=["conditions"])
@@ -87,8 +90,10 @@ async def create_condition(
     )
 
     db.add(condition)
+    await bump_data_version(db, data_versions.CONDITIONS)
     await db.commit()
     await db.refresh(condition)
+    invalidate_trails([trail_id])
 
     return {
         "id": str(condition.id),
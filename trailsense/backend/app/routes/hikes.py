@@ -9,7 +9,7 @@ from decimal import Decimal
 from app.database import get_db
 from app.models.user import User
 from app.models.hike_log import HikeLog
-from app.models.trail import Trail
+from app.services import trail_service
 from app.services.auth_service import get_current_user
 
 
@@ -74,9 +74,7 @@ async def create_hike(
     trail_name = request.trail_name
 
     if request.trail_id:
-        query = select(Trail).where(Trail.id == request.trail_id)
-        result = await db.execute(query)
-        trail = result.scalar_one_or_none()
+        trail = await trail_service.get_trail_by_id(db, request.trail_id)
         if trail:
             trail_name = trail.name
 
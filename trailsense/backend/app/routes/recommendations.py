@@ -1,12 +1,16 @@
+import json
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
-from app.database import get_db
+from app.database import get_db, async_session_maker
 from app.models.user import User
 from app.services.auth_service import get_current_user
-from app.services.recommendation_service import get_recommendations
+from app.services.recommendation_service import get_recommendations, stream_recommendations
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_materializer import get_precomputed_recommendations
 
 
 router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
@@ -21,6 +25,30 @@ class RecommendationConstraints(BaseModel):
     desired_features: list[str] = []
     avoid: list[str] = []
     difficulty: Optional[str] = None
+    limit: int = Field(5, ge=1, le=50)
+    diversity: float = Field(0.2, ge=0, le=1)
+
+
+def serialize_recommendation(rec: dict) -> dict:
+    trail = rec["trail"]
+    return {
+        "trail": {
+            "id": str(trail.id),
+            "name": trail.name,
+            "region": trail.region,
+            "distance_miles": float(trail.distance_miles),
+            "elevation_gain_ft": trail.elevation_gain_ft,
+            "difficulty": trail.difficulty,
+            "terrain_types": trail.terrain_types or [],
+            "features": trail.features or [],
+            "photos": trail.photos or []
+        },
+        "confidence_score": rec["confidence_score"],
+        "drive_time_minutes": rec["drive_time_minutes"],
+        "why_recommended": rec["why_recommended"],
+        "concerns": rec["concerns"],
+        "weather_summary": rec["weather"]
+    }
 
 
 @router.post("")
@@ -31,39 +59,61 @@ async def get_trail_recommendations(
 ):
     """Get personalized trail recommendations based on constraints"""
 
-    recommendations = await get_recommendations(
+    precomputed = await get_precomputed_recommendations(
+        current_user.id,
         current_user.profile,
         constraints.model_dump(),
         db
     )
+    if precomputed:
+        recommendations, freshness = precomputed
+    else:
+        recommendations = await get_recommendations(
+            current_user.profile,
+            constraints.model_dump(),
+            db
+        )
+        freshness = {"source": "live"}
 
-    results = []
-    for rec in recommendations:
-        trail = rec["trail"]
-        results.append({
-            "trail": {
-                "id": str(trail.id),
-                "name": trail.name,
-                "region": trail.region,
-                "distance_miles": float(trail.distance_miles),
-                "elevation_gain_ft": trail.elevation_gain_ft,
-                "difficulty": trail.difficulty,
-                "terrain_types": trail.terrain_types or [],
-                "features": trail.features or [],
-                "photos": trail.photos or []
-            },
-            "confidence_score": rec["confidence_score"],
-            "drive_time_minutes": rec["drive_time_minutes"],
-            "why_recommended": rec["why_recommended"],
-            "concerns": rec["concerns"],
-            "weather_summary": rec["weather"]
-        })
+    results = [serialize_recommendation(rec) for rec in recommendations]
 
     message = None
-    if len(results) < 5:
+    if len(results) < constraints.limit:
         message = f"Found {len(results)} trail{'s' if len(results) != 1 else ''} matching your criteria. Try relaxing distance or drive time constraints for more options."
 
     return {
         "recommendations": results,
-        "message": message
+        "message": message,
+        "freshness": freshness
     }
+
+
+@router.post("/stream")
+async def stream_trail_recommendations(
+    constraints: RecommendationConstraints,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Stream recommendations as NDJSON, one ranking per line.
+
+    Provisional rankings arrive while candidates are still being scored and
+    weather/conditions are loading; the last line has stage "final".
+    """
+    user_profile = current_user.profile
+
+    async def ndjson_lines():
+        # The request-scoped session may be closed before the body finishes streaming
+        async with async_session_maker() as db:
+            async for update in stream_recommendations(user_profile, constraints.model_dump(), db):
+                update["recommendations"] = [serialize_recommendation(r) for r in update["recommendations"]]
+                yield json.dumps(update, default=str) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+@router.get("/cache")
+async def get_recommendation_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Hit/miss statistics for the recommendation result cache"""
+    return recommendation_cache.stats()
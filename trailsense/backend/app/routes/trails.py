@@ -103,6 +103,7 @@ class CreateTrailRequest(BaseModel):
 async def list_trails(
     search: Optional[str] = Query(None),
     difficulty: Optional[str] = Query(None),
+    region: Optional[str] = Query(None),
     max_distance: Optional[float] = Query(None),
     limit: int = Query(50, le=100),
     offset: int = Query(0, ge=0),
@@ -110,7 +111,7 @@ async def list_trails(
     current_user: User = Depends(get_current_user)
 ):
     trails, count = await trail_service.get_trails(
-        db, search=search, difficulty=difficulty, max_distance=max_distance,
+        db, search=search, difficulty=difficulty, region=region, max_distance=max_distance,
         limit=limit, offset=offset
     )
 
@@ -2,8 +2,16 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
 
+from app.config import settings
 from app.database import get_db
 from app.services import weather_service
+from app.services.trail_catalog import get_catalog
+from app.services.weather_refresh import (
+    forecast_staleness,
+    within_forecast_horizon,
+    refresh_in_background,
+    is_refreshing
+)
 from app.utils.security import get_current_user
 from app.models.user import User
 
@@ -17,12 +25,31 @@ async def get_trail_weather(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Serve the stored forecast right away, stamped with its age.
+
+    A forecast that is missing or older than weather_ttl_minutes triggers a
+    background refresh of the trail's grid cell (one at a time per trailhead), so the
+    response never waits on NWS. `age_minutes` is how long ago the forecast
+    was last confirmed current, or None if it never was.
+    """
+    catalog = await get_catalog(db)
+    trail = catalog.get(trail_id)
+    if not trail:
+        raise HTTPException(status_code=404, detail="Trail not found")
+
     weather_data = await weather_service.get_weather_for_trail(db, trail_id, date_param)
+    age = (await forecast_staleness(db, [trail]))[str(trail.id)]
 
-    if not weather_data["trailhead"] and not weather_data["summit"]:
-        raise HTTPException(
-            status_code=404,
-            detail="No weather forecast available for this trail and date"
-        )
+    missing = not weather_data["trailhead"] and within_forecast_horizon(date_param)
+    stale = age is None or age > settings.weather_ttl_minutes
+    if missing or stale:
+        # Missing data needs the full forecast even if upstream hasn't changed it
+        refresh_in_background(trail, conditional=not missing)
 
-    return weather_data
+    return {
+        **weather_data,
+        "age_minutes": age,
+        "stale": stale,
+        "refreshing": is_refreshing(trail)
+    }
@@ -0,0 +1,55 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+
+from app.models.data_version import DataVersion
+
+
+TRAILS = "trails"
+WEATHER = "weather"
+CONDITIONS = "conditions"
+
+# Counters as this worker last read them; poll_catalog_version keeps them current
+_seen: dict[str, int] = {}
+
+
+async def get_data_version(db: AsyncSession, name: str) -> int:
+    result = await db.execute(select(DataVersion.version).where(DataVersion.name == name))
+    return result.scalar() or 0
+
+
+async def load_data_versions(db: AsyncSession) -> dict[str, int]:
+    """Read every counter in one query and remember them for seen_version"""
+    global _seen
+
+    result = await db.execute(select(DataVersion.name, DataVersion.version))
+    _seen = {name: version for name, version in result.all()}
+    return dict(_seen)
+
+
+def seen_version(name: str) -> int:
+    """
+    A counter as of this worker's last poll, without a query.
+
+    Lets callers notice changes made by other processes, such as the
+    refresh and parsing scripts, within one poll interval.
+    """
+    return _seen.get(name, 0)
+
+
+async def bump_data_version(db: AsyncSession, name: str) -> int:
+    """
+    Increment a named version counter so other workers notice the change.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    result = await db.execute(
+        update(DataVersion)
+        .where(DataVersion.name == name)
+        .values(version=DataVersion.version + 1)
+        .returning(DataVersion.version)
+    )
+    version = result.scalar()
+    if version is None:
+        db.add(DataVersion(name=name, version=1))
+        version = 1
+    return version
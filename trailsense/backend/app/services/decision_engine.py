@@ -1,174 +1,287 @@
-from typing import Optional
+from typing import Callable, NamedTuple, Optional
 from datetime import date
 
 
-def apply_hard_rules(
+PACE_MPH = {"slow": 2.0, "moderate": 3.0, "fast": 4.0}
+
+
+class TripFeatures(NamedTuple):
+    """Everything the rules look at, derived once per (trail, profile, weather, conditions, gear)"""
+    estimated_time: float
+    max_hours: float
+    trail_gain: int
+    max_gain: int
+    exposure: int
+    exposure_comfort: int
+    technical_class: int
+    scrambling_comfort: bool
+    cold_tolerance: int
+    required_gear: set
+    user_gear: set
+    has_weather: bool
+    summary: str
+    thunder: bool
+    temperature: Optional[int]
+    precipitation: int
+    gust: int
+    has_conditions: bool
+    trail_status: Optional[str]
+    snow_level_ft: Optional[int]
+
+
+class HardRule(NamedTuple):
+    applies: Callable[[TripFeatures], bool]
+    cap: Optional[float]
+    penalty: Optional[float]
+    concern: Callable[[TripFeatures], str]
+
+
+class BreakdownRule(NamedTuple):
+    applies: Callable[[TripFeatures], bool]
+    status: str
+    notes: Callable[[TripFeatures], str]
+
+
+def trail_rule_input(trail) -> dict:
+    """The trail fields the rules read, from a Trail or TrailRecord"""
+    return {
+        "distance_miles": float(trail.distance_miles),
+        "elevation_gain_ft": trail.elevation_gain_ft,
+        "exposure_level": trail.exposure_level,
+        "technical_class": trail.technical_class,
+        "required_gear": trail.required_gear or []
+    }
+
+
+def derive_features(
     trail: dict,
     user_profile: dict,
     weather: Optional[dict],
     conditions: Optional[dict],
     gear: list[str]
-) -> tuple[float, list[str]]:
-    """
-    Apply hard rule penalties to base confidence score.
-    Returns (confidence_score, list_of_concerns)
-    """
-    confidence = 100.0
-    concerns = []
-
-    if conditions and conditions.get("trail_status") == "closed":
-        return 0, ["Trail is officially closed"]
+) -> TripFeatures:
+    fitness = user_profile.get("fitness", {})
+    technical = user_profile.get("technical", {})
 
-    if weather and weather.get("weather_summary"):
-        summary_lower = weather["weather_summary"].lower()
-        if "thunder" in summary_lower and trail.get("exposure_level", 1) >= 3:
-            confidence = min(confidence, 30)
-            concerns.append("High lightning risk on exposed sections - start early or reconsider")
+    pace_mph = PACE_MPH.get(fitness.get("pace", "moderate"), 3.0)
+    flat_time = trail.get("distance_miles", 0) / pace_mph
+    climb_time = trail.get("elevation_gain_ft", 0) / 2000
 
     required_gear = set(trail.get("required_gear", []))
     if conditions and conditions.get("required_gear"):
         required_gear.update(conditions["required_gear"])
-    user_gear_set = set(gear or [])
 
-    if "microspikes" in required_gear and "microspikes" not in user_gear_set:
-        if conditions and conditions.get("trail_status") in ("icy", "snowy"):
-            confidence = min(confidence, 25)
-            concerns.append("Trail conditions require microspikes")
+    summary = (weather.get("weather_summary") or "") if weather else ""
+
+    return TripFeatures(
+        estimated_time=flat_time + climb_time,
+        max_hours=fitness.get("max_hours", 6),
+        trail_gain=trail.get("elevation_gain_ft", 0),
+        max_gain=fitness.get("max_elevation_gain", 3000),
+        exposure=trail.get("exposure_level", 1),
+        exposure_comfort=technical.get("exposure_comfort", 3),
+        technical_class=trail.get("technical_class", 1),
+        scrambling_comfort=technical.get("scrambling_comfort", False),
+        cold_tolerance=user_profile.get("personal", {}).get("cold_tolerance", 3),
+        required_gear=required_gear,
+        user_gear=set(gear or []),
+        has_weather=bool(weather),
+        summary=summary,
+        thunder="thunder" in summary.lower(),
+        temperature=weather.get("temperature_f") if weather else None,
+        precipitation=(weather.get("precipitation_prob") or 0) if weather else 0,
+        gust=(weather.get("wind_gust_mph") or 0) if weather else 0,
+        has_conditions=bool(conditions),
+        trail_status=conditions.get("trail_status") if conditions else None,
+        snow_level_ft=conditions.get("snow_level_ft") if conditions else None
+    )
+
+
+def _missing(f: TripFeatures, item: str) -> bool:
+    return item in f.required_gear and item not in f.user_gear
+
+
+# Evaluated in order. Caps lower confidence to at most `cap`; penalties subtract.
+HARD_RULES = (
+    HardRule(
+        applies=lambda f: f.thunder and f.exposure >= 3,
+        cap=30, penalty=None,
+        concern=lambda f: "High lightning risk on exposed sections - start early or reconsider"
+    ),
+    HardRule(
+        applies=lambda f: f.precipitation > 70,
+        cap=60, penalty=None,
+        concern=lambda f: f"{f.precipitation}% chance of precipitation"
+    ),
+    HardRule(
+        applies=lambda f: f.gust >= 45 and f.exposure >= 3,
+        cap=50, penalty=None,
+        concern=lambda f: f"Gusts up to {f.gust} mph on exposed terrain"
+    ),
+    HardRule(
+        applies=lambda f: _missing(f, "microspikes") and f.trail_status in ("icy", "snowy"),
+        cap=25, penalty=None,
+        concern=lambda f: "Trail conditions require microspikes"
+    ),
+    HardRule(
+        applies=lambda f: _missing(f, "ice_axe") and f.technical_class >= 3 and bool(f.snow_level_ft),
+        cap=20, penalty=None,
+        concern=lambda f: "Snow on technical terrain - ice axe required"
+    ),
+    HardRule(
+        applies=lambda f: f.estimated_time > f.max_hours * 1.5,
+        cap=40, penalty=None,
+        concern=lambda f: f"Estimated {f.estimated_time:.1f} hours exceeds your capacity"
+    ),
+    HardRule(
+        applies=lambda f: f.max_hours < f.estimated_time <= f.max_hours * 1.5,
+        cap=65, penalty=None,
+        concern=lambda f: f"Estimated {f.estimated_time:.1f} hours is at your limit"
+    ),
+    HardRule(
+        applies=lambda f: f.trail_gain > f.max_gain * 1.3,
+        cap=50, penalty=None,
+        concern=lambda f: f"{f.trail_gain} ft gain significantly exceeds your usual {f.max_gain} ft"
+    ),
+    HardRule(
+        applies=lambda f: f.exposure > f.exposure_comfort + 1,
+        cap=55, penalty=None,
+        concern=lambda f: "Trail exposure exceeds your comfort level"
+    ),
+    HardRule(
+        applies=lambda f: f.technical_class >= 2 and not f.scrambling_comfort,
+        cap=50, penalty=None,
+        concern=lambda f: "Trail requires scrambling"
+    ),
+    HardRule(
+        applies=lambda f: f.temperature is not None and f.temperature < 20 and f.cold_tolerance < 3,
+        cap=None, penalty=10,
+        concern=lambda f: f"Expected {f.temperature}°F - dress warmly"
+    ),
+)
+
+# First matching rule per category wins; the last rule in each list always matches.
+BREAKDOWN_RULES = {
+    "capability": (
+        BreakdownRule(
+            lambda f: f.estimated_time > f.max_hours * 1.5, "bad",
+            lambda f: f"Estimated {f.estimated_time:.1f}h exceeds your {f.max_hours}h capacity"
+        ),
+        BreakdownRule(
+            lambda f: f.estimated_time > f.max_hours, "warning",
+            lambda f: f"Estimated {f.estimated_time:.1f}h is at your {f.max_hours}h limit"
+        ),
+        BreakdownRule(
+            lambda f: True, "good",
+            lambda f: f"Estimated {f.estimated_time:.1f}h within your {f.max_hours}h capacity"
+        ),
+    ),
+    "weather": (
+        BreakdownRule(lambda f: not f.has_weather, "good", lambda f: "No forecast available"),
+        BreakdownRule(lambda f: f.thunder, "bad", lambda f: f"{f.summary} - High lightning risk"),
+        BreakdownRule(lambda f: f.precipitation > 70, "warning", lambda f: f"{f.precipitation}% chance of precipitation"),
+        BreakdownRule(
+            lambda f: f.gust >= 45 and f.exposure >= 3, "warning",
+            lambda f: f"Gusts up to {f.gust} mph on exposed terrain"
+        ),
+        BreakdownRule(
+            lambda f: bool(f.temperature) and f.temperature < 20, "warning",
+            lambda f: f"Cold conditions ({f.temperature}°F)"
+        ),
+        BreakdownRule(lambda f: True, "good", lambda f: f"{f.summary or 'Clear conditions'}"),
+    ),
+    "conditions": (
+        BreakdownRule(lambda f: not f.has_conditions, "good", lambda f: "No recent condition reports"),
+        BreakdownRule(lambda f: f.trail_status == "closed", "bad", lambda f: "Trail closed"),
+        BreakdownRule(lambda f: f.trail_status in ("icy", "snowy"), "warning", lambda f: f"Trail is {f.trail_status}"),
+        BreakdownRule(lambda f: f.trail_status == "clear", "good", lambda f: "Trail clear and dry"),
+        BreakdownRule(lambda f: True, "good", lambda f: f.trail_status or "Unknown conditions"),
+    ),
+    "gear": (
+        BreakdownRule(
+            lambda f: bool(f.required_gear - f.user_gear), "warning",
+            lambda f: f"Consider: {', '.join(f.required_gear - f.user_gear)}"
+        ),
+        BreakdownRule(lambda f: True, "good", lambda f: "All recommended gear available"),
+    ),
+}
+
+
+def _score(f: TripFeatures) -> tuple[float, list[str]]:
+    if f.trail_status == "closed":
+        return 0, ["Trail is officially closed"]
 
-    if "ice_axe" in required_gear and "ice_axe" not in user_gear_set:
-        if trail.get("technical_class", 1) >= 3 and conditions and conditions.get("snow_level_ft"):
-            confidence = min(confidence, 20)
-            concerns.append("Snow on technical terrain - ice axe required")
+    confidence = 100.0
+    concerns = []
+    for rule in HARD_RULES:
+        if rule.applies(f):
+            if rule.cap is not None:
+                confidence = min(confidence, rule.cap)
+            if rule.penalty is not None:
+                confidence -= rule.penalty
+            concerns.append(rule.concern(f))
 
-    pace_map = {"slow": 2.0, "moderate": 3.0, "fast": 4.0}
-    pace = user_profile.get("fitness", {}).get("pace", "moderate")
-    pace_mph = pace_map.get(pace, 3.0)
+    return confidence, concerns
 
-    flat_time = trail.get("distance_miles", 0) / pace_mph
-    climb_time = trail.get("elevation_gain_ft", 0) / 2000
-    estimated_time = flat_time + climb_time
-
-    max_hours = user_profile.get("fitness", {}).get("max_hours", 6)
-    if estimated_time > max_hours * 1.5:
-        confidence = min(confidence, 40)
-        concerns.append(f"Estimated {estimated_time:.1f} hours exceeds your capacity")
-    elif estimated_time > max_hours:
-        confidence = min(confidence, 65)
-        concerns.append(f"Estimated {estimated_time:.1f} hours is at your limit")
-
-    max_gain = user_profile.get("fitness", {}).get("max_elevation_gain", 3000)
-    trail_gain = trail.get("elevation_gain_ft", 0)
-    if trail_gain > max_gain * 1.3:
-        confidence = min(confidence, 50)
-        concerns.append(f"{trail_gain} ft gain significantly exceeds your usual {max_gain} ft")
-
-    exposure_comfort = user_profile.get("technical", {}).get("exposure_comfort", 3)
-    trail_exposure = trail.get("exposure_level", 1)
-    if trail_exposure > exposure_comfort + 1:
-        confidence = min(confidence, 55)
-        concerns.append("Trail exposure exceeds your comfort level")
-
-    scrambling_comfort = user_profile.get("technical", {}).get("scrambling_comfort", False)
-    if trail.get("technical_class", 1) >= 2 and not scrambling_comfort:
-        confidence = min(confidence, 50)
-        concerns.append("Trail requires scrambling")
-
-    if weather and weather.get("temperature_f") is not None:
-        temp = weather["temperature_f"]
-        cold_tolerance = user_profile.get("personal", {}).get("cold_tolerance", 3)
-        if temp < 20 and cold_tolerance < 3:
-            confidence -= 10
-            concerns.append(f"Expected {temp}°F - dress warmly")
 
-    return confidence, concerns
+def _breakdown(f: TripFeatures) -> dict:
+    breakdown = {}
+    for category, rules in BREAKDOWN_RULES.items():
+        rule = next(r for r in rules if r.applies(f))
+        breakdown[category] = {"status": rule.status, "notes": rule.notes(f)}
+    return breakdown
 
 
-def generate_breakdown(
+def evaluate(
     trail: dict,
     user_profile: dict,
     weather: Optional[dict],
     conditions: Optional[dict],
-    gear: list[str],
-    confidence: float,
-    concerns: list[str]
+    gear: list[str]
 ) -> dict:
-    """Generate the 4-category breakdown for UI"""
-    breakdown = {
-        "capability": {"status": "good", "notes": ""},
-        "weather": {"status": "good", "notes": ""},
-        "conditions": {"status": "good", "notes": ""},
-        "gear": {"status": "good", "notes": ""}
-    }
+    """
+    Run every rule for one trail/day in a single pass over shared derived features.
 
-    pace_map = {"slow": 2.0, "moderate": 3.0, "fast": 4.0}
-    pace = user_profile.get("fitness", {}).get("pace", "moderate")
-    pace_mph = pace_map.get(pace, 3.0)
+    Returns confidence, concerns, the 4-category breakdown, the Naismith time
+    estimate and the recommendation category together.
+    """
+    features = derive_features(trail, user_profile, weather, conditions, gear)
+    confidence, concerns = _score(features)
+
+    return {
+        "confidence": confidence,
+        "concerns": concerns,
+        "breakdown": _breakdown(features),
+        "estimated_time_hours": features.estimated_time,
+        "recommendation": get_recommendation(confidence)
+    }
 
-    flat_time = trail.get("distance_miles", 0) / pace_mph
-    climb_time = trail.get("elevation_gain_ft", 0) / 2000
-    estimated_time = flat_time + climb_time
-    max_hours = user_profile.get("fitness", {}).get("max_hours", 6)
-
-    if estimated_time > max_hours * 1.5:
-        breakdown["capability"]["status"] = "bad"
-        breakdown["capability"]["notes"] = f"Estimated {estimated_time:.1f}h exceeds your {max_hours}h capacity"
-    elif estimated_time > max_hours:
-        breakdown["capability"]["status"] = "warning"
-        breakdown["capability"]["notes"] = f"Estimated {estimated_time:.1f}h is at your {max_hours}h limit"
-    else:
-        breakdown["capability"]["status"] = "good"
-        breakdown["capability"]["notes"] = f"Estimated {estimated_time:.1f}h within your {max_hours}h capacity"
-
-    if weather:
-        temp = weather.get("temperature_f")
-        precip = weather.get("precipitation_prob", 0)
-        summary = weather.get("weather_summary", "")
-
-        if "thunder" in summary.lower():
-            breakdown["weather"]["status"] = "bad"
-            breakdown["weather"]["notes"] = f"{summary} - High lightning risk"
-        elif precip > 70:
-            breakdown["weather"]["status"] = "warning"
-            breakdown["weather"]["notes"] = f"{precip}% chance of precipitation"
-        elif temp and temp < 20:
-            breakdown["weather"]["status"] = "warning"
-            breakdown["weather"]["notes"] = f"Cold conditions ({temp}°F)"
-        else:
-            breakdown["weather"]["status"] = "good"
-            breakdown["weather"]["notes"] = f"{summary or 'Clear conditions'}"
-    else:
-        breakdown["weather"]["notes"] = "No forecast available"
-
-    if conditions:
-        status = conditions.get("trail_status")
-        if status == "closed":
-            breakdown["conditions"]["status"] = "bad"
-            breakdown["conditions"]["notes"] = "Trail closed"
-        elif status in ("icy", "snowy"):
-            breakdown["conditions"]["status"] = "warning"
-            breakdown["conditions"]["notes"] = f"Trail is {status}"
-        elif status == "clear":
-            breakdown["conditions"]["status"] = "good"
-            breakdown["conditions"]["notes"] = "Trail clear and dry"
-        else:
-            breakdown["conditions"]["notes"] = status or "Unknown conditions"
-    else:
-        breakdown["conditions"]["notes"] = "No recent condition reports"
 
-    required_gear = set(trail.get("required_gear", []))
-    if conditions and conditions.get("required_gear"):
-        required_gear.update(conditions["required_gear"])
-    user_gear_set = set(gear or [])
+def apply_hard_rules(
+    trail: dict,
+    user_profile: dict,
+    weather: Optional[dict],
+    conditions: Optional[dict],
+    gear: list[str]
+) -> tuple[float, list[str]]:
+    """
+    Apply hard rule penalties to base confidence score.
+    Returns (confidence_score, list_of_concerns)
+    """
+    return _score(derive_features(trail, user_profile, weather, conditions, gear))
 
-    missing = required_gear - user_gear_set
-    if missing:
-        breakdown["gear"]["status"] = "warning"
-        breakdown["gear"]["notes"] = f"Consider: {', '.join(missing)}"
-    else:
-        breakdown["gear"]["status"] = "good"
-        breakdown["gear"]["notes"] = "All recommended gear available"
 
-    return breakdown
+def generate_breakdown(
+    trail: dict,
+    user_profile: dict,
+    weather: Optional[dict],
+    conditions: Optional[dict],
+    gear: list[str],
+    confidence: float,
+    concerns: list[str]
+) -> dict:
+    """Generate the 4-category breakdown for UI"""
+    return _breakdown(derive_features(trail, user_profile, weather, conditions, gear))
 
 
 def get_recommendation(confidence: float) -> str:
@@ -185,9 +298,8 @@ def get_recommendation(confidence: float) -> str:
 
 def calculate_naismith_time(trail: dict, user_profile: dict) -> float:
     """Calculate estimated hiking time using Naismith's Rule"""
-    pace_map = {"slow": 2.0, "moderate": 3.0, "fast": 4.0}
     pace = user_profile.get("fitness", {}).get("pace", "moderate")
-    pace_mph = pace_map.get(pace, 3.0)
+    pace_mph = PACE_MPH.get(pace, 3.0)
 
     flat_time = trail.get("distance_miles", 0) / pace_mph
     climb_time = trail.get("elevation_gain_ft", 0) / 2000
@@ -0,0 +1,294 @@
+from dataclasses import dataclass, replace
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.forecast_series import ForecastSeries
+from app.services.recommendation_cache import summit_cache
+from app.utils.batching import chunked, LOOKUP_CHUNK
+
+
+# Stored for hours the forecast doesn't cover
+MISSING = -32768
+VALUE_DTYPE = np.dtype("<i2")
+# NWS hourly forecasts run 7 days; a series older than this has nothing current left
+SERIES_DAYS = 8
+
+# Summit conditions derived from the trailhead forecast
+LAPSE_RATE_F_PER_1000_FT = 3.5
+SUMMIT_WIND_MULTIPLIER = 1.3
+GUST_MULTIPLIER = 1.5
+
+VALUE_COLUMNS = ("temperature", "precipitation", "wind_speed", "wind_gust", "sky_cover", "summary_codes")
+
+
+@dataclass(frozen=True, slots=True)
+class ParsedForecast:
+    """
+    An hourly trailhead forecast as columns, one entry per distinct local (date, hour).
+
+    temperature holds MISSING for hours NWS gave none.
+    """
+    dates: list[date]
+    hours: list[int]
+    temperature: np.ndarray
+    precipitation: np.ndarray
+    wind_speed: np.ndarray
+    summaries: list[Optional[str]]
+
+
+@lru_cache(maxsize=4096)
+def summit_temperature_drop(trailhead_elevation: int, summit_elevation: int) -> int:
+    return int(((summit_elevation - trailhead_elevation) / 1000) * LAPSE_RATE_F_PER_1000_FT)
+
+
+def has_summit(trail) -> bool:
+    return bool(trail.highest_point_elevation and trail.trailhead_elevation)
+
+
+def summit_weather(trail, weather: dict) -> Optional[dict]:
+    """
+    Summit conditions for one trailhead hour in the shape of
+    recommendation_service.weather_to_dict, or None for a trail without both
+    elevations.
+    """
+    if not has_summit(trail):
+        return None
+
+    summit = dict(weather)
+    if weather["temperature_f"] is not None:
+        summit["temperature_f"] = weather["temperature_f"] - summit_temperature_drop(
+            trail.trailhead_elevation, trail.highest_point_elevation
+        )
+    if weather["wind_speed_mph"] is not None:
+        summit["wind_speed_mph"] = int(weather["wind_speed_mph"] * SUMMIT_WIND_MULTIPLIER)
+        summit["wind_gust_mph"] = int(summit["wind_speed_mph"] * GUST_MULTIPLIER)
+    return summit
+
+
+def encode_series(trail_id, forecast: ParsedForecast) -> dict:
+    """Pack a parsed forecast into forecast_series column values"""
+    start_date = min(forecast.dates)
+    index = np.array([(d - start_date).days * 24 + h for d, h in zip(forecast.dates, forecast.hours)])
+
+    def pack(values) -> bytes:
+        packed = np.full(int(index.max()) + 1, MISSING, dtype=VALUE_DTYPE)
+        packed[index] = values
+        return packed.tobytes()
+
+    vocabulary: dict[str, int] = {}
+    codes = [MISSING if s is None else vocabulary.setdefault(s, len(vocabulary)) for s in forecast.summaries]
+
+    return {
+        "trail_id": trail_id,
+        "start_date": start_date,
+        "temperature": pack(forecast.temperature),
+        "precipitation": pack(forecast.precipitation),
+        "wind_speed": pack(forecast.wind_speed),
+        "wind_gust": pack(np.trunc(forecast.wind_speed * GUST_MULTIPLIER)),
+        "sky_cover": pack(MISSING),
+        "summary_codes": pack(codes),
+        "summaries": list(vocabulary)
+    }
+
+
+def upsert_series(values: list[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE replacing each trail's whole series"""
+    stmt = insert(ForecastSeries.__table__).values(values)
+    set_ = {column: stmt.excluded[column] for column in ("start_date", *VALUE_COLUMNS, "summaries")}
+    set_["fetched_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["trail_id"], set_=set_)
+
+
+async def prune_stale_series(db: AsyncSession, before: Optional[date] = None) -> int:
+    """Delete series with no hours left on or after `before` (default today). The caller commits."""
+    cutoff = (before or date.today()) - timedelta(days=SERIES_DAYS)
+    result = await db.execute(delete(ForecastSeries).where(ForecastSeries.start_date < cutoff))
+    return result.rowcount
+
+
+def _slice(values: np.ndarray, offset: int, hours: int) -> np.ndarray:
+    """values[offset:offset + hours], padded with MISSING wherever that runs off the series"""
+    window = np.full(hours, MISSING, dtype=values.dtype)
+    lo, hi = max(offset, 0), min(offset + hours, len(values))
+    if lo < hi:
+        window[lo - offset:hi - offset] = values[lo:hi]
+    return window
+
+
+@dataclass(frozen=True, slots=True)
+class HourWindow:
+    """
+    Consecutive hours of one location's forecast, from midnight of a date.
+
+    Value arrays hold MISSING where there is no forecast for that hour.
+    Windows may be shared through summit_cache, so treat them as read-only.
+    """
+    present: np.ndarray
+    temperature: np.ndarray
+    precipitation: np.ndarray
+    wind_speed: np.ndarray
+    wind_gust: np.ndarray
+    sky_cover: np.ndarray
+    summary_codes: np.ndarray
+    summaries: list[str]
+
+    @classmethod
+    def from_rows(cls, rows, start: date, hours: int = 24) -> "HourWindow":
+        """Build a window from weather_forecasts rows (or rows selecting the same columns)"""
+        values = {column: np.full(hours, MISSING, dtype=VALUE_DTYPE) for column in VALUE_COLUMNS}
+        present = np.zeros(hours, dtype=bool)
+        vocabulary: dict[str, int] = {}
+
+        for row in rows:
+            hour = (row.forecast_date - start).days * 24 + row.forecast_hour
+            if not 0 <= hour < hours:
+                continue
+            present[hour] = True
+            for column, value in (
+                ("temperature", row.temperature_f),
+                ("precipitation", row.precipitation_prob),
+                ("wind_speed", row.wind_speed_mph),
+                ("wind_gust", row.wind_gust_mph),
+                ("sky_cover", row.sky_cover)
+            ):
+                if value is not None:
+                    values[column][hour] = value
+            if row.weather_summary is not None:
+                values["summary_codes"][hour] = vocabulary.setdefault(row.weather_summary, len(vocabulary))
+
+        return cls(present, *(values[column] for column in VALUE_COLUMNS), list(vocabulary))
+
+    def summit(self, trail) -> Optional["HourWindow"]:
+        """
+        Summit conditions derived from this trailhead window, or None for a
+        trail without both elevations. Same model as summit_weather, so
+        changing the lapse rate or wind multipliers applies to everything
+        already stored.
+        """
+        if not has_summit(trail):
+            return None
+
+        temperature, wind_speed, wind_gust = self.temperature.copy(), self.wind_speed.copy(), self.wind_gust.copy()
+        known_temperature = temperature != MISSING
+        temperature[known_temperature] -= summit_temperature_drop(
+            trail.trailhead_elevation, trail.highest_point_elevation
+        )
+        known_wind = wind_speed != MISSING
+        summit_winds = np.trunc(wind_speed[known_wind] * SUMMIT_WIND_MULTIPLIER)
+        wind_speed[known_wind] = summit_winds
+        wind_gust[known_wind] = np.trunc(summit_winds * GUST_MULTIPLIER)
+        return replace(self, temperature=temperature, wind_speed=wind_speed, wind_gust=wind_gust)
+
+    def summary(self, hour: int) -> Optional[str]:
+        code = int(self.summary_codes[hour])
+        return None if code == MISSING else self.summaries[code]
+
+    def _value(self, values: np.ndarray, hour: int) -> Optional[int]:
+        value = int(values[hour])
+        return None if value == MISSING else value
+
+    def weather(self, hour: int) -> dict:
+        """One hour in the shape of recommendation_service.weather_to_dict"""
+        return {
+            "temperature_f": self._value(self.temperature, hour),
+            "precipitation_prob": self._value(self.precipitation, hour),
+            "precipitation_type": None,
+            "wind_speed_mph": self._value(self.wind_speed, hour),
+            "wind_gust_mph": self._value(self.wind_gust, hour),
+            "sky_cover": self._value(self.sky_cover, hour),
+            "weather_summary": self.summary(hour)
+        }
+
+    def first_hour(self) -> Optional[dict]:
+        hours = np.flatnonzero(self.present)
+        return self.weather(int(hours[0])) if len(hours) else None
+
+    def hourly(self) -> list[dict]:
+        """Every covered hour in the shape weather_service.get_weather_for_trail returns"""
+        return [
+            {
+                "hour": int(hour),
+                "temperature_f": self._value(self.temperature, hour),
+                "precipitation_prob": self._value(self.precipitation, hour),
+                "wind_speed_mph": self._value(self.wind_speed, hour),
+                "weather_summary": self.summary(hour)
+            }
+            for hour in np.flatnonzero(self.present)
+        ]
+
+
+@dataclass(frozen=True, slots=True)
+class DecodedSeries:
+    """A forecast_series row with its value columns as read-only views over the stored bytes"""
+    start_date: date
+    temperature: np.ndarray
+    precipitation: np.ndarray
+    wind_speed: np.ndarray
+    wind_gust: np.ndarray
+    sky_cover: np.ndarray
+    summary_codes: np.ndarray
+    summaries: list[str]
+    fetched_at: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row) -> "DecodedSeries":
+        return cls(
+            row.start_date,
+            *(np.frombuffer(getattr(row, column), dtype=VALUE_DTYPE) for column in VALUE_COLUMNS),
+            list(row.summaries),
+            row.fetched_at
+        )
+
+    def window(self, trail, location_type: str, start: date, hours: int = 24) -> Optional[HourWindow]:
+        """
+        `hours` hours of trailhead or summit forecast from midnight of `start`.
+
+        Returns None for the summit of a trail without both elevations.
+        """
+        offset = (start - self.start_date).days * 24
+        values = [_slice(getattr(self, column), offset, hours) for column in VALUE_COLUMNS]
+        # An hour is present if any column has a value for it, as with a row in from_rows
+        present = np.any(np.stack(values) != MISSING, axis=0)
+        trailhead = HourWindow(present, *values, self.summaries)
+        if location_type == "trailhead":
+            return trailhead
+        return cached_summit(trail, trailhead, (self.fetched_at, start, hours))
+
+
+def cached_summit(trail, trailhead: HourWindow, source: tuple) -> Optional[HourWindow]:
+    """
+    HourWindow.summit, memoized per trail in summit_cache.
+
+    `source` identifies the trailhead data the window came from, e.g. its
+    fetch time and range, so a newer forecast or a changed elevation never
+    hits an old entry. Refreshes also drop the trail's entries outright.
+    """
+    if not has_summit(trail):
+        return None
+
+    key = (str(trail.id), trail.trailhead_elevation, trail.highest_point_elevation, *source)
+    cached = summit_cache.get(key)
+    if cached is not None:
+        return cached[0]
+
+    summit = trailhead.summit(trail)
+    summit_cache.put(key, [summit], [trail.id])
+    return summit
+
+
+async def load_series(db: AsyncSession, trail_ids: Optional[list]) -> dict[str, DecodedSeries]:
+    """Decode the stored series for the given trails (or every trail, if None), LOOKUP_CHUNK trails per query"""
+    if trail_ids is None:
+        result = await db.execute(select(ForecastSeries))
+        return {str(row.trail_id): DecodedSeries.from_row(row) for row in result.scalars().all()}
+
+    series = {}
+    for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+        result = await db.execute(select(ForecastSeries).where(ForecastSeries.trail_id.in_(chunk)))
+        series.update({str(row.trail_id): DecodedSeries.from_row(row) for row in result.scalars().all()})
+    return series
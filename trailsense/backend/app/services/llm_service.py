@@ -1,15 +1,27 @@
+import asyncio
+import hashlib
 import httpx
 import json
+import math
 from typing import Optional
 
+from app.config import settings
+from app.utils.rate_limit import TokenBucket, RetryingTransport
 
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
 
+MAX_TOKENS = 500
+# Output allowance per report in a batched request; one extraction is ~150 tokens
+BATCH_TOKENS_PER_REPORT = 250
+# Report text per batched request, keeping prompts well inside the context window
+BATCH_MAX_CHARS = 16_000
+# Rough prompt size for rate limiting before the API reports actual usage
+CHARS_PER_TOKEN = 4
+# Requests the rate limiter may bank, in seconds of llm_requests_per_minute
+REQUEST_BURST_SECONDS = 1
 
-async def parse_trip_report(report_text: str, api_key: str) -> Optional[dict]:
-    """Parse trip report using Groq LLM, return structured data"""
 
-    prompt = f'''You are extracting structured trail condition data from a hiking trip report.
+def build_prompt(report_text: str) -> str:
+    return f'''You are extracting structured trail condition data from a hiking trip report.
 
 Trip Report:
 """
@@ -34,37 +46,303 @@ Rules:
 - If information not mentioned, use null
 - Return ONLY JSON, no explanation'''
 
+
+def build_batch_prompt(report_texts: list[str]) -> str:
+    """One prompt extracting every report, so the schema and rules are paid for once per batch"""
+    reports = "\n\n".join(
+        f'Trip Report {index}:\n"""\n{text}\n"""' for index, text in enumerate(report_texts)
+    )
+    return f'''You are extracting structured trail condition data from hiking trip reports.
+
+{reports}
+
+For each report, extract the following and return ONLY a valid JSON array
+with one object per report, in report order:
+{{
+  "index": the report's number,
+  "report_date": "YYYY-MM-DD" or null,
+  "snow_level_ft": integer or null,
+  "trail_status": "clear" | "muddy" | "icy" | "snowy" | "closed" | null,
+  "mud_level": "none" | "light" | "moderate" | "heavy" | null,
+  "water_crossing_status": "low" | "moderate" | "high" | "impassable" | null,
+  "hazards": [],
+  "required_gear": [],
+  "difficulty_sentiment": "easier" | "as-expected" | "harder" | null,
+  "overall_sentiment": "positive" | "neutral" | "negative",
+  "confidence": float 0.0-1.0
+}}
+
+Rules:
+- Judge each report on its own text only
+- If information not mentioned, use null
+- Return ONLY the JSON array, no explanation'''
+
+
+# Changes whenever either prompt template does, so cached parses from an older prompt are never reused
+PROMPT_VERSION = hashlib.sha256((build_prompt("") + build_batch_prompt([""])).encode()).hexdigest()[:12]
+
+
+def _load_json(content: str):
+    """The JSON value in a completion, with any ```json fence removed, or None"""
+    content_clean = content.strip()
+    if content_clean.startswith("```json"):
+        content_clean = content_clean[7:]
+    if content_clean.endswith("```"):
+        content_clean = content_clean[:-3]
+    content_clean = content_clean.strip()
+
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                GROQ_API_URL,
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.1-70b-versatile",
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": 0.1,
-                    "max_tokens": 500
-                }
+        return json.loads(content_clean)
+    except json.JSONDecodeError:
+        return None
+
+
+def parse_content(content: str) -> Optional[dict]:
+    """The JSON object in a completion, with any ```json fence removed"""
+    parsed = _load_json(content)
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def valid_report(parsed) -> bool:
+    """Whether one extracted report has the shape condition rows are built from"""
+    if not isinstance(parsed, dict):
+        return False
+    confidence = parsed.get("confidence")
+    # trail_conditions.confidence is DECIMAL(3, 2), and the prompt asks for 0.0-1.0
+    if confidence is not None and not (_number(confidence) and 0 <= confidence <= 1):
+        return False
+    for key in ("hazards", "required_gear"):
+        value = parsed.get(key)
+        if value is not None and not (isinstance(value, list) and all(isinstance(item, str) for item in value)):
+            return False
+    snow_level = parsed.get("snow_level_ft")
+    return snow_level is None or _number(snow_level)
+
+
+def clean_report(parsed) -> Optional[dict]:
+    """A valid report with snow_level_ft as a whole number of feet (models often answer 9500.0), or None"""
+    if not valid_report(parsed):
+        return None
+    if parsed.get("snow_level_ft") is not None:
+        parsed = {**parsed, "snow_level_ft": int(parsed["snow_level_ft"])}
+    return parsed
+
+
+def parse_batch_content(content: str, count: int) -> list[Optional[dict]]:
+    """
+    Per-report results from a batch completion, by index.
+
+    Each element is checked on its own: a missing, duplicated, out-of-range
+    or malformed element leaves None in its slot without affecting the rest.
+    """
+    parsed = _load_json(content)
+    if isinstance(parsed, dict):
+        # Some models wrap the array in an object despite the instructions
+        parsed = next((value for value in parsed.values() if isinstance(value, list)), None)
+    if not isinstance(parsed, list):
+        return [None] * count
+
+    results: list[Optional[dict]] = [None] * count
+    seen = set()
+    for element in parsed:
+        if not isinstance(element, dict):
+            continue
+        index = element.pop("index", None)
+        if isinstance(index, str) and index.isdigit():
+            index = int(index)
+        if not isinstance(index, int) or isinstance(index, bool) or not 0 <= index < count:
+            continue
+        if index in seen:
+            # Two answers for one report: trust neither
+            results[index] = None
+            continue
+        seen.add(index)
+        results[index] = clean_report(element)
+    return results
+
+
+def request_burst(rate: float, concurrency: int) -> float:
+    """
+    Requests the bucket may bank: REQUEST_BURST_SECONDS at `rate`, between
+    one and `concurrency`, so a fresh client can't open with more requests
+    than the per-minute limit allows.
+    """
+    return max(1.0, min(concurrency, rate * REQUEST_BURST_SECONDS))
+
+
+class LLMClient:
+    """
+    Long-lived chat-completions client shared by every parse.
+
+    One pooled connection set, at most llm_concurrency requests in flight,
+    requests metered against llm_requests_per_minute and tokens against
+    llm_tokens_per_minute: each request reserves an estimate, settled with
+    the usage its response reports. 429s and 5xx responses are retried with
+    backoff (honouring Retry-After). `transport` replaces the network layer,
+    e.g. to run against a local mock of the endpoint.
+    """
+
+    def __init__(self, api_key: str = "", transport: Optional[httpx.AsyncBaseTransport] = None):
+        concurrency = settings.llm_concurrency
+        if transport is None:
+            transport = httpx.AsyncHTTPTransport(
+                limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
             )
+        request_rate = settings.llm_requests_per_minute / 60
+        self.transport = RetryingTransport(
+            transport,
+            TokenBucket(request_rate, request_burst(request_rate, concurrency)),
+            max_retries=settings.llm_max_retries
+        )
+        self.client = httpx.AsyncClient(transport=self.transport, timeout=30.0)
+        self.tokens = TokenBucket(settings.llm_tokens_per_minute / 60, settings.llm_tokens_per_minute)
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.api_key = api_key or settings.groq_api_key
+        self.requests = 0
+        self.batch_requests = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.tokens_used = 0
 
-            if response.status_code == 200:
-                content = response.json()["choices"][0]["message"]["content"]
-                try:
-                    content_clean = content.strip()
-                    if content_clean.startswith("```json"):
-                        content_clean = content_clean[7:]
-                    if content_clean.endswith("```"):
-                        content_clean = content_clean[:-3]
-                    content_clean = content_clean.strip()
-
-                    parsed = json.loads(content_clean)
-                    return parsed
-                except json.JSONDecodeError:
-                    return None
+    async def _complete(self, prompt: str, max_tokens: int, api_key: Optional[str]) -> Optional[str]:
+        """The completion text for one prompt, or None if the request failed"""
+        estimated = min(len(prompt) // CHARS_PER_TOKEN + max_tokens, settings.llm_tokens_per_minute)
+
+        async with self.semaphore:
+            await self.tokens.acquire(estimated)
+            self.requests += 1
+            try:
+                response = await self.client.post(
+                    settings.groq_api_url,
+                    headers={
+                        "Authorization": f"Bearer {api_key or self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": settings.llm_model,
+                        "messages": [{"role": "user", "content": prompt}],
+                        "temperature": 0.1,
+                        "max_tokens": max_tokens
+                    }
+                )
+            except httpx.HTTPError as e:
+                print(f"LLM parsing error: {e}")
+                return None
+
+        if response.status_code != 200:
+            print(f"LLM parsing error: HTTP {response.status_code}")
             return None
-    except Exception as e:
-        print(f"LLM parsing error: {e}")
-        return None
+
+        try:
+            body = response.json()
+            content = body["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            print("LLM parsing error: malformed completion")
+            return None
+
+        used = (body.get("usage") or {}).get("total_tokens") or estimated
+        self.tokens.settle(estimated, used)
+        self.tokens_used += used
+        return content
+
+    async def parse(self, report_text: str, api_key: Optional[str] = None) -> Optional[dict]:
+        """Parse one trip report, or None if the request failed or its JSON isn't a valid report"""
+        content = await self._complete(build_prompt(report_text), MAX_TOKENS, api_key)
+        parsed = clean_report(parse_content(content)) if content is not None else None
+        if parsed is None:
+            self.failures += 1
+        return parsed
+
+    async def parse_batch(self, report_texts: list[str], api_key: Optional[str] = None) -> list[Optional[dict]]:
+        """
+        Parse several reports in one request. Reports whose element is missing
+        or invalid are retried one at a time with parse. If the request itself
+        fails, after the transport's own retries, every report reads as None
+        rather than multiplying the load on an endpoint that is already failing.
+        """
+        if len(report_texts) == 1:
+            return [await self.parse(report_texts[0], api_key)]
+
+        self.batch_requests += 1
+        content = await self._complete(
+            build_batch_prompt(report_texts), BATCH_TOKENS_PER_REPORT * len(report_texts), api_key
+        )
+        if content is None:
+            self.failures += len(report_texts)
+            return [None] * len(report_texts)
+
+        results = parse_batch_content(content, len(report_texts))
+        retry = [i for i, parsed in enumerate(results) if parsed is None]
+        self.fallbacks += len(retry)
+        for i, parsed in zip(retry, await asyncio.gather(*(self.parse(report_texts[i], api_key) for i in retry))):
+            results[i] = parsed
+        return results
+
+    async def parse_many(self, report_texts: list[str], api_key: Optional[str] = None) -> list[Optional[dict]]:
+        """
+        Parse reports concurrently, within the client's limits. Results are in input order.
+
+        With llm_batch_size above 1, reports are packed into batched requests
+        of up to that many reports and BATCH_MAX_CHARS of text.
+        """
+        if settings.llm_batch_size <= 1:
+            return await asyncio.gather(*(self.parse(text, api_key) for text in report_texts))
+
+        batches: list[list[int]] = []
+        chars = 0
+        for i, text in enumerate(report_texts):
+            if not batches or len(batches[-1]) >= settings.llm_batch_size or chars + len(text) > BATCH_MAX_CHARS:
+                batches.append([])
+                chars = 0
+            batches[-1].append(i)
+            chars += len(text)
+
+        results: list[Optional[dict]] = [None] * len(report_texts)
+        parsed_batches = await asyncio.gather(
+            *(self.parse_batch([report_texts[i] for i in batch], api_key) for batch in batches)
+        )
+        for batch, parsed in zip(batches, parsed_batches):
+            for i, result in zip(batch, parsed):
+                results[i] = result
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batch_requests": self.batch_requests,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+            "http_attempts": self.transport.attempts,
+            "http_retries": self.transport.retries,
+            "tokens_used": self.tokens_used
+        }
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """The process-wide client, created on first use"""
+    global _client
+    if _client is None:
+        _client = LLMClient()
+    return _client
+
+
+async def close_llm_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def parse_trip_report(report_text: str, api_key: str) -> Optional[dict]:
+    """Parse trip report using Groq LLM, return structured data"""
+    return await get_llm_client().parse(report_text, api_key)
@@ -0,0 +1,179 @@
+import asyncio
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Optional
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, update, tuple_, func
+
+from app.config import settings
+from app.models.nws_gridpoint import NwsGridpoint
+from app.utils.batching import chunked, LOOKUP_CHUNK
+
+
+# The points API works at 4 decimal places and redirects anything finer
+COORDINATE_PRECISION = Decimal("0.0001")
+
+GridCell = tuple[str, int, int]
+
+
+def nws_headers() -> dict:
+    return {"User-Agent": settings.nws_user_agent}
+
+
+def gridpoint_key(lat, lon) -> tuple[Decimal, Decimal]:
+    return (
+        Decimal(str(lat)).quantize(COORDINATE_PRECISION),
+        Decimal(str(lon)).quantize(COORDINATE_PRECISION)
+    )
+
+
+def grid_cell(gridpoint: NwsGridpoint) -> GridCell:
+    return (gridpoint.grid_id, gridpoint.grid_x, gridpoint.grid_y)
+
+
+async def get_cached_gridpoints(db: AsyncSession, keys) -> dict[tuple[Decimal, Decimal], NwsGridpoint]:
+    gridpoints = {}
+    for chunk in chunked(keys, LOOKUP_CHUNK):
+        result = await db.execute(
+            select(NwsGridpoint).where(tuple_(NwsGridpoint.lat, NwsGridpoint.lon).in_(chunk))
+        )
+        gridpoints.update({(g.lat, g.lon): g for g in result.scalars().all()})
+    return gridpoints
+
+
+async def minutes_since_checked(db: AsyncSession, keys) -> dict[tuple[Decimal, Decimal], Optional[float]]:
+    """
+    Minutes since each cached coordinate's forecast was last confirmed
+    current, or None if it never was. Computed by the database, against the
+    same clock that wrote checked_at.
+    """
+    age = func.extract("epoch", func.now() - NwsGridpoint.checked_at) / 60
+    ages = {}
+    for chunk in chunked(keys, LOOKUP_CHUNK):
+        result = await db.execute(
+            select(NwsGridpoint.lat, NwsGridpoint.lon, age).where(
+                tuple_(NwsGridpoint.lat, NwsGridpoint.lon).in_(chunk)
+            )
+        )
+        ages.update({(lat, lon): None if minutes is None else float(minutes) for lat, lon, minutes in result.all()})
+    return ages
+
+
+async def cell_coordinates(db: AsyncSession, cells) -> set[tuple[Decimal, Decimal]]:
+    """Every cached coordinate that falls in one of these grid cells"""
+    keys = set()
+    for chunk in chunked(cells, LOOKUP_CHUNK):
+        result = await db.execute(
+            select(NwsGridpoint.lat, NwsGridpoint.lon).where(
+                tuple_(NwsGridpoint.grid_id, NwsGridpoint.grid_x, NwsGridpoint.grid_y).in_(chunk)
+            )
+        )
+        keys.update((lat, lon) for lat, lon in result.all())
+    return keys
+
+
+async def lookup_gridpoint(client: httpx.AsyncClient, lat: Decimal, lon: Decimal) -> Optional[NwsGridpoint]:
+    """Ask the NWS points API which grid cell a coordinate is in. Returns an unsaved NwsGridpoint."""
+    response = await client.get(f"{settings.nws_api_url}/points/{lat},{lon}", headers=nws_headers(), timeout=10.0)
+    if response.status_code != 200:
+        return None
+
+    properties = response.json().get("properties", {})
+    if not properties.get("forecastHourly") or not properties.get("gridId"):
+        return None
+
+    return NwsGridpoint(
+        lat=lat,
+        lon=lon,
+        grid_id=properties["gridId"],
+        grid_x=properties.get("gridX"),
+        grid_y=properties.get("gridY"),
+        forecast_hourly_url=properties["forecastHourly"]
+    )
+
+
+async def forget_cell(db: AsyncSession, gridpoint: NwsGridpoint) -> None:
+    """Drop every cached coordinate in a cell, e.g. after NWS redrew its grid. The caller commits."""
+    await db.execute(delete(NwsGridpoint).where(
+        NwsGridpoint.grid_id == gridpoint.grid_id,
+        NwsGridpoint.grid_x == gridpoint.grid_x,
+        NwsGridpoint.grid_y == gridpoint.grid_y
+    ))
+
+
+async def mark_checked(
+    db: AsyncSession,
+    gridpoint: NwsGridpoint,
+    changed: bool,
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+    utc_offset_minutes: Optional[int] = None
+) -> None:
+    """Record a successful forecast check for every coordinate in the cell. The caller commits."""
+    values = {"checked_at": func.now()}
+    if changed:
+        values.update(changed_at=func.now(), etag=etag, last_modified=last_modified)
+    if utc_offset_minutes is not None:
+        values["utc_offset_minutes"] = utc_offset_minutes
+
+    await db.execute(update(NwsGridpoint).where(
+        NwsGridpoint.grid_id == gridpoint.grid_id,
+        NwsGridpoint.grid_x == gridpoint.grid_x,
+        NwsGridpoint.grid_y == gridpoint.grid_y
+    ).values(**values))
+
+
+@dataclass
+class RefreshPlan:
+    """Trails grouped by the grid cell whose forecast covers them"""
+    cells: dict[GridCell, tuple[NwsGridpoint, list]] = field(default_factory=dict)
+    unresolved: list = field(default_factory=list)
+    points_requests: int = 0
+
+
+async def plan_refresh(
+    client: httpx.AsyncClient,
+    db: AsyncSession,
+    trails,
+    concurrency: int = 1
+) -> RefreshPlan:
+    """
+    Group trails by NWS grid cell so each cell's forecast is fetched once.
+
+    Coordinates already in nws_gridpoints cost nothing. Every other distinct
+    coordinate is resolved with one points request, up to `concurrency` at a
+    time, and cached. Trails whose coordinate can't be resolved are returned
+    as unresolved. The caller commits.
+    """
+    trails_by_key: dict[tuple[Decimal, Decimal], list] = {}
+    for trail in trails:
+        trails_by_key.setdefault(gridpoint_key(trail.trailhead_lat, trail.trailhead_lon), []).append(trail)
+
+    plan = RefreshPlan()
+    gridpoints = await get_cached_gridpoints(db, trails_by_key.keys())
+    missing = [key for key in trails_by_key if key not in gridpoints]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def resolve(key: tuple[Decimal, Decimal]) -> Optional[NwsGridpoint]:
+        async with semaphore:
+            try:
+                return await lookup_gridpoint(client, *key)
+            except httpx.HTTPError as e:
+                print(f"Error resolving NWS gridpoint for {key}: {e}")
+                return None
+
+    plan.points_requests = len(missing)
+    for key, gridpoint in zip(missing, await asyncio.gather(*(resolve(key) for key in missing))):
+        if gridpoint is not None:
+            db.add(gridpoint)
+            gridpoints[key] = gridpoint
+
+    for key, key_trails in trails_by_key.items():
+        gridpoint = gridpoints.get(key)
+        if gridpoint is None:
+            plan.unresolved.extend(key_trails)
+        else:
+            plan.cells.setdefault(grid_cell(gridpoint), (gridpoint, []))[1].extend(key_trails)
+
+    return plan
@@ -0,0 +1,139 @@
+import hashlib
+import re
+import unicodedata
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, delete, func, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.models.llm_parse_cache import LLMParseCache
+from app.services.llm_service import PROMPT_VERSION, LLMClient
+from app.utils.batching import chunked, LOOKUP_CHUNK, ROW_CHUNK
+
+
+_WHITESPACE = re.compile(r"\s+")
+
+# New parses written between evictions, so the cache overshoots its size by at most this many
+EVICT_EVERY = 10_000
+_written_since_eviction = 0
+
+
+def normalize_report(text: str) -> str:
+    """Unicode-normalized with whitespace collapsed, so re-scraped copies of a report share a key"""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def parse_cache_key(text: str, model: Optional[str] = None, prompt_version: str = PROMPT_VERSION) -> str:
+    material = "\0".join((model or settings.llm_model, prompt_version, normalize_report(text)))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+async def get_cached_parses(db: AsyncSession, keys: list[str]) -> dict[str, dict]:
+    """Cached parses for whichever keys have one, marking them as just used"""
+    cached = {}
+    for chunk in chunked(keys, LOOKUP_CHUNK):
+        result = await db.execute(
+            select(LLMParseCache.cache_key, LLMParseCache.parsed).where(LLMParseCache.cache_key.in_(chunk))
+        )
+        hits = dict(result.all())
+        if hits:
+            await db.execute(
+                update(LLMParseCache)
+                .where(LLMParseCache.cache_key.in_(list(hits)))
+                .values(last_used_at=func.now())
+            )
+        cached.update(hits)
+    return cached
+
+
+async def store_parses(db: AsyncSession, parses: dict[str, dict]) -> None:
+    """Cache new parses by key. The caller commits."""
+    rows = [
+        {"cache_key": key, "model": settings.llm_model, "prompt_version": PROMPT_VERSION, "parsed": parsed}
+        for key, parsed in parses.items()
+    ]
+    for chunk in chunked(rows, ROW_CHUNK):
+        stmt = insert(LLMParseCache.__table__).values(chunk)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["cache_key"],
+            set_={"parsed": stmt.excluded.parsed, "last_used_at": func.now()}
+        ))
+
+
+async def evict_parse_cache(db: AsyncSession, max_entries: Optional[int] = None) -> int:
+    """
+    Delete parses made with another model or prompt version, then the least
+    recently used beyond `max_entries` (default llm_parse_cache_size). Entries
+    used in the same transaction share a timestamp, and ties at the cutoff are
+    kept. Returns the number deleted. The caller commits.
+    """
+    global _written_since_eviction
+
+    _written_since_eviction = 0
+    max_entries = settings.llm_parse_cache_size if max_entries is None else max_entries
+    stale = await db.execute(delete(LLMParseCache).where(or_(
+        LLMParseCache.model != settings.llm_model,
+        LLMParseCache.prompt_version != PROMPT_VERSION
+    )))
+
+    cutoff = await db.scalar(
+        select(LLMParseCache.last_used_at)
+        .order_by(LLMParseCache.last_used_at.desc())
+        .offset(max_entries)
+        .limit(1)
+    )
+    if cutoff is None:
+        return stale.rowcount
+    overflow = await db.execute(delete(LLMParseCache).where(LLMParseCache.last_used_at < cutoff))
+    return stale.rowcount + overflow.rowcount
+
+
+async def clear_parse_cache(db: AsyncSession, before: Optional[datetime] = None) -> int:
+    """
+    Delete every cached parse, or those created before `before`. For changes
+    PROMPT_VERSION can't see, like a fix on the provider's side. The caller commits.
+    """
+    query = delete(LLMParseCache)
+    if before is not None:
+        query = query.where(LLMParseCache.created_at < before)
+    result = await db.execute(query)
+    return result.rowcount
+
+
+async def parse_reports_cached(
+    db: AsyncSession,
+    report_texts: list[str],
+    client: LLMClient,
+    api_key: Optional[str] = None
+) -> list[Optional[dict]]:
+    """
+    client.parse_many, answering reports seen before from llm_parse_cache.
+
+    Each distinct normalized report is sent at most once and successful
+    parses are cached. The cache is trimmed to size once EVICT_EVERY new
+    parses have been written since the last trim. Results are in input
+    order. The caller commits.
+    """
+    global _written_since_eviction
+
+    keys = [parse_cache_key(text) for text in report_texts]
+    parsed = await get_cached_parses(db, list(set(keys)))
+
+    misses = {}
+    for key, text in zip(keys, report_texts):
+        if key not in parsed:
+            misses.setdefault(key, text)
+
+    if misses:
+        fresh = await client.parse_many(list(misses.values()), api_key)
+        new = {key: result for key, result in zip(misses, fresh) if result is not None}
+        if new:
+            await store_parses(db, new)
+            _written_since_eviction += len(new)
+            if _written_since_eviction >= EVICT_EVERY:
+                await evict_parse_cache(db)
+        parsed.update(new)
+
+    return [parsed.get(key) for key in keys]
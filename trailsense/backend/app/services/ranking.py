@@ -0,0 +1,74 @@
+import heapq
+from typing import Callable, Hashable, Iterable
+
+
+# How many composite-score points a perfect tag overlap costs at diversity=1.0
+SIMILARITY_PENALTY = 100
+# The reranker picks from this many times k of the best candidates
+POOL_FACTOR = 4
+
+
+def top_k(scored: Iterable[tuple[float, Hashable]], k: int) -> list[tuple[float, Hashable]]:
+    """
+    Keep the k highest-scoring items from a stream using a bounded min-heap.
+
+    Memory stays proportional to k. Ties go to the item seen first, so the
+    result matches a stable descending sort truncated to k.
+    """
+    if k <= 0:
+        return []
+
+    heap: list[tuple[float, int, Hashable]] = []
+    for seq, (score, item) in enumerate(scored):
+        entry = (score, -seq, item)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    heap.sort(reverse=True)
+    return [(score, item) for score, _, item in heap]
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def rerank_diverse(
+    pool: list[tuple[float, Hashable]],
+    k: int,
+    diversity: float,
+    tags_of: Callable[[Hashable], frozenset]
+) -> list[tuple[float, Hashable]]:
+    """
+    Maximal-marginal-relevance selection over a ranked pool.
+
+    Each step picks the candidate with the best score minus a penalty for its
+    tag overlap with anything already picked. The most-similar-so-far value
+    is updated incrementally, so each step is a single pass over the pool.
+    diversity=0 returns the pool order unchanged.
+    """
+    if diversity <= 0 or len(pool) <= 1:
+        return pool[:k]
+
+    tags = [tags_of(item) for _, item in pool]
+    max_similarity = [0.0] * len(pool)
+    remaining = list(range(len(pool)))
+    selected = []
+
+    while remaining and len(selected) < k:
+        best = max(
+            remaining,
+            key=lambda i: (pool[i][0] - diversity * SIMILARITY_PENALTY * max_similarity[i], -i)
+        )
+        remaining.remove(best)
+        selected.append(pool[best])
+
+        for i in remaining:
+            similarity = jaccard(tags[best], tags[i])
+            if similarity > max_similarity[i]:
+                max_similarity[i] = similarity
+
+    return selected
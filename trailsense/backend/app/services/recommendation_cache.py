@@ -0,0 +1,154 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.config import settings
+
+
+PROFILE_FIELDS = {
+    "fitness": ("pace", "max_hours", "max_elevation_gain"),
+    "technical": ("exposure_comfort", "scrambling_comfort"),
+    "personal": ("cold_tolerance",),
+    "location": ("lat", "lon"),
+}
+LIST_CONSTRAINTS = ("terrain_preferences", "desired_features", "avoid")
+
+
+def profile_fingerprint(user_profile: dict) -> str:
+    """Hash only the profile fields the recommendation pipeline reads"""
+    relevant = {
+        section: {key: (user_profile.get(section) or {}).get(key) for key in keys}
+        for section, keys in PROFILE_FIELDS.items()
+    }
+    relevant["gear_inventory"] = sorted(set(user_profile.get("gear_inventory") or []))
+    encoded = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()[:16]
+
+
+def normalize_constraints(constraints: dict) -> str:
+    """Canonical form of the constraints, so list order and duplicates don't split the cache"""
+    normalized = dict(constraints)
+    for key in LIST_CONSTRAINTS:
+        normalized[key] = sorted(set(normalized.get(key) or []))
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+class RecommendationCache:
+    """
+    LRU + TTL cache of results that depend on per-trail weather and conditions.
+
+    The key covers the profile fingerprint, the normalized constraints and
+    the trail catalog version, so catalog edits never serve stale trails.
+    Weather and condition changes are handled by dependency tracking instead:
+    each entry remembers every candidate trail it scored, and a new forecast
+    or condition report for a trail drops exactly the entries that saw it,
+    immediately in the writing worker and within one catalog poll elsewhere.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple, tuple[float, list[dict], frozenset[str]]] = OrderedDict()
+        self._by_trail: dict[str, set[tuple]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple) -> Optional[list[dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, results, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return list(results)
+
+    def put(self, key: tuple, results: list[dict], trail_ids) -> None:
+        if key in self._entries:
+            self._remove(key)
+
+        dependencies = frozenset(str(t) for t in trail_ids)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, list(results), dependencies)
+        for trail_id in dependencies:
+            self._by_trail.setdefault(trail_id, set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_trails(self, trail_ids) -> int:
+        """Drop every entry that scored any of these trails. Returns the number dropped."""
+        keys = set()
+        for trail_id in trail_ids:
+            keys.update(self._by_trail.get(str(trail_id), ()))
+
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._by_trail.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def _remove(self, key: tuple) -> None:
+        _, _, dependencies = self._entries.pop(key)
+        for trail_id in dependencies:
+            keys = self._by_trail.get(trail_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_trail[trail_id]
+
+
+recommendation_cache = RecommendationCache(
+    max_entries=settings.recommendation_cache_size,
+    ttl_seconds=settings.recommendation_cache_ttl_seconds
+)
+
+# Multi-day assessments of a single trail, keyed per user
+assessment_range_cache = RecommendationCache(
+    max_entries=settings.recommendation_cache_size,
+    ttl_seconds=settings.recommendation_cache_ttl_seconds
+)
+
+# Summit forecasts derived from trailhead forecasts, one window per entry
+summit_cache = RecommendationCache(
+    max_entries=settings.summit_cache_size,
+    ttl_seconds=settings.recommendation_cache_ttl_seconds
+)
+
+
+def invalidate_trails(trail_ids) -> None:
+    """Drop cached results that depend on these trails' forecasts or conditions"""
+    trail_ids = list(trail_ids)
+    recommendation_cache.invalidate_trails(trail_ids)
+    assessment_range_cache.invalidate_trails(trail_ids)
+    summit_cache.invalidate_trails(trail_ids)
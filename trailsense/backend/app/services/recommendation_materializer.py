@@ -0,0 +1,192 @@
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, union, func
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.user import User
+from app.models.assessment import Assessment
+from app.models.hike_log import HikeLog
+from app.models.precomputed_recommendation import PrecomputedRecommendation
+from app.services import data_versions
+from app.services.data_versions import get_data_version, seen_version
+from app.services.ranking import top_k, POOL_FACTOR
+from app.services.recommendation_cache import profile_fingerprint
+from app.services.recommendation_service import (
+    find_candidates,
+    select_diverse,
+    build_results,
+    get_latest_weather_columns,
+    get_latest_condition_columns,
+    get_picked_weather_and_conditions
+)
+from app.services.scoring_engine import hard_rule_confidence, composite_scores
+from app.services.trail_catalog import get_catalog
+from app.utils.batching import chunked, ROW_CHUNK
+
+
+MATERIALIZE_DAYS = 7
+# Widest drive radius a precomputed list covers; longer requests go live
+MATERIALIZE_DRIVE_MINUTES = 240
+# Users with an assessment or hike log this recent get lists precomputed
+ACTIVE_USER_DAYS = 30
+
+BROAD_CONSTRAINTS = {
+    "max_distance": float("inf"),
+    "max_elevation_gain": float("inf"),
+    "max_drive_time_minutes": MATERIALIZE_DRIVE_MINUTES
+}
+
+
+async def get_active_users(db: AsyncSession) -> list[User]:
+    cutoff = datetime.utcnow() - timedelta(days=ACTIVE_USER_DAYS)
+    active_ids = union(
+        select(Assessment.user_id).where(Assessment.created_at >= cutoff),
+        select(HikeLog.user_id).where(HikeLog.created_at >= cutoff)
+    ).subquery()
+
+    result = await db.execute(select(User).where(User.id.in_(select(active_ids.c[0]))))
+    return list(result.scalars().all())
+
+
+async def materialize_recommendations(db: AsyncSession, days: int = MATERIALIZE_DAYS) -> dict:
+    """
+    Precompute every active user's passing trails for each upcoming forecast date.
+
+    Only the constraint-independent part of the pipeline is stored: which
+    catalog rows clear the hard rules (confidence >= 50) within the widest
+    drive radius, and their confidence. Preference bonuses, tighter filters
+    and diversity are applied per request. Meant to run after each forecast
+    refresh; lists for past dates are dropped.
+    """
+    started = time.perf_counter()
+
+    catalog = await get_catalog(db)
+    matrix = catalog.matrix
+    weather_version = await get_data_version(db, data_versions.WEATHER)
+    conditions_version = await get_data_version(db, data_versions.CONDITIONS)
+    users = await get_active_users(db)
+    conditions = await get_latest_condition_columns(None, db)
+    # Candidates depend on the profile and catalog only, not the date
+    candidates = [find_candidates(catalog, user.profile or {}, BROAD_CONSTRAINTS)[0] for user in users]
+
+    today = date.today()
+    written = 0
+
+    for offset in range(days):
+        forecast_date = today + timedelta(days=offset)
+        weather = await get_latest_weather_columns(None, forecast_date, db)
+
+        values = []
+        for user, rows in zip(users, candidates):
+            user_profile = user.profile or {}
+            confidence = hard_rule_confidence(
+                matrix, rows, user_profile, user_profile.get("gear_inventory", []), weather, conditions
+            )
+            passing = confidence >= 50
+
+            values.append({
+                "user_id": user.id,
+                "forecast_date": forecast_date,
+                "profile_fingerprint": profile_fingerprint(user_profile),
+                "catalog_version": catalog.version,
+                "weather_version": weather_version,
+                "conditions_version": conditions_version,
+                "max_drive_time_minutes": MATERIALIZE_DRIVE_MINUTES,
+                "trail_rows": rows[passing].astype(np.int32).tobytes(),
+                "confidence": confidence[passing].astype(np.float32).tobytes()
+            })
+
+        for chunk in chunked(values, ROW_CHUNK):
+            stmt = insert(PrecomputedRecommendation).values(chunk)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PrecomputedRecommendation.user_id, PrecomputedRecommendation.forecast_date],
+                set_={
+                    "profile_fingerprint": stmt.excluded.profile_fingerprint,
+                    "catalog_version": stmt.excluded.catalog_version,
+                    "weather_version": stmt.excluded.weather_version,
+                    "conditions_version": stmt.excluded.conditions_version,
+                    "max_drive_time_minutes": stmt.excluded.max_drive_time_minutes,
+                    "trail_rows": stmt.excluded.trail_rows,
+                    "confidence": stmt.excluded.confidence,
+                    "computed_at": func.now()
+                }
+            )
+            await db.execute(stmt)
+        written += len(values)
+
+    await db.execute(delete(PrecomputedRecommendation).where(PrecomputedRecommendation.forecast_date < today))
+    await db.commit()
+
+    return {
+        "users": len(users),
+        "dates": days,
+        "lists_written": written,
+        "catalog_version": catalog.version,
+        "weather_version": weather_version,
+        "conditions_version": conditions_version,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+async def get_precomputed_recommendations(
+    user_id,
+    user_profile: dict,
+    constraints: dict,
+    db: AsyncSession
+) -> Optional[tuple[list[dict], dict]]:
+    """
+    Serve recommendations from the user's precomputed list, if one applies.
+
+    Returns (results, freshness) or None when there's no list for the date,
+    the profile, catalog, forecasts or condition reports changed since it
+    was computed, or the request's drive radius is wider than the list
+    covers. Lists only hold trails that passed when computed, so after a new
+    forecast or condition report re-ranking them can't bring back a trail
+    that passes now; those requests go through the cached live pipeline
+    instead. Versions are compared as this worker last polled them.
+    """
+    forecast_date = date.fromisoformat(constraints["date"])
+    record = await db.get(PrecomputedRecommendation, (user_id, forecast_date))
+    if record is None:
+        return None
+
+    catalog = await get_catalog(db)
+    if (
+        record.profile_fingerprint != profile_fingerprint(user_profile)
+        or record.catalog_version != catalog.version
+        or record.weather_version != seen_version(data_versions.WEATHER)
+        or record.conditions_version != seen_version(data_versions.CONDITIONS)
+        or constraints.get("max_drive_time_minutes", 120) > record.max_drive_time_minutes
+    ):
+        return None
+
+    stored_rows = np.frombuffer(record.trail_rows, dtype=np.int32)
+    stored_confidence = np.frombuffer(record.confidence, dtype=np.float32).astype(np.float64)
+
+    rows, drive_distances = find_candidates(catalog, user_profile, constraints)
+    precomputed = np.isin(rows, stored_rows)
+    rows, drive_distances = rows[precomputed], drive_distances[precomputed]
+    confidence = stored_confidence[np.searchsorted(stored_rows, rows)]
+
+    composite = composite_scores(catalog.matrix, rows, confidence, constraints)
+    pool = top_k(zip(composite.tolist(), range(len(rows))), constraints.get("limit", 5) * POOL_FACTOR)
+    picks = select_diverse(catalog.matrix, rows, pool, constraints)
+
+    weather_by_trail, conditions_by_trail = await get_picked_weather_and_conditions(
+        catalog.matrix, rows, picks, forecast_date, db
+    )
+    results = build_results(
+        catalog.matrix, rows, drive_distances, picks, user_profile, constraints,
+        weather_by_trail, conditions_by_trail
+    )
+
+    freshness = {
+        "source": "precomputed",
+        "computed_at": record.computed_at,
+        "weather_version": record.weather_version,
+        "conditions_version": record.conditions_version
+    }
+    return results, freshness
@@ -1,13 +1,31 @@
-from math import radians, sin, cos, sqrt, atan2
-from typing import Optional
+import asyncio
+from math import radians, degrees, sin, cos, asin, sqrt, atan2
+from typing import AsyncIterator, Optional
 from datetime import date
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.models.trail import Trail
 from app.models.weather import WeatherForecast
+from app.models.weather_daily import WeatherDaily
 from app.models.condition import TrailCondition
-from app.services.decision_engine import apply_hard_rules, generate_breakdown
+from app.services.decision_engine import apply_hard_rules, trail_rule_input
+from app.services.weather_daily import daily_summit_weather, get_daily_weather, get_daily_weather_columns
+from app.services.scoring_engine import (
+    ConditionColumns,
+    TrailMatrix,
+    WeatherColumns,
+    hard_rule_confidence,
+    composite_scores
+)
+from app.services.ranking import top_k, rerank_diverse, POOL_FACTOR
+from app.services.trail_catalog import TrailCatalog, TrailRecord, get_catalog
+from app.services.recommendation_cache import recommendation_cache, profile_fingerprint, normalize_constraints
+from app.utils.batching import chunked, LOOKUP_CHUNK
+
+
+# Streaming scores this many nearest candidates first, doubling each round
+STREAM_FIRST_CHUNK = 50
 
 
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -24,32 +42,63 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     return R * c
 
 
+def bounding_box(lat: float, lon: float, radius_miles: float) -> tuple[float, float, float, float]:
+    """
+    Return (min_lat, max_lat, min_lon, max_lon) enclosing a radius around a point.
+
+    Used to narrow the catalog's trailhead grid ahead of the exact haversine
+    check, so it only needs to be a superset of the circle.
+    """
+    R = 3959
+
+    angular_radius = radius_miles / R
+    lat_delta = degrees(angular_radius)
+    if abs(lat) + lat_delta >= 90:
+        return lat - lat_delta, lat + lat_delta, -180.0, 180.0
+
+    lon_delta = degrees(asin(min(1.0, sin(angular_radius) / cos(radians(lat)))))
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def weather_to_dict(weather: WeatherForecast) -> dict:
+    return {
+        "temperature_f": weather.temperature_f,
+        "precipitation_prob": weather.precipitation_prob,
+        "precipitation_type": weather.precipitation_type,
+        "wind_speed_mph": weather.wind_speed_mph,
+        "wind_gust_mph": weather.wind_gust_mph,
+        "sky_cover": weather.sky_cover,
+        "weather_summary": weather.weather_summary
+    }
+
+
+def condition_to_dict(condition: TrailCondition) -> dict:
+    return {
+        "trail_status": condition.trail_status,
+        "snow_level_ft": condition.snow_level_ft,
+        "mud_level": condition.mud_level,
+        "water_crossing_status": condition.water_crossing_status,
+        "hazards": condition.hazards or [],
+        "required_gear": condition.required_gear or [],
+        "difficulty_sentiment": condition.difficulty_sentiment,
+        "overall_sentiment": condition.overall_sentiment,
+        "report_date": condition.report_date
+    }
+
+
 async def get_latest_weather(
     trail_id: str,
     forecast_date: date,
     db_session: AsyncSession
 ) -> Optional[dict]:
-    """Get latest weather forecast for trail on given date"""
-    query = select(WeatherForecast).where(
-        WeatherForecast.trail_id == trail_id,
-        WeatherForecast.forecast_date == forecast_date,
-        WeatherForecast.location_type == "summit"
-    ).order_by(WeatherForecast.forecast_hour).limit(1)
+    """Get the day's summit weather for a trail: one primary-key read of weather_daily"""
+    catalog = await get_catalog(db_session)
+    trail = catalog.get(trail_id)
+    if not trail:
+        return None
 
-    result = await db_session.execute(query)
-    weather = result.scalar_one_or_none()
-
-    if weather:
-        return {
-            "temperature_f": weather.temperature_f,
-            "precipitation_prob": weather.precipitation_prob,
-            "precipitation_type": weather.precipitation_type,
-            "wind_speed_mph": weather.wind_speed_mph,
-            "wind_gust_mph": weather.wind_gust_mph,
-            "sky_cover": weather.sky_cover,
-            "weather_summary": weather.weather_summary
-        }
-    return None
+    daily = await db_session.get(WeatherDaily, (trail.id, forecast_date))
+    return daily_summit_weather(trail, daily) if daily else None
 
 
 async def get_latest_conditions(trail_id: str, db_session: AsyncSession) -> Optional[dict]:
@@ -62,21 +111,129 @@ async def get_latest_conditions(trail_id: str, db_session: AsyncSession) -> Opti
     condition = result.scalar_one_or_none()
 
     if condition:
-        return {
-            "trail_status": condition.trail_status,
-            "snow_level_ft": condition.snow_level_ft,
-            "mud_level": condition.mud_level,
-            "water_crossing_status": condition.water_crossing_status,
-            "hazards": condition.hazards or [],
-            "required_gear": condition.required_gear or [],
-            "difficulty_sentiment": condition.difficulty_sentiment,
-            "overall_sentiment": condition.overall_sentiment,
-            "report_date": condition.report_date
-        }
+        return condition_to_dict(condition)
     return None
 
 
-def generate_why(trail: Trail, constraints: dict, confidence: float) -> str:
+async def get_latest_weather_bulk(
+    trail_ids: Optional[list],
+    forecast_date: date,
+    db_session: AsyncSession
+) -> dict[str, dict]:
+    """
+    Get the day's summit weather for many trails in one query.
+
+    Same values as get_latest_weather. Pass trail_ids=None to load every trail.
+    """
+    weather = await get_daily_weather(db_session, trail_ids, [forecast_date])
+    return {trail_id: w for (trail_id, _), w in weather.items()}
+
+
+async def get_latest_weather_columns(
+    trail_ids: Optional[list],
+    forecast_date: date,
+    db_session: AsyncSession
+) -> WeatherColumns:
+    """get_latest_weather_bulk's values as columns indexed by catalog row, for hard_rule_confidence"""
+    return await get_daily_weather_columns(db_session, trail_ids, forecast_date)
+
+
+async def get_latest_weather_for_days(
+    trail_ids: list,
+    forecast_dates: list[date],
+    db_session: AsyncSession
+) -> dict[tuple[str, date], dict]:
+    """
+    Get the summit weather for every (trail, date) combination in one query.
+
+    Same values as get_latest_weather, keyed by (trail_id, forecast_date).
+    """
+    if not trail_ids or not forecast_dates:
+        return {}
+    return await get_daily_weather(db_session, trail_ids, forecast_dates)
+
+
+async def get_latest_conditions_bulk(trail_ids: Optional[list], db_session: AsyncSession) -> dict[str, dict]:
+    """Get the most recent condition report for many trails (or every trail, if None), LOOKUP_CHUNK trails per query"""
+    if trail_ids is not None and not trail_ids:
+        return {}
+
+    query = select(TrailCondition).distinct(TrailCondition.trail_id).order_by(
+        TrailCondition.trail_id,
+        TrailCondition.report_date.desc(),
+        TrailCondition.created_at.desc()
+    )
+    if trail_ids is None:
+        result = await db_session.execute(query)
+        return {str(c.trail_id): condition_to_dict(c) for c in result.scalars().all()}
+
+    conditions = {}
+    for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+        result = await db_session.execute(query.where(TrailCondition.trail_id.in_(chunk)))
+        conditions.update({str(c.trail_id): condition_to_dict(c) for c in result.scalars().all()})
+    return conditions
+
+
+async def get_latest_condition_columns(trail_ids: Optional[list], db_session: AsyncSession) -> ConditionColumns:
+    """
+    get_latest_conditions_bulk's values as columns indexed by catalog row, for hard_rule_confidence.
+
+    Reads only the fields the hard rules use.
+    """
+    matrix = (await get_catalog(db_session)).matrix
+    columns = ConditionColumns.empty(matrix.size)
+    if trail_ids is not None and not trail_ids:
+        return columns
+
+    query = select(
+        TrailCondition.trail_id,
+        TrailCondition.trail_status,
+        TrailCondition.snow_level_ft,
+        TrailCondition.required_gear
+    ).distinct(TrailCondition.trail_id).order_by(
+        TrailCondition.trail_id,
+        TrailCondition.report_date.desc(),
+        TrailCondition.created_at.desc()
+    )
+    found = []
+    if trail_ids is None:
+        found = (await db_session.execute(query)).all()
+    else:
+        for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+            found.extend((await db_session.execute(query.where(TrailCondition.trail_id.in_(chunk)))).all())
+    if not found:
+        return columns
+
+    found_ids, status, snow_level, reported_gear = zip(*found)
+    rows = np.array([matrix.row_of.get(str(trail_id), -1) for trail_id in found_ids], dtype=np.int64)
+    keep = rows >= 0
+    rows = rows[keep]
+
+    status = np.array(status, dtype=object)[keep]
+    reported_gear = [gear or [] for gear, kept in zip(reported_gear, keep) if kept]
+    columns.closed[rows] = status == "closed"
+    columns.icy_or_snowy[rows] = (status == "icy") | (status == "snowy")
+    columns.has_snow[rows] = np.nan_to_num(np.array(snow_level, dtype=np.float64)[keep], nan=0) != 0
+    columns.reported_microspikes[rows] = [("microspikes" in gear) for gear in reported_gear]
+    columns.reported_ice_axe[rows] = [("ice_axe" in gear) for gear in reported_gear]
+    return columns
+
+
+async def get_picked_weather_and_conditions(
+    matrix: TrailMatrix,
+    rows: np.ndarray,
+    picks: list[tuple[float, int]],
+    forecast_date: date,
+    db_session: AsyncSession
+) -> tuple[dict[str, dict], dict[str, dict]]:
+    """The weather and condition dicts build_results shows, loaded for the picked trails only"""
+    picked_ids = [matrix.trails[rows[pos]].id for _, pos in picks]
+    weather = await get_latest_weather_bulk(picked_ids, forecast_date, db_session)
+    conditions = await get_latest_conditions_bulk(picked_ids, db_session)
+    return weather, conditions
+
+
+def generate_why(trail: TrailRecord, constraints: dict, confidence: float) -> str:
     """Generate human-readable reason for recommendation"""
     reasons = []
 
@@ -95,13 +252,114 @@ def generate_why(trail: Trail, constraints: dict, confidence: float) -> str:
     return ". ".join(reasons) if reasons else "Solid option based on your preferences"
 
 
+def find_candidates(catalog: TrailCatalog, user_profile: dict, constraints: dict) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (catalog rows, drive distances) for trails passing the hard filters.
+
+    Filters are distance, elevation gain, difficulty and the drive radius. The
+    grid index narrows the search to the radius' bounding box before any
+    per-trail work happens.
+    """
+    matrix = catalog.matrix
+    user_lat = user_profile.get("location", {}).get("lat", 39.7392)
+    user_lon = user_profile.get("location", {}).get("lon", -104.9903)
+    max_radius = (constraints.get("max_drive_time_minutes", 120) / 60) * 45
+    min_lat, max_lat, min_lon, max_lon = bounding_box(user_lat, user_lon, max_radius)
+
+    rows = catalog.grid.rows_in_box(min_lat, max_lat, min_lon, max_lon)
+    rows = rows[
+        (matrix.distance[rows] <= constraints.get("max_distance", 30))
+        & (matrix.gain[rows] <= constraints.get("max_elevation_gain", 8000))
+    ]
+    if constraints.get("difficulty"):
+        rows = np.intersect1d(rows, catalog.rows_by_difficulty.get(constraints["difficulty"], rows[:0]))
+
+    drive_distances = matrix.distances_from(user_lat, user_lon, rows)
+    within_radius = drive_distances <= max_radius
+    return rows[within_radius], drive_distances[within_radius]
+
+
+def score_candidates(
+    matrix: TrailMatrix,
+    rows: np.ndarray,
+    user_profile: dict,
+    constraints: dict,
+    weather: WeatherColumns,
+    conditions: ConditionColumns
+) -> list[tuple[float, int]]:
+    """Score rows and return the ranked pool of (composite, index into rows) worth reranking"""
+    gear = user_profile.get("gear_inventory", [])
+    confidence = hard_rule_confidence(matrix, rows, user_profile, gear, weather, conditions)
+    composite = composite_scores(matrix, rows, confidence, constraints)
+
+    passing = np.flatnonzero(confidence >= 50)
+    return top_k(zip(composite[passing].tolist(), passing.tolist()), constraints.get("limit", 5) * POOL_FACTOR)
+
+
+def select_diverse(matrix: TrailMatrix, rows: np.ndarray, pool: list[tuple[float, int]], constraints: dict) -> list[tuple[float, int]]:
+    def trail_tags(pos: int) -> frozenset:
+        trail = matrix.trails[rows[pos]]
+        return frozenset(
+            [f"terrain:{t}" for t in trail.terrain_types]
+            + [f"feature:{f}" for f in trail.features]
+            + [f"region:{trail.region}"]
+        )
+
+    return rerank_diverse(pool, constraints.get("limit", 5), constraints.get("diversity", 0.2), trail_tags)
+
+
+def build_results(
+    matrix: TrailMatrix,
+    rows: np.ndarray,
+    drive_distances: np.ndarray,
+    picks: list[tuple[float, int]],
+    user_profile: dict,
+    constraints: dict,
+    weather_by_trail: dict[str, dict],
+    conditions_by_trail: dict[str, dict]
+) -> list[dict]:
+    gear = user_profile.get("gear_inventory", [])
+    results = []
+
+    for composite, pos in picks:
+        row = rows[pos]
+        trail = matrix.trails[row]
+        trail_id = matrix.ids[row]
+        weather = weather_by_trail.get(trail_id)
+        conditions = conditions_by_trail.get(trail_id)
+
+        confidence, concerns = apply_hard_rules(trail_rule_input(trail), user_profile, weather, conditions, gear)
+        drive_distance = float(drive_distances[pos])
+
+        results.append({
+            "trail": trail,
+            "confidence_score": confidence,
+            "composite_score": composite,
+            "drive_distance": drive_distance,
+            "drive_time_minutes": int(drive_distance / 45 * 60),
+            "concerns": concerns,
+            "weather": weather,
+            "why_recommended": generate_why(trail, constraints, confidence)
+        })
+
+    return results
+
+
+def recommendation_cache_key(user_profile: dict, constraints: dict, catalog: TrailCatalog) -> tuple:
+    return (
+        profile_fingerprint(user_profile),
+        normalize_constraints(constraints),
+        catalog.version
+    )
+
+
 async def get_recommendations(
     user_profile: dict,
     constraints: dict,
     db_session: AsyncSession
 ) -> list[dict]:
     """
-    Get top 5 trail recommendations based on user constraints.
+    Get the top `limit` trail recommendations based on user constraints.
 
     constraints = {
         "date": "2026-01-18",
@@ -111,93 +369,130 @@ async def get_recommendations(
         "terrain_preferences": ["alpine", "lake"],
         "desired_features": ["lake", "summit"],
         "avoid": ["crowds", "fees"],
-        "difficulty": "moderate"
+        "difficulty": "moderate",
+        "limit": 5,
+        "diversity": 0.2
     }
-    """
 
-    query = select(Trail).where(
-        Trail.distance_miles <= constraints.get("max_distance", 30),
-        Trail.elevation_gain_ft <= constraints.get("max_elevation_gain", 8000)
-    )
-
-    if constraints.get("difficulty"):
-        query = query.where(Trail.difficulty == constraints["difficulty"])
-
-    result = await db_session.execute(query)
-    trails = result.scalars().all()
+    diversity trades composite score for variety in terrain, features and
+    region among the results: 0 is a plain top-k, 1 strongly favours variety.
+    """
+    catalog = await get_catalog(db_session)
+    matrix = catalog.matrix
 
-    user_lat = user_profile.get("location", {}).get("lat", 39.7392)
-    user_lon = user_profile.get("location", {}).get("lon", -104.9903)
-    max_radius = (constraints.get("max_drive_time_minutes", 120) / 60) * 45
+    cache_key = recommendation_cache_key(user_profile, constraints, catalog)
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    filtered_trails = []
-    for trail in trails:
-        distance = haversine_distance(user_lat, user_lon, float(trail.trailhead_lat), float(trail.trailhead_lon))
-        if distance <= max_radius:
-            filtered_trails.append((trail, distance))
+    rows, drive_distances = find_candidates(catalog, user_profile, constraints)
 
-    scored = []
     forecast_date = date.fromisoformat(constraints["date"])
+    candidate_ids = [matrix.trails[row].id for row in rows]
+    weather = await get_latest_weather_columns(candidate_ids, forecast_date, db_session)
+    conditions = await get_latest_condition_columns(candidate_ids, db_session)
+
+    pool = score_candidates(matrix, rows, user_profile, constraints, weather, conditions)
+    picks = select_diverse(matrix, rows, pool, constraints)
+    weather_by_trail, conditions_by_trail = await get_picked_weather_and_conditions(
+        matrix, rows, picks, forecast_date, db_session
+    )
+    results = build_results(
+        matrix, rows, drive_distances, picks, user_profile, constraints, weather_by_trail, conditions_by_trail
+    )
 
-    for trail, drive_distance in filtered_trails:
-        weather = await get_latest_weather(str(trail.id), forecast_date, db_session)
-        conditions = await get_latest_conditions(str(trail.id), db_session)
-
-        trail_dict = {
-            "distance_miles": float(trail.distance_miles),
-            "elevation_gain_ft": trail.elevation_gain_ft,
-            "exposure_level": trail.exposure_level,
-            "technical_class": trail.technical_class,
-            "required_gear": trail.required_gear or []
-        }
-
-        confidence, concerns = apply_hard_rules(
-            trail_dict,
-            user_profile,
-            weather,
-            conditions,
-            user_profile.get("gear_inventory", [])
-        )
+    recommendation_cache.put(cache_key, results, candidate_ids)
+    return results
 
-        if confidence < 50:
-            continue
 
-        score = confidence
+async def stream_recommendations(
+    user_profile: dict,
+    constraints: dict,
+    db_session: AsyncSession
+) -> AsyncIterator[dict]:
+    """
+    Progressive version of get_recommendations.
 
-        terrain_prefs = set(constraints.get("terrain_preferences", []))
-        trail_terrain = set(trail.terrain_types or [])
-        if terrain_prefs and terrain_prefs.issubset(trail_terrain):
-            score += 10
+    Candidates are scored nearest-first in growing chunks while weather and
+    conditions load in the background. A provisional ranking is yielded
+    whenever it changes, followed by the final ranking once the forecast and
+    condition data are in. Each update looks like:
 
-        feature_prefs = set(constraints.get("desired_features", []))
-        trail_features = set(trail.features or [])
-        score += len(feature_prefs & trail_features) * 5
+    {"stage": "provisional" | "final", "scored": 120, "total": 900, "recommendations": [...]}
 
-        avoids = constraints.get("avoid", [])
-        if "crowds" in avoids and trail.typical_crowd_level >= 4:
-            score -= 15
-        if "fees" in avoids and trail.fee_required:
-            score -= 15
+    Provisional rankings are scored without weather or conditions. Only the
+    final one matches get_recommendations.
+    """
+    catalog = await get_catalog(db_session)
+    matrix = catalog.matrix
 
-        scored.append({
-            "trail": trail,
-            "confidence_score": confidence,
-            "composite_score": score,
-            "drive_distance": drive_distance,
-            "drive_time_minutes": int(drive_distance / 45 * 60),
-            "concerns": concerns,
-            "weather": weather,
-            "why_recommended": generate_why(trail, constraints, confidence)
-        })
+    cache_key = recommendation_cache_key(user_profile, constraints, catalog)
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        yield {"stage": "final", "scored": None, "total": None, "recommendations": cached}
+        return
 
-    scored.sort(key=lambda x: x["composite_score"], reverse=True)
+    rows, drive_distances = find_candidates(catalog, user_profile, constraints)
+    nearest_first = np.argsort(drive_distances, kind="stable")
+    rows, drive_distances = rows[nearest_first], drive_distances[nearest_first]
+    total = len(rows)
 
-    results = scored[:5]
-    if len(results) >= 3:
-        if results[0]["trail"].terrain_types == results[1]["trail"].terrain_types:
-            for i in range(2, len(scored)):
-                if scored[i]["trail"].terrain_types != results[0]["trail"].terrain_types:
-                    results[2] = scored[i]
-                    break
+    forecast_date = date.fromisoformat(constraints["date"])
+    candidate_ids = [matrix.trails[row].id for row in rows]
+
+    async def load_weather_and_conditions() -> tuple[WeatherColumns, ConditionColumns]:
+        weather = await get_latest_weather_columns(candidate_ids, forecast_date, db_session)
+        conditions = await get_latest_condition_columns(candidate_ids, db_session)
+        return weather, conditions
+
+    loading = asyncio.create_task(load_weather_and_conditions())
+    no_weather, no_conditions = WeatherColumns.empty(matrix.size), ConditionColumns.empty(matrix.size)
+    try:
+        pool: list[tuple[float, int]] = []
+        pool_size = constraints.get("limit", 5) * POOL_FACTOR
+        previous_picks = None
+        scored = 0
+        chunk_size = STREAM_FIRST_CHUNK
+
+        while scored < total and not loading.done():
+            chunk = np.arange(scored, min(scored + chunk_size, total))
+            chunk_pool = score_candidates(
+                matrix, rows[chunk], user_profile, constraints, no_weather, no_conditions
+            )
+            pool = top_k(pool + [(score, int(chunk[i])) for score, i in chunk_pool], pool_size)
+            scored += len(chunk)
+            chunk_size *= 2
+
+            picks = select_diverse(matrix, rows, pool, constraints)
+            if picks != previous_picks:
+                previous_picks = picks
+                yield {
+                    "stage": "provisional",
+                    "scored": scored,
+                    "total": total,
+                    "recommendations": build_results(
+                        matrix, rows, drive_distances, picks, user_profile, constraints, {}, {}
+                    )
+                }
+            await asyncio.sleep(0)
+
+        weather, conditions = await loading
+    finally:
+        if not loading.done():
+            loading.cancel()
+
+    # Back to catalog order so ties break exactly as in get_recommendations
+    catalog_order = np.argsort(rows)
+    rows, drive_distances = rows[catalog_order], drive_distances[catalog_order]
+
+    pool = score_candidates(matrix, rows, user_profile, constraints, weather, conditions)
+    picks = select_diverse(matrix, rows, pool, constraints)
+    weather_by_trail, conditions_by_trail = await get_picked_weather_and_conditions(
+        matrix, rows, picks, forecast_date, db_session
+    )
+    results = build_results(
+        matrix, rows, drive_distances, picks, user_profile, constraints, weather_by_trail, conditions_by_trail
+    )
 
-    return results[:5]
+    recommendation_cache.put(cache_key, results, candidate_ids)
+    yield {"stage": "final", "scored": total, "total": total, "recommendations": results}
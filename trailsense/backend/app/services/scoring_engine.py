@@ -0,0 +1,280 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+from app.services.decision_engine import PACE_MPH
+
+
+EARTH_RADIUS_MILES = 3959
+
+
+class TrailMatrix:
+    """
+    Columnar view of a set of trails for vectorized scoring.
+
+    Every per-trail attribute the decision engine and the recommendation
+    scorer look at is held as a NumPy array, and terrain types / features are
+    held as boolean membership matrices (one column per distinct tag). Row i
+    always refers to trails[i].
+    """
+
+    def __init__(self, trails: list):
+        self.trails = list(trails)
+        self.ids = [str(t.id) for t in self.trails]
+        self.row_of = {trail_id: row for row, trail_id in enumerate(self.ids)}
+        self.size = len(self.trails)
+
+        self.lat = np.array([float(t.trailhead_lat) for t in self.trails], dtype=np.float64)
+        self.lon = np.array([float(t.trailhead_lon) for t in self.trails], dtype=np.float64)
+        self.distance = np.array([float(t.distance_miles) for t in self.trails], dtype=np.float64)
+        self.gain = np.array([t.elevation_gain_ft for t in self.trails], dtype=np.float64)
+        self.exposure = np.array([_or_default(t.exposure_level, 1) for t in self.trails], dtype=np.int16)
+        self.technical = np.array([_or_default(t.technical_class, 1) for t in self.trails], dtype=np.int16)
+        self.trailhead_elevation = np.array(
+            [_or_default(t.trailhead_elevation, 0) for t in self.trails], dtype=np.float64
+        )
+        self.summit_elevation = np.array(
+            [_or_default(t.highest_point_elevation, 0) for t in self.trails], dtype=np.float64
+        )
+        self.crowd = np.array([_or_default(t.typical_crowd_level, 3) for t in self.trails], dtype=np.int16)
+        self.fee = np.array([bool(t.fee_required) for t in self.trails], dtype=bool)
+        self.needs_microspikes = np.array(
+            ["microspikes" in (t.required_gear or []) for t in self.trails], dtype=bool
+        )
+        self.needs_ice_axe = np.array(
+            ["ice_axe" in (t.required_gear or []) for t in self.trails], dtype=bool
+        )
+
+        self.terrain_vocab, self.terrain = _membership_matrix([t.terrain_types for t in self.trails])
+        self.feature_vocab, self.features = _membership_matrix([t.features for t in self.trails])
+
+    def distances_from(self, lat: float, lon: float, idx: Optional[np.ndarray] = None) -> np.ndarray:
+        """Haversine distance in miles from a point to each trailhead (or the rows in idx)"""
+        lats = self.lat if idx is None else self.lat[idx]
+        lons = self.lon if idx is None else self.lon[idx]
+        return haversine_miles(lat, lon, lats, lons)
+
+
+class TrailheadGrid:
+    """
+    Fixed-size lat/lon grid over trailhead positions.
+
+    Answers "which rows fall inside this bounding box" by visiting only the
+    cells the box overlaps, instead of scanning every trailhead.
+    """
+
+    def __init__(self, lat: np.ndarray, lon: np.ndarray, cell_degrees: float = 0.5):
+        self.cell_degrees = cell_degrees
+        self.cells: dict[tuple[int, int], np.ndarray] = {}
+
+        cell_lat = np.floor(lat / cell_degrees).astype(np.int64)
+        cell_lon = np.floor(lon / cell_degrees).astype(np.int64)
+        buckets: dict[tuple[int, int], list[int]] = {}
+        for row, key in enumerate(zip(cell_lat.tolist(), cell_lon.tolist())):
+            buckets.setdefault(key, []).append(row)
+        for key, rows in buckets.items():
+            self.cells[key] = np.array(rows, dtype=np.int64)
+
+    def rows_in_box(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        lat_range = range(int(np.floor(min_lat / self.cell_degrees)), int(np.floor(max_lat / self.cell_degrees)) + 1)
+        lon_range = range(int(np.floor(min_lon / self.cell_degrees)), int(np.floor(max_lon / self.cell_degrees)) + 1)
+
+        if len(lat_range) * len(lon_range) > len(self.cells):
+            hits = [rows for (la, lo), rows in self.cells.items() if la in lat_range and lo in lon_range]
+        else:
+            hits = [self.cells[key] for key in ((la, lo) for la in lat_range for lo in lon_range) if key in self.cells]
+
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(hits))
+
+
+def _or_default(value, default):
+    return default if value is None else value
+
+
+@dataclass(frozen=True, slots=True)
+class WeatherColumns:
+    """
+    The forecast fields the hard rules read, one array per field indexed by
+    catalog row like TrailMatrix. Rows without a forecast hold values no rule
+    fires on: no thunder, an unknown (NaN) temperature, no precipitation or gusts.
+    """
+    thunder: np.ndarray
+    temperature: np.ndarray
+    precipitation: np.ndarray
+    gust: np.ndarray
+
+    @classmethod
+    def empty(cls, size: int) -> "WeatherColumns":
+        return cls(np.zeros(size, dtype=bool), np.full(size, np.nan), np.zeros(size), np.zeros(size))
+
+    @classmethod
+    def from_dicts(cls, matrix: TrailMatrix, weather_by_trail: dict[str, dict]) -> "WeatherColumns":
+        """Columns for weather dicts keyed by trail id, as decision_engine reads them"""
+        columns = cls.empty(matrix.size)
+        for trail_id, weather in weather_by_trail.items():
+            row = matrix.row_of.get(trail_id)
+            if row is None or not weather:
+                continue
+            columns.thunder[row] = "thunder" in (weather.get("weather_summary") or "").lower()
+            if weather.get("temperature_f") is not None:
+                columns.temperature[row] = weather["temperature_f"]
+            columns.precipitation[row] = weather.get("precipitation_prob") or 0
+            columns.gust[row] = weather.get("wind_gust_mph") or 0
+        return columns
+
+
+@dataclass(frozen=True, slots=True)
+class ConditionColumns:
+    """The latest condition report fields the hard rules read, indexed by catalog row like TrailMatrix"""
+    closed: np.ndarray
+    icy_or_snowy: np.ndarray
+    has_snow: np.ndarray
+    reported_microspikes: np.ndarray
+    reported_ice_axe: np.ndarray
+
+    @classmethod
+    def empty(cls, size: int) -> "ConditionColumns":
+        return cls(*(np.zeros(size, dtype=bool) for _ in range(5)))
+
+    @classmethod
+    def from_dicts(cls, matrix: TrailMatrix, conditions_by_trail: dict[str, dict]) -> "ConditionColumns":
+        """Columns for condition dicts keyed by trail id, as decision_engine reads them"""
+        columns = cls.empty(matrix.size)
+        for trail_id, conditions in conditions_by_trail.items():
+            row = matrix.row_of.get(trail_id)
+            if row is None or not conditions:
+                continue
+            status = conditions.get("trail_status")
+            columns.closed[row] = status == "closed"
+            columns.icy_or_snowy[row] = status in ("icy", "snowy")
+            columns.has_snow[row] = bool(conditions.get("snow_level_ft"))
+            reported_gear = conditions.get("required_gear") or []
+            columns.reported_microspikes[row] = "microspikes" in reported_gear
+            columns.reported_ice_axe[row] = "ice_axe" in reported_gear
+        return columns
+
+
+def _membership_matrix(tag_lists: list) -> tuple[dict[str, int], np.ndarray]:
+    vocab: dict[str, int] = {}
+    for tags in tag_lists:
+        for tag in tags or []:
+            vocab.setdefault(tag, len(vocab))
+
+    matrix = np.zeros((len(tag_lists), len(vocab)), dtype=bool)
+    for row, tags in enumerate(tag_lists):
+        for tag in tags or []:
+            matrix[row, vocab[tag]] = True
+    return vocab, matrix
+
+
+def haversine_miles(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Vectorized haversine_distance from one point to many"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    return EARTH_RADIUS_MILES * c
+
+
+def hard_rule_confidence(
+    matrix: TrailMatrix,
+    idx: np.ndarray,
+    user_profile: dict,
+    gear: list[str],
+    weather: WeatherColumns,
+    conditions: ConditionColumns
+) -> np.ndarray:
+    """
+    Vectorized equivalent of decision_engine.apply_hard_rules.
+
+    Returns the confidence score for each row in idx; concerns are left to the
+    scalar engine, which only needs to run for the trails actually returned.
+    Weather and conditions are catalog-wide columns, read only at idx.
+    """
+    thunder, temperature = weather.thunder[idx], weather.temperature[idx]
+    precipitation, gust = weather.precipitation[idx], weather.gust[idx]
+    closed, icy_or_snowy, has_snow = conditions.closed[idx], conditions.icy_or_snowy[idx], conditions.has_snow[idx]
+    reported_microspikes = conditions.reported_microspikes[idx]
+    reported_ice_axe = conditions.reported_ice_axe[idx]
+
+    exposure = matrix.exposure[idx]
+    technical = matrix.technical[idx]
+    gain = matrix.gain[idx]
+    user_gear = set(gear or [])
+
+    fitness = user_profile.get("fitness", {})
+    technical_profile = user_profile.get("technical", {})
+    pace_mph = PACE_MPH.get(fitness.get("pace", "moderate"), 3.0)
+    max_hours = fitness.get("max_hours", 6)
+    max_gain = fitness.get("max_elevation_gain", 3000)
+    exposure_comfort = technical_profile.get("exposure_comfort", 3)
+    scrambling_comfort = technical_profile.get("scrambling_comfort", False)
+    cold_tolerance = user_profile.get("personal", {}).get("cold_tolerance", 3)
+
+    confidence = np.full(len(idx), 100.0)
+
+    def cap(mask: np.ndarray, limit: float) -> None:
+        np.minimum(confidence, np.where(mask, limit, np.inf), out=confidence)
+
+    cap(thunder & (exposure >= 3), 30)
+    cap(precipitation > 70, 60)
+    cap((gust >= 45) & (exposure >= 3), 50)
+
+    if "microspikes" not in user_gear:
+        cap((matrix.needs_microspikes[idx] | reported_microspikes) & icy_or_snowy, 25)
+
+    if "ice_axe" not in user_gear:
+        cap((matrix.needs_ice_axe[idx] | reported_ice_axe) & (technical >= 3) & has_snow, 20)
+
+    estimated_time = matrix.distance[idx] / pace_mph + gain / 2000
+    over_capacity = estimated_time > max_hours * 1.5
+    cap(over_capacity, 40)
+    cap(~over_capacity & (estimated_time > max_hours), 65)
+
+    cap(gain > max_gain * 1.3, 50)
+    cap(exposure > exposure_comfort + 1, 55)
+
+    if not scrambling_comfort:
+        cap(technical >= 2, 50)
+
+    if cold_tolerance < 3:
+        with np.errstate(invalid="ignore"):
+            confidence -= np.where(temperature < 20, 10, 0)
+
+    confidence[closed] = 0
+    return confidence
+
+
+def composite_scores(
+    matrix: TrailMatrix,
+    idx: np.ndarray,
+    confidence: np.ndarray,
+    constraints: dict
+) -> np.ndarray:
+    """Add the terrain, feature, crowd and fee adjustments on top of confidence"""
+    score = confidence.astype(np.float64)
+
+    terrain_prefs = set(constraints.get("terrain_preferences", []))
+    if terrain_prefs:
+        if terrain_prefs.issubset(matrix.terrain_vocab):
+            columns = [matrix.terrain_vocab[t] for t in terrain_prefs]
+            score += np.where(matrix.terrain[np.ix_(idx, columns)].all(axis=1), 10, 0)
+
+    feature_prefs = set(constraints.get("desired_features", []))
+    columns = [matrix.feature_vocab[f] for f in feature_prefs if f in matrix.feature_vocab]
+    if columns:
+        score += matrix.features[np.ix_(idx, columns)].sum(axis=1) * 5
+
+    avoids = constraints.get("avoid", [])
+    if "crowds" in avoids:
+        score -= np.where(matrix.crowd[idx] >= 4, 15, 0)
+    if "fees" in avoids:
+        score -= np.where(matrix.fee[idx], 15, 0)
+
+    return score
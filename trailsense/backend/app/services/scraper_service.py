@@ -1,10 +1,21 @@
+import uuid
 import httpx
 from bs4 import BeautifulSoup
+from datetime import date
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
 
-from app.services.llm_service import parse_trip_report
+from app.services.llm_service import LLMClient, get_llm_client
 from app.models.condition import TrailCondition
+from app.services import data_versions
+from app.services.data_versions import bump_data_version
+from app.services.parse_cache import parse_reports_cached
+from app.services.recommendation_cache import invalidate_trails
+from app.utils.batching import chunked, ROW_CHUNK
+
+
+MIN_CONFIDENCE = 0.5
 
 
 async def scrape_alltrails_reports(trail_name: str, limit: int = 5) -> list[str]:
@@ -18,6 +29,69 @@ async def scrape_alltrails_reports(trail_name: str, limit: int = 5) -> list[str]
     return []
 
 
+def parse_report_date(value) -> date:
+    """The report's own date if the model found a valid one, otherwise today"""
+    try:
+        return date.fromisoformat(value) if value else date.today()
+    except (TypeError, ValueError):
+        return date.today()
+
+
+def condition_row(trail_id, report_text: str, parsed: dict, source: str) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "trail_id": trail_id,
+        "report_date": parse_report_date(parsed.get("report_date")),
+        "snow_level_ft": parsed.get("snow_level_ft"),
+        "trail_status": parsed.get("trail_status"),
+        "mud_level": parsed.get("mud_level"),
+        "water_crossing_status": parsed.get("water_crossing_status"),
+        "hazards": parsed.get("hazards") or [],
+        "required_gear": parsed.get("required_gear") or [],
+        "difficulty_sentiment": parsed.get("difficulty_sentiment"),
+        "overall_sentiment": parsed.get("overall_sentiment"),
+        "raw_text": report_text,
+        "confidence": parsed.get("confidence"),
+        "source": source
+    }
+
+
+async def process_report_backlog(
+    reports: list[tuple[str, str]],
+    db_session: AsyncSession,
+    groq_api_key: Optional[str] = None,
+    client: Optional[LLMClient] = None,
+    source: str = "alltrails"
+) -> int:
+    """
+    Parse (trail_id, report_text) pairs concurrently and store the confident ones.
+
+    Reports parsed before are answered from llm_parse_cache; the rest go
+    through one pooled LLM client within its concurrency, request and token
+    limits. Rows are written with multi-row inserts and a single commit.
+    Returns the number of conditions stored.
+    """
+    client = client or get_llm_client()
+    parsed_reports = await parse_reports_cached(
+        db_session, [text for _, text in reports], client, groq_api_key
+    )
+
+    rows = [
+        condition_row(trail_id, text, parsed, source)
+        for (trail_id, text), parsed in zip(reports, parsed_reports)
+        if parsed and (parsed.get("confidence") or 0) >= MIN_CONFIDENCE
+    ]
+    for chunk in chunked(rows, ROW_CHUNK):
+        await db_session.execute(insert(TrailCondition).values(chunk))
+    if rows:
+        await bump_data_version(db_session, data_versions.CONDITIONS)
+
+    await db_session.commit()
+    if rows:
+        invalidate_trails({row["trail_id"] for row in rows})
+    return len(rows)
+
+
 async def process_and_store_reports(
     trail_id: str,
     reports: list[str],
@@ -25,29 +99,4 @@ async def process_and_store_reports(
     groq_api_key: str
 ) -> int:
     """Parse reports with LLM and store in database"""
-    stored_count = 0
-
-    for report_text in reports:
-        parsed = await parse_trip_report(report_text, groq_api_key)
-
-        if parsed and parsed.get("confidence", 0) >= 0.5:
-            condition = TrailCondition(
-                trail_id=trail_id,
-                report_date=parsed.get("report_date"),
-                snow_level_ft=parsed.get("snow_level_ft"),
-                trail_status=parsed.get("trail_status"),
-                mud_level=parsed.get("mud_level"),
-                water_crossing_status=parsed.get("water_crossing_status"),
-                hazards=parsed.get("hazards", []),
-                required_gear=parsed.get("required_gear", []),
-                difficulty_sentiment=parsed.get("difficulty_sentiment"),
-                overall_sentiment=parsed.get("overall_sentiment"),
-                raw_text=report_text,
-                confidence=parsed.get("confidence"),
-                source="alltrails"
-            )
-            db_session.add(condition)
-            stored_count += 1
-
-    await db_session.commit()
-    return stored_count
+    return await process_report_backlog([(trail_id, text) for text in reports], db_session, groq_api_key)
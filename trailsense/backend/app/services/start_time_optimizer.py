@@ -0,0 +1,235 @@
+import math
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.config import settings
+from app.models.weather import WeatherForecast
+from app.services.decision_engine import derive_features, evaluate
+from app.services.forecast_series import MISSING, HourWindow, cached_summit, load_series
+from app.services.nws_gridpoints import get_cached_gridpoints, gridpoint_key
+from app.services.trail_catalog import get_catalog
+from app.utils.batching import chunked, LOOKUP_CHUNK
+
+
+# The assessed date plus the following day, so late windows can run past midnight
+SERIES_HOURS = 48
+# Start hours considered on the assessed date
+START_HOURS = range(4, 15)
+
+
+@dataclass(frozen=True, slots=True)
+class HourlySeries:
+    """
+    Hour-by-hour forecast from midnight of the assessed date.
+
+    Uses the summit forecast for trails with both elevations and the
+    trailhead forecast otherwise. Hours with no forecast read as harmless:
+    no thunder, 0% precipitation, no gusts and an unknown (infinite)
+    temperature, so only windows `present` throughout can be trusted.
+    `utc_offset` is the forecast's own offset, None if it isn't known.
+    """
+    present: np.ndarray
+    temperature: np.ndarray
+    precipitation: np.ndarray
+    gust: np.ndarray
+    thunder: np.ndarray
+    summary_codes: np.ndarray
+    summaries: list[str]
+    utc_offset: Optional[timedelta] = None
+
+    def local_now(self) -> datetime:
+        """The current time in the forecast's local hours, as a naive datetime (UTC if unknown)"""
+        now = datetime.now(timezone.utc) + (self.utc_offset or timedelta())
+        return now.replace(tzinfo=None)
+
+    def summary(self, start: int, hours: int) -> Optional[str]:
+        """The first thunder summary in these hours, or the first hour's summary"""
+        window = slice(start, start + hours)
+        thunder = np.flatnonzero(self.thunder[window])
+        code = int(self.summary_codes[window][thunder[0] if len(thunder) else 0])
+        return None if code == MISSING else self.summaries[code]
+
+    @classmethod
+    def from_window(cls, window: HourWindow, utc_offset: Optional[timedelta] = None) -> "HourlySeries":
+        thunder_codes = [i for i, s in enumerate(window.summaries) if "thunder" in s.lower()]
+        return cls(
+            window.present,
+            np.where(window.temperature == MISSING, np.inf, window.temperature),
+            np.where(window.precipitation == MISSING, 0, window.precipitation).astype(float),
+            np.where(window.wind_gust == MISSING, 0, window.wind_gust).astype(float),
+            window.present & np.isin(window.summary_codes, thunder_codes),
+            window.summary_codes,
+            window.summaries,
+            utc_offset
+        )
+
+
+async def get_hourly_series_bulk(
+    trail_ids: list,
+    forecast_dates: list[date],
+    db_session: AsyncSession
+) -> dict[tuple[str, date], HourlySeries]:
+    """
+    Load the hourly series for every (trail, date) combination with one forecast query.
+
+    Reads the trailhead forecast across the assessed dates and the days
+    after them, and derives the summit through summit_cache. Each series
+    carries the UTC offset of its trail's grid cell.
+    """
+    if not trail_ids or not forecast_dates:
+        return {}
+
+    catalog = await get_catalog(db_session)
+    windows: dict[tuple[str, date], HourWindow] = {}
+
+    keys = {}
+    for trail_id in trail_ids:
+        trail = catalog.get(trail_id)
+        if trail is not None:
+            keys[str(trail_id)] = gridpoint_key(trail.trailhead_lat, trail.trailhead_lon)
+    gridpoints = await get_cached_gridpoints(db_session, set(keys.values()))
+    offsets = {}
+    for trail_id, key in keys.items():
+        gridpoint = gridpoints.get(key)
+        if gridpoint is not None and gridpoint.utc_offset_minutes is not None:
+            offsets[trail_id] = timedelta(minutes=gridpoint.utc_offset_minutes)
+
+    if settings.weather_storage == "series":
+        stored = await load_series(db_session, trail_ids)
+        for trail_id in trail_ids:
+            trail = catalog.get(trail_id)
+            decoded = stored.get(str(trail.id)) if trail else None
+            for d in set(forecast_dates):
+                if decoded is not None:
+                    windows[(str(trail_id), d)] = (
+                        decoded.window(trail, "summit", d, SERIES_HOURS)
+                        or decoded.window(trail, "trailhead", d, SERIES_HOURS)
+                    )
+    else:
+        days = set(forecast_dates) | {d + timedelta(days=1) for d in forecast_dates}
+        query = select(
+            WeatherForecast.trail_id,
+            WeatherForecast.forecast_date,
+            WeatherForecast.forecast_hour,
+            WeatherForecast.temperature_f,
+            WeatherForecast.precipitation_prob,
+            WeatherForecast.wind_speed_mph,
+            WeatherForecast.wind_gust_mph,
+            WeatherForecast.sky_cover,
+            WeatherForecast.weather_summary,
+            WeatherForecast.fetched_at
+        ).where(
+            WeatherForecast.location_type == "trailhead",
+            WeatherForecast.forecast_date.in_(days)
+        )
+
+        rows_by_trail: dict[str, list] = {}
+        for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+            result = await db_session.execute(query.where(WeatherForecast.trail_id.in_(chunk)))
+            for row in result.all():
+                rows_by_trail.setdefault(str(row.trail_id), []).append(row)
+
+        for trail_id in trail_ids:
+            trail = catalog.get(trail_id)
+            if trail is None:
+                continue
+            rows = rows_by_trail.get(str(trail.id), [])
+            for d in set(forecast_dates):
+                day_rows = [r for r in rows if r.forecast_date in (d, d + timedelta(days=1))]
+                trailhead = HourWindow.from_rows(day_rows, d, SERIES_HOURS)
+                fetched_at = max((r.fetched_at for r in day_rows if r.fetched_at), default=None)
+                windows[(str(trail_id), d)] = (
+                    cached_summit(trail, trailhead, (fetched_at, d, SERIES_HOURS)) or trailhead
+                )
+
+    return {
+        (str(trail_id), d): HourlySeries.from_window(
+            windows.get((str(trail_id), d)) or HourWindow.from_rows([], d, SERIES_HOURS),
+            offsets.get(str(trail_id))
+        )
+        for trail_id in trail_ids
+        for d in set(forecast_dates)
+    }
+
+
+def optimize_start_time(
+    trail: dict,
+    user_profile: dict,
+    conditions: Optional[dict],
+    gear: list[str],
+    series: HourlySeries,
+    forecast_date: date,
+    now: Optional[datetime] = None
+) -> Optional[dict]:
+    """
+    Score every candidate start hour against the weather over the whole hike.
+
+    The window for a start hour spans the Naismith duration. Each window's
+    worst weather (any thunder, the highest precipitation chance and gust,
+    the coldest hour) is found for all windows at once with a sliding view
+    over the series, then run through decision_engine's rules exactly as a
+    day's forecast would be, so hourly and daily assessments apply the same
+    policy. Only windows with a forecast for every hour are candidates, and
+    on today's date only start hours still ahead. `now` is trail-local and
+    defaults to the current time in the forecast's UTC offset. Returns the
+    best window (earliest on ties) with its evaluation and the confidence
+    curve across candidate start hours, or None if no window qualifies, in
+    which case the plain daily evaluation stands.
+    """
+    features = derive_features(trail, user_profile, None, conditions, gear)
+
+    duration = max(1, math.ceil(features.estimated_time))
+    duration = min(duration, SERIES_HOURS - START_HOURS[-1])
+    starts = slice(START_HOURS.start, START_HOURS.stop)
+
+    precipitation = sliding_window_view(series.precipitation, duration)[starts].max(axis=1)
+    gust = sliding_window_view(series.gust, duration)[starts].max(axis=1)
+    coldest = sliding_window_view(series.temperature, duration)[starts].min(axis=1)
+    covered = sliding_window_view(series.present, duration)[starts].sum(axis=1)
+
+    now = now or series.local_now()
+    hours = np.array(START_HOURS)
+    eligible = covered == duration
+    if forecast_date < now.date():
+        eligible[:] = False
+    elif forecast_date == now.date():
+        eligible &= hours * 60 >= now.hour * 60 + now.minute
+    if not eligible.any():
+        return None
+
+    # Each eligible window's worst conditions, in the shape a daily forecast has
+    evaluations = {}
+    for i in np.flatnonzero(eligible).tolist():
+        start_hour = START_HOURS[i]
+        window_weather = {
+            "temperature_f": int(coldest[i]) if np.isfinite(coldest[i]) else None,
+            "precipitation_prob": int(precipitation[i]),
+            "wind_gust_mph": int(gust[i]),
+            "weather_summary": series.summary(start_hour, duration)
+        }
+        evaluations[i] = evaluate(trail, user_profile, window_weather, conditions, gear)
+
+    best = max(evaluations, key=lambda i: (evaluations[i]["confidence"], -i))
+    start_hour = START_HOURS[best]
+    evaluation = evaluations[best]
+
+    confidence_score = float(evaluation["confidence"])
+    return {
+        "start_hour": start_hour,
+        "end_hour": (start_hour + duration) % 24,
+        "duration_hours": duration,
+        "confidence": confidence_score,
+        "recommendation": evaluation["recommendation"],
+        "concerns": evaluation["concerns"],
+        "breakdown": evaluation["breakdown"],
+        "forecast_hours": int(covered[best]),
+        "curve": [
+            {"hour": START_HOURS[i], "confidence": float(e["confidence"])}
+            for i, e in evaluations.items()
+        ]
+    }
@@ -0,0 +1,230 @@
+import asyncio
+import uuid
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta
+from typing import Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.config import settings
+from app.database import async_session_maker
+from app.models.condition import TrailCondition
+from app.models.trail import Trail
+from app.models.weather_daily import WeatherDaily
+from app.services import data_versions
+from app.services.data_versions import bump_data_version, load_data_versions
+from app.services.recommendation_cache import invalidate_trails
+from app.services.scoring_engine import TrailMatrix, TrailheadGrid
+
+
+@dataclass(frozen=True, slots=True)
+class TrailRecord:
+    """Immutable, detached copy of a Trail row with the same attribute names"""
+    id: uuid.UUID
+    name: str
+    region: Optional[str]
+    trailhead_lat: float
+    trailhead_lon: float
+    trailhead_elevation: Optional[int]
+    highest_point_elevation: Optional[int]
+    distance_miles: float
+    elevation_gain_ft: int
+    trail_type: Optional[str]
+    difficulty: Optional[str]
+    technical_class: int
+    exposure_level: int
+    terrain_types: tuple[str, ...]
+    features: tuple[str, ...]
+    typical_crowd_level: int
+    dogs_allowed: bool
+    fee_required: bool
+    best_months: tuple[int, ...]
+    estimated_time_hours: Optional[float]
+    route_description: Optional[str]
+    required_gear: tuple[str, ...]
+    photos: tuple[str, ...]
+
+    @classmethod
+    def from_model(cls, trail) -> "TrailRecord":
+        """Build from a Trail instance or a row selected with TRAIL_COLUMNS"""
+        return cls(
+            id=trail.id,
+            name=trail.name,
+            region=trail.region,
+            trailhead_lat=float(trail.trailhead_lat),
+            trailhead_lon=float(trail.trailhead_lon),
+            trailhead_elevation=trail.trailhead_elevation,
+            highest_point_elevation=trail.highest_point_elevation,
+            distance_miles=float(trail.distance_miles),
+            elevation_gain_ft=trail.elevation_gain_ft,
+            trail_type=trail.trail_type,
+            difficulty=trail.difficulty,
+            technical_class=1 if trail.technical_class is None else trail.technical_class,
+            exposure_level=1 if trail.exposure_level is None else trail.exposure_level,
+            terrain_types=tuple(trail.terrain_types or ()),
+            features=tuple(trail.features or ()),
+            typical_crowd_level=3 if trail.typical_crowd_level is None else trail.typical_crowd_level,
+            dogs_allowed=bool(trail.dogs_allowed),
+            fee_required=bool(trail.fee_required),
+            best_months=tuple(trail.best_months or ()),
+            estimated_time_hours=float(trail.estimated_time_hours) if trail.estimated_time_hours else None,
+            route_description=trail.route_description,
+            required_gear=tuple(trail.required_gear or ()),
+            photos=tuple(trail.photos or ())
+        )
+
+
+TRAIL_COLUMNS = [Trail.__table__.c[f.name] for f in fields(TrailRecord)]
+
+
+class TrailCatalog:
+    """
+    Process-local snapshot of every trail, built once and never mutated.
+
+    Records are held in name order, with lookups by id, difficulty and region
+    plus the columnar matrix and trailhead grid used by recommendations. A new
+    snapshot replaces the old one whenever the catalog version changes.
+    """
+
+    def __init__(self, records: list[TrailRecord], version: int):
+        self.version = version
+        self.records = tuple(records)
+        self.by_id = {str(r.id): r for r in self.records}
+
+        by_difficulty: dict[str, list[int]] = {}
+        by_region: dict[str, list[int]] = {}
+        for row, record in enumerate(self.records):
+            if record.difficulty:
+                by_difficulty.setdefault(record.difficulty, []).append(row)
+            if record.region:
+                by_region.setdefault(record.region, []).append(row)
+        self.rows_by_difficulty = {k: np.array(v, dtype=np.int64) for k, v in by_difficulty.items()}
+        self.rows_by_region = {k: np.array(v, dtype=np.int64) for k, v in by_region.items()}
+
+        self.matrix = TrailMatrix(self.records)
+        self.grid = TrailheadGrid(self.matrix.lat, self.matrix.lon)
+
+    def get(self, trail_id) -> Optional[TrailRecord]:
+        try:
+            return self.by_id.get(str(uuid.UUID(str(trail_id))))
+        except ValueError:
+            return None
+
+    def search(
+        self,
+        search: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        region: Optional[str] = None,
+        max_distance: Optional[float] = None
+    ) -> list[TrailRecord]:
+        if difficulty:
+            rows = self.rows_by_difficulty.get(difficulty, np.empty(0, dtype=np.int64))
+        else:
+            rows = np.arange(len(self.records))
+        if region:
+            rows = np.intersect1d(rows, self.rows_by_region.get(region, np.empty(0, dtype=np.int64)))
+        if max_distance:
+            rows = rows[self.matrix.distance[rows] <= max_distance]
+
+        records = [self.records[row] for row in rows]
+        if search:
+            # Case-insensitive like the ILIKE filter it replaces
+            needle = search.casefold()
+            records = [r for r in records if needle in r.name.casefold()]
+        return records
+
+
+_catalog: Optional[TrailCatalog] = None
+
+# Where each counter's writes land, as (trail id, written at) columns
+CHANGE_SOURCES = {
+    data_versions.WEATHER: (WeatherDaily.trail_id, WeatherDaily.fetched_at),
+    data_versions.CONDITIONS: (TrailCondition.trail_id, TrailCondition.created_at),
+}
+# Changes are read back this far before the last check, to catch rows from
+# transactions that were still open when it ran
+CHANGE_OVERLAP = timedelta(minutes=5)
+
+_changes_checked_at: Optional[datetime] = None
+
+
+async def load_catalog(db: AsyncSession) -> TrailCatalog:
+    """Build a fresh snapshot from the database and make it the current catalog"""
+    global _catalog
+
+    version = (await load_data_versions(db)).get(data_versions.TRAILS, 0)
+    result = await db.execute(select(*TRAIL_COLUMNS).order_by(Trail.name, Trail.id))
+    records = [TrailRecord.from_model(row) for row in result.all()]
+
+    _catalog = TrailCatalog(records, version)
+    return _catalog
+
+
+async def get_catalog(db: AsyncSession) -> TrailCatalog:
+    """Return the current snapshot, loading it on first use"""
+    if _catalog is None:
+        return await load_catalog(db)
+    return _catalog
+
+
+async def bump_catalog_version(db: AsyncSession) -> int:
+    """Mark the trail catalog as changed so every worker reloads it. The caller commits."""
+    return await bump_data_version(db, data_versions.TRAILS)
+
+
+async def invalidate_changed_trails(db: AsyncSession, previous: dict[str, int], current: dict[str, int]) -> int:
+    """
+    Drop cached results for trails whose weather or conditions any process changed.
+
+    Only runs its queries when the weather or conditions counter moved: the
+    trails with forecasts or condition reports written since the previous
+    check go through invalidate_trails, so other processes' writes reach this
+    worker's caches within one poll and only for the trails they touched.
+    Returns the number of trails invalidated.
+    """
+    global _changes_checked_at
+
+    moved = [name for name in CHANGE_SOURCES if current.get(name, 0) != previous.get(name, 0)]
+    if _changes_checked_at is not None and not moved:
+        return 0
+
+    checked_at = (await db.execute(select(func.localtimestamp()))).scalar()
+    trail_ids = set()
+    if _changes_checked_at is not None:
+        since = _changes_checked_at - CHANGE_OVERLAP
+        for name in moved:
+            trail_id, written_at = CHANGE_SOURCES[name]
+            result = await db.execute(select(trail_id).where(written_at > since).distinct())
+            trail_ids.update(result.scalars().all())
+        invalidate_trails(trail_ids)
+    _changes_checked_at = checked_at
+    return len(trail_ids)
+
+
+async def refresh_catalog_if_stale() -> bool:
+    """
+    Reload the snapshot if another worker bumped the version. Returns True on reload.
+
+    Reads every data version counter while it's at it, and drops cached
+    results for trails whose weather or conditions changed since.
+    """
+    async with async_session_maker() as session:
+        previous = {name: data_versions.seen_version(name) for name in CHANGE_SOURCES}
+        versions = await load_data_versions(session)
+        await invalidate_changed_trails(session, previous, versions)
+        version = versions.get(data_versions.TRAILS, 0)
+        if _catalog is not None and _catalog.version == version:
+            return False
+        await load_catalog(session)
+        return True
+
+
+async def poll_catalog_version() -> None:
+    """Background task that keeps this worker's snapshot and version counters in step with the database"""
+    while True:
+        await asyncio.sleep(settings.catalog_poll_seconds)
+        try:
+            await refresh_catalog_if_stale()
+        except Exception as e:
+            print(f"Error refreshing trail catalog: {e}")
@@ -1,46 +1,49 @@
+import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from typing import Optional
 
 from app.models.trail import Trail
+from app.services.trail_catalog import TrailRecord, get_catalog, load_catalog, bump_catalog_version
 
 
 async def get_trails(
     db: AsyncSession,
     search: Optional[str] = None,
     difficulty: Optional[str] = None,
+    region: Optional[str] = None,
     max_distance: Optional[float] = None,
     limit: int = 50,
     offset: int = 0
-) -> tuple[list[Trail], int]:
-    query = select(Trail)
+) -> tuple[list[TrailRecord], int]:
+    catalog = await get_catalog(db)
+    trails = catalog.search(search=search, difficulty=difficulty, region=region, max_distance=max_distance)
 
-    if search:
-        query = query.where(Trail.name.ilike(f"%{search}%"))
-    if difficulty:
-        query = query.where(Trail.difficulty == difficulty)
-    if max_distance:
-        query = query.where(Trail.distance_miles <= max_distance)
+    return trails[offset:offset + limit], len(trails)
 
-    count_query = select(func.count()).select_from(query.subquery())
-    count_result = await db.execute(count_query)
-    total_count = count_result.scalar()
 
-    query = query.limit(limit).offset(offset)
-    result = await db.execute(query)
-    trails = result.scalars().all()
+async def get_trail_by_id(db: AsyncSession, trail_id: str) -> Optional[TrailRecord]:
+    catalog = await get_catalog(db)
+    trail = catalog.get(trail_id)
+    if trail:
+        return trail
 
-    return list(trails), total_count
+    try:
+        trail_uuid = uuid.UUID(str(trail_id))
+    except ValueError:
+        return None
 
-
-async def get_trail_by_id(db: AsyncSession, trail_id: str) -> Optional[Trail]:
-    result = await db.execute(select(Trail).where(Trail.id == trail_id))
-    return result.scalars().first()
+    # Another worker may have created it since our last catalog refresh
+    result = await db.execute(select(Trail).where(Trail.id == trail_uuid))
+    row = result.scalars().first()
+    return TrailRecord.from_model(row) if row else None
 
 
 async def create_trail(db: AsyncSession, trail_data: dict) -> Trail:
     trail = Trail(**trail_data)
     db.add(trail)
+    await bump_catalog_version(db)
     await db.commit()
     await db.refresh(trail)
+    await load_catalog(db)
     return trail
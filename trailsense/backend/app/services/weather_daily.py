@@ -0,0 +1,210 @@
+from datetime import date
+from typing import Optional
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.weather_daily import WeatherDaily
+from app.services.forecast_series import (
+    GUST_MULTIPLIER,
+    LAPSE_RATE_F_PER_1000_FT,
+    MISSING,
+    SUMMIT_WIND_MULTIPLIER,
+    ParsedForecast,
+    has_summit,
+    summit_temperature_drop
+)
+from app.services.scoring_engine import WeatherColumns
+from app.services.trail_catalog import get_catalog
+from app.utils.batching import chunked, LOOKUP_CHUNK
+
+
+def summarize_days(forecast: ParsedForecast) -> list[dict]:
+    """
+    Per-day aggregates of a parsed trailhead forecast, without trail_id.
+
+    Computed once per forecast, since every trail in a grid cell shares it.
+    Hours without a temperature are left out of its low and high.
+    """
+    dates = np.array([d.toordinal() for d in forecast.dates])
+    thunder = np.array(["thunder" in (s or "").lower() for s in forecast.summaries])
+    gusts = np.trunc(forecast.wind_speed * GUST_MULTIPLIER).astype(np.int64)
+
+    days = []
+    for ordinal in np.unique(dates):
+        hours = np.flatnonzero(dates == ordinal)
+        day_thunder = hours[thunder[hours]]
+        summary_hour = day_thunder[0] if len(day_thunder) else hours[0]
+        temperatures = forecast.temperature[hours]
+        temperatures = temperatures[temperatures != MISSING]
+        days.append({
+            "forecast_date": date.fromordinal(int(ordinal)),
+            "temperature_min": int(temperatures.min()) if len(temperatures) else None,
+            "temperature_max": int(temperatures.max()) if len(temperatures) else None,
+            "precipitation_max": int(forecast.precipitation[hours].max()),
+            "wind_speed_max": int(forecast.wind_speed[hours].max()),
+            "wind_gust_max": int(gusts[hours].max()),
+            "has_thunder": bool(len(day_thunder)),
+            "weather_summary": forecast.summaries[summary_hour],
+            "hours": len(hours)
+        })
+    return days
+
+
+def upsert_daily(rows: list[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE keyed on (trail_id, forecast_date)"""
+    stmt = insert(WeatherDaily.__table__).values(rows)
+    set_ = {
+        column: stmt.excluded[column]
+        for column in (
+            "temperature_min", "temperature_max", "precipitation_max", "wind_speed_max",
+            "wind_gust_max", "has_thunder", "weather_summary", "hours"
+        )
+    }
+    set_["fetched_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=["trail_id", "forecast_date"], set_=set_)
+
+
+async def rebuild_daily_from_rows(db: AsyncSession) -> int:
+    """
+    Recompute every current aggregate from the hourly weather_forecasts rows,
+    e.g. after loading rows in bulk. The caller commits.
+    """
+    await db.execute(delete(WeatherDaily))
+    result = await db.execute(text("""
+        INSERT INTO weather_daily (
+            trail_id, forecast_date, temperature_min, temperature_max, precipitation_max,
+            wind_speed_max, wind_gust_max, has_thunder, weather_summary, hours, fetched_at
+        )
+        SELECT
+            trail_id,
+            forecast_date,
+            min(temperature_f),
+            max(temperature_f),
+            max(precipitation_prob),
+            max(wind_speed_mph),
+            max(wind_gust_mph),
+            coalesce(bool_or(weather_summary ILIKE '%thunder%'), false),
+            (array_agg(weather_summary ORDER BY coalesce(weather_summary ILIKE '%thunder%', false) DESC, forecast_hour))[1],
+            count(*),
+            max(fetched_at)
+        FROM weather_forecasts
+        WHERE location_type = 'trailhead' AND forecast_date >= CURRENT_DATE
+        GROUP BY trail_id, forecast_date
+    """))
+    return result.rowcount
+
+
+async def prune_past_daily(db: AsyncSession, before: Optional[date] = None) -> int:
+    """Delete aggregates for dates before `before` (default today). The caller commits."""
+    result = await db.execute(delete(WeatherDaily).where(WeatherDaily.forecast_date < (before or date.today())))
+    return result.rowcount
+
+
+def daily_summit_weather(trail, daily: WeatherDaily) -> Optional[dict]:
+    """
+    A day's summit conditions in the shape of recommendation_service.weather_to_dict,
+    or None for a trail without both elevations.
+
+    temperature_f is the day's low and precipitation_prob, wind and gusts its
+    highs, so the rules see the worst of the day rather than one hour. Gusts
+    scale the stored wind_gust_max, the same aggregate the trailhead reports.
+    """
+    if not has_summit(trail):
+        return None
+
+    drop = summit_temperature_drop(trail.trailhead_elevation, trail.highest_point_elevation)
+    wind = int(daily.wind_speed_max * SUMMIT_WIND_MULTIPLIER) if daily.wind_speed_max is not None else None
+    gust = int(daily.wind_gust_max * SUMMIT_WIND_MULTIPLIER) if daily.wind_gust_max is not None else None
+    return {
+        "temperature_f": daily.temperature_min - drop if daily.temperature_min is not None else None,
+        "temperature_max_f": daily.temperature_max - drop if daily.temperature_max is not None else None,
+        "precipitation_prob": daily.precipitation_max,
+        "precipitation_type": None,
+        "wind_speed_mph": wind,
+        "wind_gust_mph": gust,
+        "sky_cover": None,
+        "weather_summary": daily.weather_summary,
+        "has_thunder": daily.has_thunder
+    }
+
+
+async def get_daily_weather(
+    db: AsyncSession,
+    trail_ids: Optional[list],
+    forecast_dates: list[date]
+) -> dict[tuple[str, date], dict]:
+    """Summit weather for each (trail, date), read from weather_daily LOOKUP_CHUNK trails per query"""
+    if trail_ids is not None and not trail_ids:
+        return {}
+
+    query = select(WeatherDaily).where(WeatherDaily.forecast_date.in_(set(forecast_dates)))
+    rows = []
+    if trail_ids is None:
+        rows = (await db.execute(query)).scalars().all()
+    else:
+        for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+            result = await db.execute(query.where(WeatherDaily.trail_id.in_(chunk)))
+            rows.extend(result.scalars().all())
+
+    catalog = await get_catalog(db)
+    weather = {}
+    for daily in rows:
+        trail = catalog.get(daily.trail_id)
+        summit = daily_summit_weather(trail, daily) if trail else None
+        if summit:
+            weather[(str(daily.trail_id), daily.forecast_date)] = summit
+    return weather
+
+
+async def get_daily_weather_columns(
+    db: AsyncSession,
+    trail_ids: Optional[list],
+    forecast_date: date
+) -> WeatherColumns:
+    """
+    get_daily_weather's values for one date as WeatherColumns over the catalog.
+
+    Reads only the aggregates the hard rules use and applies the summit
+    adjustments to whole columns, so no per-trail dict is built.
+    """
+    matrix = (await get_catalog(db)).matrix
+    columns = WeatherColumns.empty(matrix.size)
+    if trail_ids is not None and not trail_ids:
+        return columns
+
+    query = select(
+        WeatherDaily.trail_id,
+        WeatherDaily.temperature_min,
+        WeatherDaily.precipitation_max,
+        WeatherDaily.wind_gust_max,
+        WeatherDaily.has_thunder
+    ).where(WeatherDaily.forecast_date == forecast_date)
+    found = []
+    if trail_ids is None:
+        found = (await db.execute(query)).all()
+    else:
+        for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+            found.extend((await db.execute(query.where(WeatherDaily.trail_id.in_(chunk)))).all())
+    if not found:
+        return columns
+
+    found_ids, temperature_min, precipitation_max, gust_max, has_thunder = zip(*found)
+    rows = np.array([matrix.row_of.get(str(trail_id), -1) for trail_id in found_ids], dtype=np.int64)
+    # Only trails in the catalog with both elevations have a summit forecast
+    keep = rows >= 0
+    keep[keep] = (matrix.trailhead_elevation[rows[keep]] != 0) & (matrix.summit_elevation[rows[keep]] != 0)
+    rows = rows[keep]
+
+    drop = np.trunc(
+        (matrix.summit_elevation[rows] - matrix.trailhead_elevation[rows]) / 1000 * LAPSE_RATE_F_PER_1000_FT
+    )
+    # None reads as NaN in a float array
+    columns.temperature[rows] = np.array(temperature_min, dtype=np.float64)[keep] - drop
+    columns.precipitation[rows] = np.nan_to_num(np.array(precipitation_max, dtype=np.float64)[keep], nan=0)
+    columns.gust[rows] = np.nan_to_num(
+        np.trunc(np.array(gust_max, dtype=np.float64)[keep] * SUMMIT_WIND_MULTIPLIER), nan=0
+    )
+    columns.thunder[rows] = np.array(has_thunder, dtype=bool)[keep]
+    return columns
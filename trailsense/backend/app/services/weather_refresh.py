@@ -0,0 +1,396 @@
+import asyncio
+import time
+from datetime import datetime, date, timedelta
+from typing import Optional
+import httpx
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.database import engine, async_session_maker
+from app.models.nws_gridpoint import NwsGridpoint
+from app.services import data_versions
+from app.services.data_versions import bump_data_version
+from app.services.nws_gridpoints import (
+    COORDINATE_PRECISION,
+    nws_headers,
+    plan_refresh,
+    forget_cell,
+    mark_checked,
+    minutes_since_checked,
+    cell_coordinates,
+    gridpoint_key
+)
+from app.services.recommendation_cache import invalidate_trails
+from app.services.recommendation_materializer import materialize_recommendations
+from app.services.trail_catalog import TrailCatalog, get_catalog
+from app.services.weather_service import store_forecast, prune_past_forecasts, forecast_written_at, forecast_utc_offset
+from app.utils.rate_limit import TokenBucket, RetryingTransport
+
+
+# Outcomes of refreshing one grid cell
+UPDATED = "updated"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+# NWS hourly forecasts reach about this far ahead; refreshing won't fill later dates
+FORECAST_HORIZON = timedelta(days=7)
+
+# Stats from the most recent full-catalog run in this process
+last_refresh: Optional[dict] = None
+
+# Session-level advisory lock held by the one worker that runs scheduled refreshes
+REFRESH_LOCK_KEY = 7_303_540
+
+# Refreshes started from the request path, by the trailhead's gridpoint_key
+_in_flight: dict[tuple, asyncio.Task] = {}
+# Shared by every on-demand refresh so bursts of them stay under the NWS rate limit
+_on_demand_bucket: Optional[TokenBucket] = None
+
+
+def make_nws_client(
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    bucket: Optional[TokenBucket] = None
+) -> tuple[httpx.AsyncClient, RetryingTransport]:
+    """
+    One keep-alive client for a whole run, rate limited and retrying.
+
+    `transport` replaces the network layer underneath the rate limiting and
+    retries, e.g. to run against a stand-in server in-process. `bucket`
+    shares a rate limit with other clients; by default each client gets its
+    own.
+    """
+    if transport is None:
+        concurrency = settings.weather_refresh_concurrency
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        )
+    retrying = RetryingTransport(
+        transport,
+        bucket or TokenBucket(settings.nws_requests_per_second, settings.weather_refresh_concurrency),
+        max_retries=settings.nws_max_retries
+    )
+    client = httpx.AsyncClient(transport=retrying, headers=nws_headers(), timeout=10.0)
+    return client, retrying
+
+
+async def refresh_cell(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    gridpoint: NwsGridpoint,
+    trails: list,
+    conditional: bool = True
+) -> tuple[str, int, float]:
+    """
+    Fetch one cell's forecast and store it for its trails.
+
+    When `conditional`, sends the validators from the last 200, so an
+    unchanged forecast comes back as a 304 and only the check time is
+    written. Each cell uses its own session; a bad response body or a failed
+    write rolls it back and counts as FAILED. Returns (outcome, rows written,
+    seconds spent writing).
+    """
+    headers = {}
+    if conditional and gridpoint.etag:
+        headers["If-None-Match"] = gridpoint.etag
+    if conditional and gridpoint.last_modified:
+        headers["If-Modified-Since"] = gridpoint.last_modified
+
+    async with semaphore:
+        try:
+            response = await client.get(gridpoint.forecast_hourly_url, headers=headers)
+        except httpx.HTTPError as e:
+            print(f"Error fetching NWS forecast for {gridpoint.forecast_hourly_url}: {e}")
+            return FAILED, 0, 0.0
+
+        async with async_session_maker() as db:
+            started = time.perf_counter()
+            try:
+                if response.status_code == 304:
+                    await mark_checked(db, gridpoint, changed=False)
+                    await db.commit()
+                    return UNCHANGED, 0, time.perf_counter() - started
+
+                if response.status_code == 404:
+                    # The grid was redrawn; resolve these coordinates again next run
+                    await forget_cell(db, gridpoint)
+                    await db.commit()
+                if response.status_code != 200:
+                    return FAILED, 0, time.perf_counter() - started
+
+                periods = response.json().get("properties", {}).get("periods", [])
+                started = time.perf_counter()
+                rows = await store_forecast(db, trails, periods)
+                await mark_checked(
+                    db, gridpoint, changed=True,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    utc_offset_minutes=forecast_utc_offset(periods)
+                )
+                await db.commit()
+                return UPDATED, rows, time.perf_counter() - started
+            except Exception as e:
+                # A malformed body or failed write costs this cell, not the run
+                await db.rollback()
+                print(f"Error storing NWS forecast for {gridpoint.forecast_hourly_url}: {e}")
+                return FAILED, 0, time.perf_counter() - started
+
+
+async def forecast_staleness(db, trails) -> dict[str, Optional[float]]:
+    """Minutes since each trail's forecast was last confirmed current, or None if it never was"""
+    keys = {str(t.id): gridpoint_key(t.trailhead_lat, t.trailhead_lon) for t in trails}
+    ages = await minutes_since_checked(db, set(keys.values()))
+
+    staleness = {}
+    for trail_id, key in keys.items():
+        age = ages.get(key)
+        staleness[trail_id] = round(age, 1) if age is not None else None
+    return staleness
+
+
+def has_current_forecast(gridpoint: NwsGridpoint, trails: list, written: dict[str, datetime]) -> bool:
+    """
+    Whether every trail in the cell has the cell's latest forecast stored.
+
+    A trail added to an existing cell, a weather_storage switch or a backfill
+    leaves trails without it; a 304 would never fill them in.
+    """
+    return all(
+        str(trail.id) in written
+        and (gridpoint.changed_at is None or written[str(trail.id)] >= gridpoint.changed_at)
+        for trail in trails
+    )
+
+
+def trails_at(catalog: TrailCatalog, keys: set[tuple]) -> list:
+    """Catalog trails whose trailhead has one of these gridpoint_keys"""
+    if not keys:
+        return []
+    pad = float(COORDINATE_PRECISION)
+    lats = [float(lat) for lat, _ in keys]
+    lons = [float(lon) for _, lon in keys]
+    rows = catalog.grid.rows_in_box(min(lats) - pad, max(lats) + pad, min(lons) - pad, max(lons) + pad)
+    return [
+        record for record in (catalog.records[row] for row in rows.tolist())
+        if gridpoint_key(record.trailhead_lat, record.trailhead_lon) in keys
+    ]
+
+
+async def run_weather_refresh(
+    trail_ids: Optional[list] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    materialize: bool = True,
+    bucket: Optional[TokenBucket] = None,
+    conditional: bool = True,
+    whole_cells: bool = False
+) -> dict:
+    """
+    Refresh forecasts for the given trails, or the whole catalog.
+
+    Trails are grouped by NWS grid cell and each cell is fetched once, at
+    most weather_refresh_concurrency at a time and nws_requests_per_second
+    overall. With `whole_cells`, every catalog trail in the given trails'
+    cells is refreshed too, since the fetch covers them anyway. Requests
+    are conditional only when `conditional` and every trail in the cell
+    already has the cell's latest forecast stored.
+    Afterwards the weather version is bumped, affected cache entries are
+    dropped and, if anything changed, precomputed recommendations are
+    rebuilt. Full-catalog runs also prune past dates. Returns run
+    statistics, including how stale each trail's forecast is.
+    """
+    global last_refresh
+
+    started = time.perf_counter()
+    client, retrying = make_nws_client(transport, bucket)
+
+    async with client:
+        async with async_session_maker() as db:
+            catalog = await get_catalog(db)
+            if trail_ids is None:
+                trails = list(catalog.records)
+            else:
+                trails = [t for t in (catalog.get(trail_id) for trail_id in trail_ids) if t]
+
+            plan = await plan_refresh(client, db, trails, concurrency=settings.weather_refresh_concurrency)
+            await db.commit()
+            if whole_cells and plan.cells:
+                # Every coordinate in these cells is cached, so this costs no points requests
+                neighbours = trails_at(catalog, await cell_coordinates(db, plan.cells.keys()))
+                plan.cells = (await plan_refresh(client, db, neighbours)).cells
+                trails = neighbours + plan.unresolved
+            written = {}
+            if conditional:
+                written = await forecast_written_at(db, None if trail_ids is None else [t.id for t in trails])
+
+        semaphore = asyncio.Semaphore(settings.weather_refresh_concurrency)
+        cells = list(plan.cells.values())
+        outcomes = await asyncio.gather(*(
+            refresh_cell(
+                client, semaphore, gridpoint, cell_trails,
+                conditional=conditional and has_current_forecast(gridpoint, cell_trails, written)
+            )
+            for gridpoint, cell_trails in cells
+        ))
+
+    updated_trails = []
+    counts = {UPDATED: 0, UNCHANGED: 0, FAILED: 0}
+    for (_, cell_trails), (outcome, _, _) in zip(cells, outcomes):
+        counts[outcome] += 1
+        if outcome == UPDATED:
+            updated_trails.extend(cell_trails)
+
+    materialized = None
+    async with async_session_maker() as db:
+        pruned = await prune_past_forecasts(db) if trail_ids is None else 0
+        if updated_trails:
+            await bump_data_version(db, data_versions.WEATHER)
+        await db.commit()
+        invalidate_trails([t.id for t in updated_trails])
+
+        if updated_trails and materialize:
+            materialized = await materialize_recommendations(db)
+
+        staleness = await forecast_staleness(db, trails)
+
+    duration = time.perf_counter() - started
+    known_ages = [age for age in staleness.values() if age is not None]
+
+    stats = {
+        "finished_at": datetime.utcnow().isoformat(),
+        "duration_ms": round(duration * 1000, 1),
+        "trails": len(trails),
+        "trails_unresolved": len(plan.unresolved),
+        "trails_updated": len(updated_trails),
+        "grid_cells": len(cells),
+        "cells_updated": counts[UPDATED],
+        "cells_unchanged": counts[UNCHANGED],
+        "cells_failed": counts[FAILED],
+        "error_rate": round(counts[FAILED] / len(cells), 4) if cells else None,
+        "points_requests": plan.points_requests,
+        "http_attempts": retrying.attempts,
+        "http_retries": retrying.retries,
+        "rows_written": sum(rows for _, rows, _ in outcomes),
+        "db_write_ms": round(sum(seconds for _, _, seconds in outcomes) * 1000, 1),
+        "rows_pruned": pruned,
+        "trails_per_second": round(len(trails) / duration, 1) if duration else None,
+        "max_staleness_minutes": max(known_ages) if known_ages else None,
+        "never_refreshed": len(staleness) - len(known_ages),
+        "staleness_minutes": staleness,
+        "materialized": materialized
+    }
+    if trail_ids is None:
+        last_refresh = stats
+    return stats
+
+
+def within_forecast_horizon(forecast_date: date) -> bool:
+    today = date.today()
+    return today <= forecast_date < today + FORECAST_HORIZON
+
+
+def is_refreshing(trail) -> bool:
+    return gridpoint_key(trail.trailhead_lat, trail.trailhead_lon) in _in_flight
+
+
+def refresh_in_background(trail, conditional: bool = True) -> bool:
+    """
+    Start refreshing a trail's forecast without waiting for it.
+
+    At most one refresh per trailhead coordinate runs at a time: while one
+    is in flight, further calls do nothing. Each refresh stores the forecast
+    for every trail in the fetched grid cell, so their requests find it
+    there instead of fetching it again. The refresh uses its own sessions
+    and a shared rate limit, and invalidates cached results when it lands.
+    Pass conditional=False when the trail is missing data, so the cell's
+    forecast is fetched in full even if it hasn't changed upstream. Returns
+    True if this call started a refresh.
+    """
+    global _on_demand_bucket
+
+    key = gridpoint_key(trail.trailhead_lat, trail.trailhead_lon)
+    if key in _in_flight:
+        return False
+
+    if _on_demand_bucket is None:
+        _on_demand_bucket = TokenBucket(settings.nws_requests_per_second, settings.weather_refresh_concurrency)
+
+    trail_id = str(trail.id)
+
+    async def refresh() -> None:
+        try:
+            await run_weather_refresh(
+                [trail_id], materialize=False, bucket=_on_demand_bucket,
+                conditional=conditional, whole_cells=True
+            )
+        except Exception as e:
+            print(f"Error refreshing weather for trail {trail_id}: {e}")
+
+    task = asyncio.create_task(refresh())
+    _in_flight[key] = task
+    task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return True
+
+
+async def acquire_refresh_lock() -> Optional[AsyncConnection]:
+    """
+    Try to become the worker that runs scheduled refreshes.
+
+    Takes REFRESH_LOCK_KEY as a session-level advisory lock on a dedicated
+    connection and returns that connection; the lock is held until it's
+    closed or the process dies. Returns None if another worker holds it.
+    """
+    connection = await engine.connect()
+    try:
+        acquired = (await connection.execute(select(func.pg_try_advisory_lock(REFRESH_LOCK_KEY)))).scalar()
+        await connection.commit()
+    except Exception:
+        await connection.close()
+        raise
+
+    if not acquired:
+        await connection.close()
+        return None
+    return connection
+
+
+async def still_leading(connection: AsyncConnection) -> bool:
+    """Whether the lock connection is alive, and so still holds the lock"""
+    try:
+        await connection.execute(select(1))
+        await connection.commit()
+        return True
+    except Exception:
+        await connection.close()
+        return False
+
+
+async def weather_refresh_loop() -> None:
+    """
+    Background task that refreshes the whole catalog every weather_refresh_interval_minutes.
+
+    Every worker runs the loop, but only the one holding the refresh
+    advisory lock refreshes. The others retry each interval, so one takes
+    over if the leader goes away.
+    """
+    lock_connection = None
+    try:
+        while True:
+            try:
+                if lock_connection is not None and not await still_leading(lock_connection):
+                    lock_connection = None
+                if lock_connection is None:
+                    lock_connection = await acquire_refresh_lock()
+
+                if lock_connection is not None:
+                    stats = await run_weather_refresh()
+                    print(
+                        f"Weather refresh: {stats['trails_updated']}/{stats['trails']} trails updated, "
+                        f"{stats['cells_unchanged']} cells unchanged, {stats['cells_failed']} failed "
+                        f"in {stats['duration_ms']} ms"
+                    )
+            except Exception as e:
+                print(f"Error refreshing weather: {e}")
+            await asyncio.sleep(settings.weather_refresh_interval_minutes * 60)
+    finally:
+        if lock_connection is not None:
+            await lock_connection.close()
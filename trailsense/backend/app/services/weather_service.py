@@ -1,46 +1,30 @@
-import httpx
 from datetime import datetime, date
 from typing import Optional
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
 
-from app.models.trail import Trail
+from app.config import settings
 from app.models.weather import WeatherForecast
-
-
-async def fetch_nws_forecast(lat: float, lon: float) -> Optional[dict]:
-    """Fetch weather forecast from National Weather Service API."""
-    async with httpx.AsyncClient() as client:
-        try:
-            points_url = f"https://api.weather.gov/points/{lat},{lon}"
-            points_response = await client.get(
-                points_url,
-                headers={"User-Agent": "TrailSense/1.0 (contact@example.com)"},
-                timeout=10.0
-            )
-
-            if points_response.status_code != 200:
-                return None
-
-            points_data = points_response.json()
-            forecast_hourly_url = points_data.get("properties", {}).get("forecastHourly")
-
-            if not forecast_hourly_url:
-                return None
-
-            forecast_response = await client.get(
-                forecast_hourly_url,
-                headers={"User-Agent": "TrailSense/1.0 (contact@example.com)"},
-                timeout=10.0
-            )
-
-            if forecast_response.status_code != 200:
-                return None
-
-            return forecast_response.json()
-        except Exception as e:
-            print(f"Error fetching NWS forecast: {e}")
-            return None
+from app.models.weather_daily import WeatherDaily
+from app.models.forecast_series import ForecastSeries
+from app.services.forecast_series import (
+    MISSING,
+    SUMMIT_WIND_MULTIPLIER,
+    GUST_MULTIPLIER,
+    ParsedForecast,
+    HourWindow,
+    summit_temperature_drop,
+    cached_summit,
+    encode_series,
+    upsert_series,
+    prune_stale_series,
+    load_series
+)
+from app.services.weather_daily import summarize_days, upsert_daily, prune_past_daily
+from app.services.trail_catalog import get_catalog
+from app.utils.batching import chunked, LOOKUP_CHUNK, ROW_CHUNK
 
 
 def calculate_summit_weather(
@@ -50,86 +34,186 @@ def calculate_summit_weather(
     trailhead_wind: int
 ) -> tuple[int, int]:
     """Calculate summit temperature and wind based on elevation difference."""
-    elevation_diff = summit_elevation - trailhead_elevation
-    temp_lapse_rate = 3.5
-    summit_temp = trailhead_temp - int((elevation_diff / 1000) * temp_lapse_rate)
-
-    wind_multiplier = 1.3
-    summit_wind = int(trailhead_wind * wind_multiplier)
+    summit_temp = trailhead_temp - summit_temperature_drop(trailhead_elevation, summit_elevation)
+    summit_wind = int(trailhead_wind * SUMMIT_WIND_MULTIPLIER)
 
     return summit_temp, summit_wind
 
 
-async def fetch_and_store_weather(db: AsyncSession, trail_id: str) -> bool:
-    """Fetch weather for a trail and store in database."""
-    trail = await db.execute(select(Trail).where(Trail.id == trail_id))
-    trail = trail.scalars().first()
+def parse_wind_mph(wind_speed: Optional[str]) -> int:
+    try:
+        return int(wind_speed.split()[0]) if wind_speed else 0
+    except (ValueError, IndexError):
+        return 0
+
+
+def parse_periods(periods: list[dict]) -> Optional[ParsedForecast]:
+    """
+    Turn NWS hourly periods into columns, or None if there are none.
+
+    A local hour repeats when DST ends; only its first period is kept, so
+    every (date, hour) slot appears once. Periods without a temperature get
+    MISSING.
+    """
+    periods = periods[:168]
+    if not periods:
+        return None
+
+    start_times = [datetime.fromisoformat(p.get("startTime").replace("Z", "+00:00")) for p in periods]
+    seen = set()
+    keep = []
+    for i, t in enumerate(start_times):
+        slot = (t.date(), t.hour)
+        if slot not in seen:
+            seen.add(slot)
+            keep.append(i)
+
+    periods = [periods[i] for i in keep]
+    start_times = [start_times[i] for i in keep]
+    return ParsedForecast(
+        dates=[t.date() for t in start_times],
+        hours=[t.hour for t in start_times],
+        temperature=np.array(
+            [MISSING if p.get("temperature") is None else p["temperature"] for p in periods], dtype=np.int64
+        ),
+        precipitation=np.array(
+            [(p.get("probabilityOfPrecipitation") or {}).get("value") or 0 for p in periods], dtype=np.int64
+        ),
+        wind_speed=np.array([parse_wind_mph(p.get("windSpeed", "0 mph")) for p in periods], dtype=np.int64),
+        summaries=[p.get("shortForecast") for p in periods]
+    )
 
-    if not trail:
-        return False
 
-    forecast_data = await fetch_nws_forecast(
-        float(trail.trailhead_lat),
-        float(trail.trailhead_lon)
+def forecast_utc_offset(periods: list[dict]) -> Optional[int]:
+    """Minutes east of UTC of the forecast's local hours, from its first period"""
+    try:
+        offset = datetime.fromisoformat(periods[0]["startTime"].replace("Z", "+00:00")).utcoffset()
+    except (IndexError, KeyError, AttributeError, ValueError):
+        return None
+    return int(offset.total_seconds() // 60) if offset is not None else None
+
+
+def build_forecast_rows(trail, forecast: ParsedForecast) -> list[dict]:
+    """
+    Turn a parsed forecast into weather_forecasts rows for one trail.
+
+    Rows are plain dicts ready for a multi-row insert, one per trailhead hour.
+    Summit conditions aren't stored; readers derive them from these rows.
+    """
+    temps = forecast.temperature.tolist()
+    precip = forecast.precipitation.tolist()
+    winds = forecast.wind_speed.tolist()
+    gusts = np.trunc(forecast.wind_speed * GUST_MULTIPLIER).astype(np.int64).tolist()
+    return [
+        {
+            "trail_id": trail.id,
+            "location_type": "trailhead",
+            "forecast_date": forecast_date,
+            "forecast_hour": hour,
+            "temperature_f": None if temps[i] == MISSING else temps[i],
+            "precipitation_prob": precip[i],
+            "wind_speed_mph": winds[i],
+            "wind_gust_mph": gusts[i],
+            "sky_cover": None,
+            "weather_summary": forecast.summaries[i]
+        }
+        for i, (forecast_date, hour) in enumerate(zip(forecast.dates, forecast.hours))
+    ]
+
+
+def upsert_forecasts(rows: list[dict]):
+    """INSERT ... ON CONFLICT DO UPDATE keyed on the forecast slot"""
+    table = WeatherForecast.__table__
+    stmt = insert(table).values(rows)
+    return stmt.on_conflict_do_update(
+        constraint="uq_weather_forecasts_slot",
+        set_={
+            "temperature_f": stmt.excluded.temperature_f,
+            "precipitation_prob": stmt.excluded.precipitation_prob,
+            "wind_speed_mph": stmt.excluded.wind_speed_mph,
+            "wind_gust_mph": stmt.excluded.wind_gust_mph,
+            "sky_cover": stmt.excluded.sky_cover,
+            "weather_summary": stmt.excluded.weather_summary,
+            "fetched_at": func.now()
+        }
     )
 
-    if not forecast_data:
-        return False
-
-    periods = forecast_data.get("properties", {}).get("periods", [])
-
-    for period in periods[:168]:
-        start_time = datetime.fromisoformat(period.get("startTime").replace("Z", "+00:00"))
-        forecast_date = start_time.date()
-        forecast_hour = start_time.hour
-
-        temp_f = period.get("temperature")
-        precip_prob = period.get("probabilityOfPrecipitation", {}).get("value") or 0
-        wind_speed = period.get("windSpeed", "0 mph")
-
-        try:
-            wind_mph = int(wind_speed.split()[0]) if wind_speed else 0
-        except (ValueError, IndexError):
-            wind_mph = 0
-
-        trailhead_forecast = WeatherForecast(
-            trail_id=trail_id,
-            location_type="trailhead",
-            forecast_date=forecast_date,
-            forecast_hour=forecast_hour,
-            temperature_f=temp_f,
-            precipitation_prob=precip_prob,
-            wind_speed_mph=wind_mph,
-            wind_gust_mph=int(wind_mph * 1.5),
-            sky_cover=None,
-            weather_summary=period.get("shortForecast")
-        )
-        db.add(trailhead_forecast)
-
-        if trail.highest_point_elevation and trail.trailhead_elevation:
-            summit_temp, summit_wind = calculate_summit_weather(
-                temp_f,
-                trail.trailhead_elevation,
-                trail.highest_point_elevation,
-                wind_mph
-            )
 
-            summit_forecast = WeatherForecast(
-                trail_id=trail_id,
-                location_type="summit",
-                forecast_date=forecast_date,
-                forecast_hour=forecast_hour,
-                temperature_f=summit_temp,
-                precipitation_prob=precip_prob,
-                wind_speed_mph=summit_wind,
-                wind_gust_mph=int(summit_wind * 1.5),
-                sky_cover=None,
-                weather_summary=period.get("shortForecast")
-            )
-            db.add(summit_forecast)
+async def prune_past_forecasts(db: AsyncSession, before: Optional[date] = None) -> int:
+    """
+    Delete forecasts and daily aggregates for dates before `before` (default
+    today), and series with nothing left after it. The caller commits.
+    """
+    result = await db.execute(
+        delete(WeatherForecast).where(WeatherForecast.forecast_date < (before or date.today()))
+    )
+    return result.rowcount + await prune_stale_series(db, before) + await prune_past_daily(db, before)
+
+
+async def forecast_written_at(db: AsyncSession, trail_ids: Optional[list]) -> dict[str, datetime]:
+    """
+    When each trail's current forecast was last written, for trails (or every
+    trail, if None) that have one from today on in both the configured
+    weather_storage layout and weather_daily. The older of the two counts.
+    """
+    today = date.today()
+    if settings.weather_storage == "series":
+        storage = select(ForecastSeries.trail_id, ForecastSeries.fetched_at)
+        storage_id = ForecastSeries.trail_id
+    else:
+        storage = select(WeatherForecast.trail_id, func.max(WeatherForecast.fetched_at)).where(
+            WeatherForecast.location_type == "trailhead",
+            WeatherForecast.forecast_date >= today
+        ).group_by(WeatherForecast.trail_id)
+        storage_id = WeatherForecast.trail_id
+    daily = select(WeatherDaily.trail_id, func.max(WeatherDaily.fetched_at)).where(
+        WeatherDaily.forecast_date >= today
+    ).group_by(WeatherDaily.trail_id)
+
+    async def latest(query, trail_id_column) -> dict[str, datetime]:
+        if trail_ids is None:
+            result = await db.execute(query)
+            return {str(trail_id): fetched_at for trail_id, fetched_at in result.all() if fetched_at}
+        written = {}
+        for chunk in chunked(trail_ids, LOOKUP_CHUNK):
+            result = await db.execute(query.where(trail_id_column.in_(chunk)))
+            written.update({str(trail_id): fetched_at for trail_id, fetched_at in result.all() if fetched_at})
+        return written
+
+    stored = await latest(storage, storage_id)
+    aggregated = await latest(daily, WeatherDaily.trail_id)
+    return {
+        trail_id: min(fetched_at, aggregated[trail_id])
+        for trail_id, fetched_at in stored.items()
+        if trail_id in aggregated
+    }
+
+
+async def store_forecast(db: AsyncSession, trails, periods: list[dict]) -> int:
+    """
+    Upsert one forecast for every trail it covers, in the configured
+    weather_storage layout, along with its weather_daily aggregates.
+    Returns the number of hourly or series rows written.
+    """
+    forecast = parse_periods(periods)
+    if forecast is None:
+        return 0
+
+    days = summarize_days(forecast)
+    daily = [{"trail_id": trail.id, **day} for trail in trails for day in days]
+    for chunk in chunked(daily, ROW_CHUNK):
+        await db.execute(upsert_daily(chunk))
 
-    await db.commit()
-    return True
+    if settings.weather_storage == "series":
+        rows = [encode_series(trail.id, forecast) for trail in trails]
+        upsert = upsert_series
+    else:
+        rows = [row for trail in trails for row in build_forecast_rows(trail, forecast)]
+        upsert = upsert_forecasts
+
+    for chunk in chunked(rows, ROW_CHUNK):
+        await db.execute(upsert(chunk))
+    return len(rows)
 
 
 async def get_weather_for_trail(
@@ -137,44 +221,37 @@ async def get_weather_for_trail(
     trail_id: str,
     target_date: date
 ) -> dict:
-    """Get weather forecasts for a trail on a specific date."""
-    trailhead_query = select(WeatherForecast).where(
-        WeatherForecast.trail_id == trail_id,
-        WeatherForecast.location_type == "trailhead",
-        WeatherForecast.forecast_date == target_date
-    ).order_by(WeatherForecast.forecast_hour)
-
-    summit_query = select(WeatherForecast).where(
-        WeatherForecast.trail_id == trail_id,
-        WeatherForecast.location_type == "summit",
-        WeatherForecast.forecast_date == target_date
-    ).order_by(WeatherForecast.forecast_hour)
-
-    trailhead_result = await db.execute(trailhead_query)
-    summit_result = await db.execute(summit_query)
-
-    trailhead_forecasts = trailhead_result.scalars().all()
-    summit_forecasts = summit_result.scalars().all()
+    """
+    Get weather forecasts for a trail on a specific date.
+
+    Summit hours are derived from the trailhead forecast (and memoized in
+    summit_cache), and are empty for trails without both elevations.
+    """
+    catalog = await get_catalog(db)
+    trail = catalog.get(trail_id)
+    if not trail:
+        return {"trailhead": [], "summit": []}
+
+    if settings.weather_storage == "series":
+        series = (await load_series(db, [trail.id])).get(str(trail.id))
+        if series is None:
+            return {"trailhead": [], "summit": []}
+        trailhead = series.window(trail, "trailhead", target_date)
+        summit = series.window(trail, "summit", target_date)
+    else:
+        result = await db.execute(
+            select(WeatherForecast).where(
+                WeatherForecast.trail_id == trail.id,
+                WeatherForecast.location_type == "trailhead",
+                WeatherForecast.forecast_date == target_date
+            )
+        )
+        rows = result.scalars().all()
+        trailhead = HourWindow.from_rows(rows, target_date)
+        fetched_at = max((r.fetched_at for r in rows if r.fetched_at), default=None)
+        summit = cached_summit(trail, trailhead, (fetched_at, target_date, 24))
 
     return {
-        "trailhead": [
-            {
-                "hour": f.forecast_hour,
-                "temperature_f": f.temperature_f,
-                "precipitation_prob": f.precipitation_prob,
-                "wind_speed_mph": f.wind_speed_mph,
-                "weather_summary": f.weather_summary
-            }
-            for f in trailhead_forecasts
-        ],
-        "summit": [
-            {
-                "hour": f.forecast_hour,
-                "temperature_f": f.temperature_f,
-                "precipitation_prob": f.precipitation_prob,
-                "wind_speed_mph": f.wind_speed_mph,
-                "weather_summary": f.weather_summary
-            }
-            for f in summit_forecasts
-        ]
+        "trailhead": trailhead.hourly(),
+        "summit": summit.hourly() if summit else []
     }
@@ -0,0 +1,17 @@
+from typing import Iterable, Iterator, TypeVar
+
+
+T = TypeVar("T")
+
+# Both keep a statement under asyncpg's limit of 32767 bind parameters
+# Values per IN (...) lookup
+LOOKUP_CHUNK = 10_000
+# Rows per multi-row insert or upsert, for rows of up to 16 columns
+ROW_CHUNK = 2_000
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split items into consecutive lists of at most `size`"""
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
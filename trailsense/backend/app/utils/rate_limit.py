@@ -0,0 +1,133 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+import httpx
+
+
+class TokenBucket:
+    """
+    Async token bucket: refills `rate` tokens per second, banking up to `capacity`.
+
+    Waiters are served in arrival order. Acquiring more than one token at a
+    time lets callers meter by cost (e.g. LLM tokens) rather than by request.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if they're available right now, without waiting. For enforcing a limit rather than obeying it."""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    def settle(self, reserved: float, actual: float) -> None:
+        """
+        Correct an acquire made on an estimate once the real cost is known:
+        unused tokens go back, and an overrun is charged, possibly leaving
+        the bucket in debt so later acquires wait it out.
+        """
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + reserved - actual)
+
+    async def acquire(self, tokens: float = 1) -> None:
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket holding {self.capacity}")
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    """Full-jitter exponential backoff: uniform over [0, min(max, base * 2^attempt)]"""
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryingTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that rate limits and retries every request it sends.
+
+    Each attempt takes a token from the bucket first. Connection errors, 429s
+    and 5xx responses are retried up to max_retries times with jittered
+    exponential backoff, or after Retry-After when the server sends one.
+    Counters for attempts and retries are kept for run statistics.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        bucket: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_seconds: float = 0.5,
+        max_backoff_seconds: float = 30.0
+    ):
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.attempts = 0
+        self.retries = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            self.attempts += 1
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.backoff_seconds, self.max_backoff_seconds)
+            else:
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = backoff_delay(attempt, self.backoff_seconds, self.max_backoff_seconds)
+                await response.aclose()
+
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(min(delay, self.max_backoff_seconds))
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -0,0 +1,156 @@
+"""
+Weather ingestion load test against the NWS stand-in.
+
+    python -m benchmarks.run seed --scale 10k --yes
+    python -m benchmarks.ingest --yes --runs 2 --latency-ms 80 --error-rate 0.02 --output ingest.json
+    python -m benchmarks.ingest --yes --url http://localhost:8100
+
+Runs full-catalog refreshes of DATABASE_URL through run_weather_refresh and
+reports throughput, upstream calls and DB write time per run. By default the
+stub from benchmarks.nws_stub runs in-process, so no network is involved;
+--url points at a separately started stub instead. Later runs exercise the
+conditional-request path: cells whose forecast hasn't changed come back as
+304s. Cached gridpoints are dropped first, since they hold forecast URLs of
+whichever server resolved them.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+import httpx
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import delete
+
+from app.config import settings
+from app.database import engine, async_session_maker
+from app.models.nws_gridpoint import NwsGridpoint
+from app.services.weather_refresh import run_weather_refresh
+from benchmarks.nws_stub import StubConfig, create_app
+
+
+IN_PROCESS_URL = "http://nws-stub"
+
+
+def stub_config(args) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        requests_per_second=args.stub_rps,
+        update_minutes=args.update_minutes,
+        fixture=args.fixture,
+        seed=args.seed
+    )
+
+
+async def fetch_stub_stats(transport: Optional[httpx.AsyncBaseTransport], base_url: str) -> dict:
+    async with httpx.AsyncClient(transport=transport, base_url=base_url) as client:
+        response = await client.get("/stats")
+        return response.json()
+
+
+def stats_delta(before: dict, after: dict) -> dict:
+    return {key: after[key] - before.get(key, 0) for key in sorted(after) if after[key] != before.get(key, 0)}
+
+
+async def run_ingest(args) -> dict:
+    engine.sync_engine.echo = False
+    settings.weather_storage = args.storage
+    settings.weather_refresh_concurrency = args.concurrency
+    settings.nws_requests_per_second = args.client_rps
+
+    if args.url:
+        settings.nws_api_url = args.url.rstrip("/")
+        transport = None
+        stats_transport = None
+    else:
+        settings.nws_api_url = IN_PROCESS_URL
+        transport = httpx.ASGITransport(app=create_app(stub_config(args)))
+        stats_transport = transport
+
+    async with async_session_maker() as session:
+        await session.execute(delete(NwsGridpoint))
+        await session.commit()
+
+    runs = []
+    for run in range(args.runs):
+        before = await fetch_stub_stats(stats_transport, settings.nws_api_url)
+        stats = await run_weather_refresh(transport=transport, materialize=False)
+        upstream = stats_delta(before, await fetch_stub_stats(stats_transport, settings.nws_api_url))
+
+        duration_s = stats["duration_ms"] / 1000
+        result = {
+            "run": run + 1,
+            "duration_ms": stats["duration_ms"],
+            "trails": stats["trails"],
+            "trails_per_second": stats["trails_per_second"],
+            "rows_written": stats["rows_written"],
+            "rows_per_second": round(stats["rows_written"] / duration_s, 1) if duration_s else None,
+            "db_write_ms": stats["db_write_ms"],
+            "grid_cells": stats["grid_cells"],
+            "cells_updated": stats["cells_updated"],
+            "cells_unchanged": stats["cells_unchanged"],
+            "cells_failed": stats["cells_failed"],
+            "points_requests": stats["points_requests"],
+            "http_attempts": stats["http_attempts"],
+            "http_retries": stats["http_retries"],
+            "upstream": upstream
+        }
+        runs.append(result)
+        print(
+            f"run {result['run']}: {result['trails']} trails in {result['duration_ms']:.0f} ms, "
+            f"{result['rows_written']} rows ({result['rows_per_second']} rows/s), "
+            f"db writes {result['db_write_ms']:.0f} ms, "
+            f"cells {result['cells_updated']} updated / {result['cells_unchanged']} unchanged / "
+            f"{result['cells_failed']} failed, {result['http_attempts']} HTTP attempts "
+            f"({result['http_retries']} retries)"
+        )
+
+    await engine.dispose()
+    return {
+        "meta": {
+            "storage": args.storage,
+            "stub": args.url or stub_config(args).__dict__,
+            "concurrency": args.concurrency,
+            "client_rps": args.client_rps,
+            "python": platform.python_version(),
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        "runs": runs
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2)
+    parser.add_argument("--url", help="Use a stub already running here instead of an in-process one")
+    parser.add_argument("--storage", choices=["rows", "series"], default=settings.weather_storage)
+    parser.add_argument("--concurrency", type=int, default=settings.weather_refresh_concurrency)
+    parser.add_argument("--client-rps", type=float, default=1_000.0, help="Client-side rate limit")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-rps", type=float, help="Answer 429 above this many requests per second")
+    parser.add_argument("--update-minutes", type=float, default=60.0)
+    parser.add_argument("--fixture", help="Recorded forecastHourly JSON to replay for every cell")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--yes", action="store_true")
+    args = parser.parse_args()
+
+    if not args.yes:
+        sys.exit("Ingestion overwrites forecasts and drops cached gridpoints in DATABASE_URL; pass --yes to continue")
+
+    report = asyncio.run(run_ingest(args))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+A local stand-in for the Groq chat-completions endpoint.
+
+    uvicorn benchmarks.llm_stub:app --port 8200
+    GROQ_API_URL=http://localhost:8200/openai/v1/chat/completions python scripts/parse_reports.py reports.jsonl
+
+Answers single and batched trip-report prompts with plausible condition
+JSON derived from keywords in each report, after a configurable latency. Injected 500/503s
+and a tokens-per-minute budget enforced with 429s exercise the client's
+retries and rate limiting. Configure with LLM_STUB_* environment variables
+(LLM_STUB_LATENCY_MS, LLM_STUB_ERROR_RATE, LLM_STUB_TOKENS_PER_MINUTE), or
+an LLMStubConfig in-process. GET /stats returns request counts by status.
+"""
+import asyncio
+import json
+import os
+import random
+from collections import Counter
+from dataclasses import dataclass, fields
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.utils.rate_limit import TokenBucket
+
+
+KEYWORD_STATUS = (("closed", "closed"), ("snow", "snowy"), ("ice", "icy"), ("icy", "icy"), ("mud", "muddy"))
+
+
+@dataclass
+class LLMStubConfig:
+    latency_ms: float = 400.0
+    latency_jitter_ms: float = 150.0
+    # Fraction of requests answered with a 500 or 503
+    error_rate: float = 0.0
+    # Token budget per minute, counted from the prompt and max_tokens; None for no limit
+    tokens_per_minute: Optional[float] = None
+
+    @classmethod
+    def from_env(cls) -> "LLMStubConfig":
+        values = {}
+        for field in fields(cls):
+            raw = os.environ.get(f"LLM_STUB_{field.name.upper()}")
+            if raw is not None:
+                values[field.name] = float(raw)
+        return cls(**values)
+
+
+def reports_from_prompt(prompt: str) -> list[str]:
+    """Report texts between the prompt's triple quotes, one for a single-report prompt"""
+    parts = prompt.split('"""')
+    return [part.strip() for part in parts[1::2]] if len(parts) >= 3 else [prompt]
+
+
+def fake_parse(report: str) -> dict:
+    """Condition JSON for a report, keyed off a few words so results vary realistically"""
+    text = report.lower()
+    status = next((status for keyword, status in KEYWORD_STATUS if keyword in text), "clear")
+    return {
+        "report_date": None,
+        "snow_level_ft": 11000 if status == "snowy" else None,
+        "trail_status": status,
+        "mud_level": "moderate" if status == "muddy" else None,
+        "water_crossing_status": None,
+        "hazards": ["ice"] if status == "icy" else [],
+        "required_gear": ["microspikes"] if status in ("icy", "snowy") else [],
+        "difficulty_sentiment": None,
+        "overall_sentiment": "negative" if status == "closed" else "positive",
+        "confidence": 0.3 if len(text) < 40 else 0.8
+    }
+
+
+def create_app(config: LLMStubConfig) -> FastAPI:
+    stub = FastAPI(title="Chat-completions stand-in")
+    stats: Counter = Counter()
+    bucket = TokenBucket(config.tokens_per_minute / 60, config.tokens_per_minute) if config.tokens_per_minute else None
+
+    @stub.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        prompt_tokens = len(prompt) // 4
+        stats["requests"] += 1
+        await asyncio.sleep(max(0.0, random.gauss(config.latency_ms, config.latency_jitter_ms)) / 1000)
+
+        if bucket is not None and not bucket.try_acquire(min(prompt_tokens + body.get("max_tokens", 0), bucket.capacity)):
+            stats["429"] += 1
+            return JSONResponse({"error": {"message": "Rate limit reached"}}, status_code=429, headers={"Retry-After": "2"})
+        if random.random() < config.error_rate:
+            status = random.choice([500, 503])
+            stats[str(status)] += 1
+            return JSONResponse({"error": {"message": "Internal error"}}, status_code=status)
+
+        reports = reports_from_prompt(prompt)
+        if "JSON array" in prompt:
+            content = json.dumps([{"index": i, **fake_parse(report)} for i, report in enumerate(reports)])
+        else:
+            content = json.dumps(fake_parse(reports[0]))
+        completion_tokens = len(content) // 4
+        stats["200"] += 1
+        return {
+            "id": f"chatcmpl-stub-{stats['requests']}",
+            "object": "chat.completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    @stub.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return stub
+
+
+app = create_app(LLMStubConfig.from_env())
@@ -0,0 +1,211 @@
+"""
+A local stand-in for the NWS API, for load-testing weather ingestion offline.
+
+    uvicorn benchmarks.nws_stub:app --port 8100
+
+serves /points/{lat},{lon} and the forecastHourly URLs it hands out, with
+forecasts generated per grid cell or replayed from a recorded
+forecastHourly response. Latency, error rate, the upstream rate limit and
+how often forecasts change (and so how often conditional requests get a
+304) are configurable through NWS_STUB_* environment variables, or a
+StubConfig when benchmarks.ingest runs the stub in-process. GET /stats
+returns request counts by route and status.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+from app.utils.rate_limit import TokenBucket
+from benchmarks.synthetic import SUMMARIES
+
+
+GRID_ID = "STB"
+# Trailheads are reported at a fixed Mountain offset, like the real Colorado offices
+UTC_OFFSET = timezone(timedelta(hours=-6))
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0
+    latency_jitter_ms: float = 20.0
+    # Fraction of requests answered with a 500 or 503
+    error_rate: float = 0.0
+    # Requests per second the stub accepts before answering 429; None for no limit
+    requests_per_second: Optional[float] = None
+    # How often each cell's forecast changes; conditional requests in between get a 304
+    update_minutes: float = 60.0
+    # Grid cell size; NWS cells are 2.5 km, about 0.025 degrees
+    cell_degrees: float = 0.025
+    hours: int = 156
+    # Recorded forecastHourly response to replay for every cell instead of synthetic data
+    fixture: Optional[str] = None
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> "StubConfig":
+        values = {}
+        for field in fields(cls):
+            raw = os.environ.get(f"NWS_STUB_{field.name.upper()}")
+            if raw is None:
+                continue
+            if field.name == "fixture":
+                values[field.name] = raw
+            elif field.name in ("hours", "seed"):
+                values[field.name] = int(raw)
+            else:
+                values[field.name] = float(raw)
+        return cls(**values)
+
+
+def _cell_phase(x: int, y: int, update_seconds: float) -> float:
+    """Stagger updates across cells, as real forecasts aren't all issued at once"""
+    digest = hashlib.blake2b(f"{x},{y}".encode(), digest_size=4).digest()
+    return int.from_bytes(digest, "big") / 2 ** 32 * update_seconds
+
+
+def _current_hour() -> datetime:
+    return datetime.now(UTC_OFFSET).replace(minute=0, second=0, microsecond=0)
+
+
+def synthetic_periods(config: StubConfig, x: int, y: int, generation: int) -> list[dict]:
+    """An hourly forecast for one cell, reproducible for a given cell and generation"""
+    rng = np.random.default_rng([config.seed, x, y, generation])
+    start = _current_hour()
+    base_temp = rng.integers(10, 80)
+    temperature = base_temp + np.round(12 * np.sin(np.arange(config.hours) * np.pi / 12)).astype(int)
+    precipitation = rng.integers(0, 101, size=config.hours)
+    wind = rng.integers(0, 40, size=config.hours)
+    summaries = rng.choice(SUMMARIES, size=config.hours)
+
+    return [
+        {
+            "number": i + 1,
+            "startTime": (start + timedelta(hours=i)).isoformat(),
+            "endTime": (start + timedelta(hours=i + 1)).isoformat(),
+            "isDaytime": 6 <= (start + timedelta(hours=i)).hour < 18,
+            "temperature": int(temperature[i]),
+            "temperatureUnit": "F",
+            "probabilityOfPrecipitation": {"unitCode": "wmoUnit:percent", "value": int(precipitation[i])},
+            "windSpeed": f"{int(wind[i])} mph",
+            "windDirection": "W",
+            "shortForecast": str(summaries[i])
+        }
+        for i in range(config.hours)
+    ]
+
+
+def replay_periods(recorded: list[dict]) -> list[dict]:
+    """Recorded periods shifted so the first starts this hour, keeping their spacing"""
+    if not recorded:
+        return []
+    first = datetime.fromisoformat(recorded[0]["startTime"])
+    shift = _current_hour() - first.astimezone(UTC_OFFSET)
+    periods = []
+    for period in recorded:
+        period = dict(period)
+        for key in ("startTime", "endTime"):
+            if period.get(key):
+                period[key] = (datetime.fromisoformat(period[key]) + shift).isoformat()
+        periods.append(period)
+    return periods
+
+
+def create_app(config: StubConfig) -> FastAPI:
+    stub = FastAPI(title="NWS stand-in")
+    stats: Counter = Counter()
+    bucket = TokenBucket(config.requests_per_second, config.requests_per_second) if config.requests_per_second else None
+    update_seconds = config.update_minutes * 60
+    recorded = None
+    if config.fixture:
+        recorded = json.loads(Path(config.fixture).read_text()).get("properties", {}).get("periods", [])
+
+    async def upstream_behaviour(route: str) -> Optional[Response]:
+        """Latency, rate limiting and injected errors shared by every route"""
+        stats[f"{route} requests"] += 1
+        await asyncio.sleep(max(0.0, random.gauss(config.latency_ms, config.latency_jitter_ms)) / 1000)
+
+        if bucket is not None and not bucket.try_acquire():
+            stats[f"{route} 429"] += 1
+            return JSONResponse({"title": "Too Many Requests"}, status_code=429, headers={"Retry-After": "1"})
+        if random.random() < config.error_rate:
+            status = random.choice([500, 503])
+            stats[f"{route} {status}"] += 1
+            return JSONResponse({"title": "Unexpected Problem"}, status_code=status)
+        return None
+
+    @stub.get("/points/{coordinates}")
+    async def points(coordinates: str, request: Request):
+        error = await upstream_behaviour("points")
+        if error is not None:
+            return error
+
+        try:
+            lat, lon = (float(part) for part in coordinates.split(","))
+        except ValueError:
+            stats["points 404"] += 1
+            return JSONResponse({"title": "Invalid Parameter"}, status_code=404)
+
+        x = int((lon + 180) // config.cell_degrees)
+        y = int((lat + 90) // config.cell_degrees)
+        base_url = str(request.base_url).rstrip("/")
+        stats["points 200"] += 1
+        return {
+            "properties": {
+                "gridId": GRID_ID,
+                "gridX": x,
+                "gridY": y,
+                "forecastHourly": f"{base_url}/gridpoints/{GRID_ID}/{x},{y}/forecast/hourly"
+            }
+        }
+
+    @stub.get("/gridpoints/{grid_id}/{cell}/forecast/hourly")
+    async def forecast_hourly(grid_id: str, cell: str, request: Request):
+        error = await upstream_behaviour("forecast")
+        if error is not None:
+            return error
+
+        x, y = (int(part) for part in cell.split(","))
+        now = time.time()
+        phase = _cell_phase(x, y, update_seconds)
+        generation = int((now + phase) // update_seconds)
+        issued = datetime.fromtimestamp(generation * update_seconds - phase, timezone.utc).replace(microsecond=0)
+        etag = f'"{grid_id}-{x}-{y}-{generation}"'
+        validators = {"ETag": etag, "Last-Modified": format_datetime(issued, usegmt=True)}
+
+        if request.headers.get("If-None-Match") == etag:
+            stats["forecast 304"] += 1
+            return Response(status_code=304, headers=validators)
+        since = request.headers.get("If-Modified-Since")
+        if since and "If-None-Match" not in request.headers:
+            try:
+                if parsedate_to_datetime(since) >= issued:
+                    stats["forecast 304"] += 1
+                    return Response(status_code=304, headers=validators)
+            except (TypeError, ValueError):
+                pass
+
+        periods = replay_periods(recorded) if recorded is not None else synthetic_periods(config, x, y, generation)
+        stats["forecast 200"] += 1
+        return JSONResponse({"properties": {"periods": periods}}, headers=validators)
+
+    @stub.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    stub.state.stats = stats
+    return stub
+
+
+app = create_app(StubConfig.from_env())
@@ -0,0 +1,367 @@
+"""
+Benchmarks for the decision engine and the recommendation pipeline.
+
+    python -m benchmarks.run run --scale 10k --output results.json
+    python -m benchmarks.run seed --scale 10k --yes
+    python -m benchmarks.run run --scale 10k --db --output results.json
+    python -m benchmarks.run compare base.json results.json
+
+All data comes from the seeded generators in benchmarks.synthetic, so two
+runs at the same scale and seed time the same work. In-memory cases need no
+database. --db adds cases against DATABASE_URL, which must have been seeded
+at the same scale and seed first. Seeding truncates the trails table and
+everything that references it.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Optional
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import insert, text
+
+from app.database import engine, async_session_maker
+from app.models.trail import Trail
+from app.models.weather import WeatherForecast
+from app.models.condition import TrailCondition
+from app.services.decision_engine import apply_hard_rules, generate_breakdown, evaluate, trail_rule_input
+from app.services.forecast_series import summit_weather
+from app.services.recommendation_cache import recommendation_cache
+from app.services.recommendation_service import (
+    haversine_distance,
+    find_candidates,
+    score_candidates,
+    select_diverse,
+    build_results,
+    get_recommendations
+)
+from app.services.scoring_engine import ConditionColumns, WeatherColumns, hard_rule_confidence
+from app.services.trail_catalog import TrailCatalog, TrailRecord, load_catalog, bump_catalog_version
+from app.services.weather_daily import rebuild_daily_from_rows
+from benchmarks.synthetic import SCALES, make_trails, make_profiles, make_forecasts, make_conditions
+
+
+# Per-call cases loop over at most this many trails per round
+SAMPLE_SIZE = 5_000
+PROFILE_COUNT = 100
+INSERT_CHUNK = 5_000
+# A median this much slower than the baseline counts as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+class Case:
+    """A named piece of work timed as a whole, reporting time per item processed"""
+
+    def __init__(self, name: str, run: Callable, items: int = 1, is_async: bool = False):
+        self.name = name
+        self.run = run
+        self.items = items
+        self.is_async = is_async
+
+
+def summarize(timings: list[float], items: int) -> dict:
+    median = statistics.median(timings)
+    return {
+        "rounds": len(timings),
+        "items": items,
+        "min": min(timings),
+        "max": max(timings),
+        "mean": statistics.fmean(timings),
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "median": median,
+        "per_item_us": median / items * 1e6,
+        "ops": items / median if median else None
+    }
+
+
+async def time_case(case: Case, rounds: int, warmup: int) -> dict:
+    timings = []
+    for i in range(warmup + rounds):
+        started = time.perf_counter()
+        if case.is_async:
+            await case.run()
+        else:
+            case.run()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            timings.append(elapsed)
+    return summarize(timings, case.items)
+
+
+def weather_by_trail(trails: list[dict], today: date, seed: int) -> dict[str, dict]:
+    """One summit forecast per trail, as get_latest_weather_bulk returns them"""
+    weather = {}
+    for trail, row in zip(trails, make_forecasts(trails, today, days=1, hours=1, seed=seed)):
+        summit = summit_weather(SimpleNamespace(**trail), {key: row[key] for key in (
+            "temperature_f", "precipitation_prob", "precipitation_type",
+            "wind_speed_mph", "wind_gust_mph", "sky_cover", "weather_summary"
+        )})
+        if summit:
+            weather[str(trail["id"])] = summit
+    return weather
+
+
+def conditions_by_trail(conditions: list[dict]) -> dict[str, dict]:
+    return {str(c["trail_id"]): c for c in conditions}
+
+
+def memory_cases(scale: int, seed: int) -> list[Case]:
+    today = date.today()
+    trails = make_trails(scale, seed)
+    profiles = make_profiles(PROFILE_COUNT, seed)
+    weather = weather_by_trail(trails, today, seed)
+    conditions = conditions_by_trail(make_conditions(trails, today, seed=seed))
+    records = [TrailRecord.from_model(SimpleNamespace(**t)) for t in trails]
+    catalog = TrailCatalog(records, version=1)
+
+    sample = records[:SAMPLE_SIZE]
+    inputs = [
+        (trail_rule_input(r), profiles[i % PROFILE_COUNT], weather.get(str(r.id)), conditions.get(str(r.id)))
+        for i, r in enumerate(sample)
+    ]
+    profile = profiles[0]
+    gear = profile["gear_inventory"]
+    user_lat, user_lon = profile["location"]["lat"], profile["location"]["lon"]
+    constraints = {
+        "date": today.isoformat(),
+        "max_distance": 15,
+        "max_elevation_gain": 4000,
+        "max_drive_time_minutes": 120,
+        "terrain_preferences": ["alpine"],
+        "desired_features": ["lake", "summit"],
+        "avoid": ["crowds"],
+        "limit": 5,
+        "diversity": 0.2
+    }
+
+    def run_apply_hard_rules():
+        for trail, user_profile, w, c in inputs:
+            apply_hard_rules(trail, user_profile, w, c, gear)
+
+    def run_generate_breakdown():
+        for trail, user_profile, w, c in inputs:
+            generate_breakdown(trail, user_profile, w, c, gear, 100, [])
+
+    def run_evaluate():
+        for trail, user_profile, w, c in inputs:
+            evaluate(trail, user_profile, w, c, gear)
+
+    def run_haversine():
+        for r in sample:
+            haversine_distance(user_lat, user_lon, r.trailhead_lat, r.trailhead_lon)
+
+    all_rows = np.arange(catalog.matrix.size)
+    weather_columns = WeatherColumns.from_dicts(catalog.matrix, weather)
+    condition_columns = ConditionColumns.from_dicts(catalog.matrix, conditions)
+
+    def run_hard_rule_confidence():
+        hard_rule_confidence(catalog.matrix, all_rows, profile, gear, weather_columns, condition_columns)
+
+    def run_catalog_build():
+        TrailCatalog(records, version=1)
+
+    def run_pipeline():
+        rows, drive_distances = find_candidates(catalog, profile, constraints)
+        pool = score_candidates(catalog.matrix, rows, profile, constraints, weather_columns, condition_columns)
+        picks = select_diverse(catalog.matrix, rows, pool, constraints)
+        build_results(catalog.matrix, rows, drive_distances, picks, profile, constraints, weather, conditions)
+
+    return [
+        Case("decision_engine.apply_hard_rules", run_apply_hard_rules, items=len(inputs)),
+        Case("decision_engine.generate_breakdown", run_generate_breakdown, items=len(inputs)),
+        Case("decision_engine.evaluate", run_evaluate, items=len(inputs)),
+        Case("recommendation_service.haversine_distance", run_haversine, items=len(sample)),
+        Case("scoring_engine.hard_rule_confidence", run_hard_rule_confidence, items=scale),
+        Case("trail_catalog.build", run_catalog_build, items=scale),
+        Case("recommendation_service.pipeline_in_memory", run_pipeline)
+    ]
+
+
+def db_cases(scale: int, seed: int) -> list[Case]:
+    profiles = make_profiles(PROFILE_COUNT, seed)
+    constraints = {
+        "date": date.today().isoformat(),
+        "max_distance": 15,
+        "max_elevation_gain": 4000,
+        "max_drive_time_minutes": 120,
+        "limit": 5,
+        "diversity": 0.2
+    }
+    calls = {"n": 0}
+
+    async def run_load_catalog():
+        async with async_session_maker() as session:
+            await load_catalog(session)
+
+    async def run_get_recommendations():
+        # A different profile each round and an empty cache, so every call does the full work
+        recommendation_cache.clear()
+        profile = profiles[calls["n"] % PROFILE_COUNT]
+        calls["n"] += 1
+        async with async_session_maker() as session:
+            await get_recommendations(profile, constraints, session)
+
+    return [
+        Case("trail_catalog.load_catalog", run_load_catalog, items=scale, is_async=True),
+        Case("recommendation_service.get_recommendations", run_get_recommendations, is_async=True)
+    ]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmarks(args) -> dict:
+    scale = SCALES[args.scale]
+    cases = memory_cases(scale, args.seed)
+    if args.db:
+        engine.sync_engine.echo = False
+        async with async_session_maker() as session:
+            await load_catalog(session)
+        cases += db_cases(scale, args.seed)
+
+    results = {}
+    for case in cases:
+        if args.only and not any(pattern in case.name for pattern in args.only):
+            continue
+        results[case.name] = await time_case(case, args.rounds, args.warmup)
+        print(f"{case.name:48s} median {results[case.name]['median'] * 1000:10.3f} ms  "
+              f"{results[case.name]['per_item_us']:10.3f} us/item")
+
+    if args.db:
+        await engine.dispose()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "scale": args.scale,
+            "seed": args.seed,
+            "rounds": args.rounds,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": datetime.utcnow().isoformat()
+        },
+        "results": results
+    }
+
+
+async def seed(args) -> None:
+    """Replace the database's trails, forecasts and conditions with a synthetic set"""
+    if not args.yes:
+        sys.exit("Seeding truncates trails and every table referencing it; pass --yes to continue")
+
+    engine.sync_engine.echo = False
+    today = date.today()
+    trails = make_trails(SCALES[args.scale], args.seed)
+
+    async with async_session_maker() as session:
+        await session.execute(text("TRUNCATE trails CASCADE"))
+
+        for start in range(0, len(trails), INSERT_CHUNK):
+            await session.execute(insert(Trail), trails[start:start + INSERT_CHUNK])
+
+        chunk = []
+        for row in make_forecasts(trails, today, days=args.forecast_days, hours=args.forecast_hours, seed=args.seed):
+            chunk.append(row)
+            if len(chunk) == INSERT_CHUNK:
+                await session.execute(insert(WeatherForecast), chunk)
+                chunk = []
+        if chunk:
+            await session.execute(insert(WeatherForecast), chunk)
+        await rebuild_daily_from_rows(session)
+
+        conditions = make_conditions(trails, today, seed=args.seed)
+        for start in range(0, len(conditions), INSERT_CHUNK):
+            await session.execute(insert(TrailCondition), conditions[start:start + INSERT_CHUNK])
+
+        await bump_catalog_version(session)
+        await session.commit()
+
+    await engine.dispose()
+    print(f"Seeded {len(trails)} trails and {len(conditions)} condition reports")
+
+
+def compare(args) -> int:
+    """Print per-case changes between two result files. Returns 1 if anything regressed."""
+    base = json.loads(Path(args.base).read_text())
+    new = json.loads(Path(args.new).read_text())
+
+    if base["meta"]["scale"] != new["meta"]["scale"] or base["meta"]["seed"] != new["meta"]["seed"]:
+        print("Warning: results were recorded at different scales or seeds")
+
+    regressions = []
+    for name, result in new["results"].items():
+        if name not in base["results"]:
+            print(f"{name:48s} {'new':>10s}")
+            continue
+        ratio = result["median"] / base["results"][name]["median"]
+        if ratio > 1 + args.threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 - args.threshold:
+            status = "improved"
+        else:
+            status = ""
+        print(f"{name:48s} {ratio:9.2f}x {status}")
+
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Time every case and write JSON results")
+    run_parser.add_argument("--scale", choices=SCALES, default="10k")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--rounds", type=int, default=10)
+    run_parser.add_argument("--warmup", type=int, default=2)
+    run_parser.add_argument("--db", action="store_true", help="Include cases against DATABASE_URL")
+    run_parser.add_argument("--only", nargs="*", help="Only run cases whose name contains one of these")
+    run_parser.add_argument("--output", help="Write results JSON here")
+
+    seed_parser = commands.add_parser("seed", help="Load a synthetic data set into DATABASE_URL")
+    seed_parser.add_argument("--scale", choices=SCALES, default="10k")
+    seed_parser.add_argument("--seed", type=int, default=0)
+    seed_parser.add_argument("--forecast-days", type=int, default=1)
+    seed_parser.add_argument("--forecast-hours", type=int, default=24)
+    seed_parser.add_argument("--yes", action="store_true")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = asyncio.run(run_benchmarks(args))
+        if args.output:
+            Path(args.output).write_text(json.dumps(report, indent=2))
+    elif args.command == "seed":
+        asyncio.run(seed(args))
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
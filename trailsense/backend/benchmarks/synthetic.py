@@ -0,0 +1,164 @@
+import uuid
+from datetime import date, timedelta
+import numpy as np
+
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+REGIONS = ["Front Range", "Sawatch Range", "San Juan Mountains", "Elk Mountains", "Gore Range", "Tenmile Range"]
+DIFFICULTIES = ["easy", "moderate", "hard", "expert"]
+TRAIL_TYPES = ["out-and-back", "loop", "point-to-point"]
+TERRAIN = ["forest", "alpine", "tundra", "talus", "scree", "meadow", "ridge", "canyon"]
+FEATURES = ["summit", "lake", "waterfall", "views", "wildflowers", "fourteener", "wildlife", "hot_springs"]
+GEAR = ["microspikes", "ice_axe", "helmet", "trekking_poles", "water_filter"]
+SUMMARIES = ["Sunny", "Mostly Sunny", "Partly Cloudy", "Mostly Cloudy", "Chance Showers", "Chance Thunderstorms", "Snow Showers"]
+TRAIL_STATUSES = ["clear", "muddy", "icy", "snowy", "closed"]
+
+# Trailheads are spread over roughly the state of Colorado
+LAT_RANGE = (37.0, 41.0)
+LON_RANGE = (-109.0, -102.0)
+
+
+def _pick_tags(rng: np.random.Generator, vocab: list[str], n: int, max_tags: int) -> list[list[str]]:
+    counts = rng.integers(0, max_tags + 1, size=n)
+    return [[str(tag) for tag in rng.choice(vocab, size=c, replace=False)] for c in counts]
+
+
+def _uuids(rng: np.random.Generator, n: int) -> list[uuid.UUID]:
+    raw = rng.integers(0, 256, size=(n, 16), dtype=np.uint8)
+    return [uuid.UUID(bytes=row.tobytes(), version=4) for row in raw]
+
+
+def make_trails(n: int, seed: int = 0) -> list[dict]:
+    """Trail rows with every Trail column the catalog loads, reproducible for a given seed"""
+    rng = np.random.default_rng(seed)
+
+    ids = _uuids(rng, n)
+    lat = np.round(rng.uniform(*LAT_RANGE, size=n), 6)
+    lon = np.round(rng.uniform(*LON_RANGE, size=n), 6)
+    trailhead_elevation = rng.integers(5000, 11000, size=n)
+    gain = rng.integers(200, 5500, size=n)
+    distance = np.round(rng.gamma(2.5, 2.5, size=n).clip(0.5, 40), 2)
+    technical = rng.choice([1, 1, 1, 2, 2, 3, 4], size=n)
+    exposure = rng.integers(1, 6, size=n)
+    crowd = rng.integers(1, 6, size=n)
+    difficulty = rng.choice(DIFFICULTIES, size=n)
+    region = rng.choice(REGIONS, size=n)
+    trail_type = rng.choice(TRAIL_TYPES, size=n)
+    dogs = rng.random(size=n) < 0.7
+    fee = rng.random(size=n) < 0.2
+    terrain = _pick_tags(rng, TERRAIN, n, 3)
+    features = _pick_tags(rng, FEATURES, n, 3)
+    gear = _pick_tags(rng, GEAR[:2], n, 1)
+
+    return [
+        {
+            "id": ids[i],
+            "name": f"Synthetic Trail {i:07d}",
+            "region": str(region[i]),
+            "trailhead_lat": float(lat[i]),
+            "trailhead_lon": float(lon[i]),
+            "trailhead_elevation": int(trailhead_elevation[i]),
+            "highest_point_elevation": int(trailhead_elevation[i] + gain[i]),
+            "distance_miles": float(distance[i]),
+            "elevation_gain_ft": int(gain[i]),
+            "trail_type": str(trail_type[i]),
+            "difficulty": str(difficulty[i]),
+            "technical_class": int(technical[i]),
+            "exposure_level": int(exposure[i]),
+            "terrain_types": terrain[i],
+            "features": features[i],
+            "typical_crowd_level": int(crowd[i]),
+            "dogs_allowed": bool(dogs[i]),
+            "fee_required": bool(fee[i]),
+            "best_months": [6, 7, 8, 9],
+            "estimated_time_hours": None,
+            "route_description": None,
+            "required_gear": gear[i],
+            "photos": []
+        }
+        for i in range(n)
+    ]
+
+
+def make_profiles(n: int, seed: int = 0) -> list[dict]:
+    """User profiles in the shape onboarding stores in users.profile"""
+    rng = np.random.default_rng(seed + 1)
+
+    paces = rng.choice(["slow", "moderate", "fast"], size=n)
+    max_hours = rng.integers(3, 13, size=n)
+    max_gain = rng.integers(1000, 6000, size=n)
+    exposure_comfort = rng.integers(1, 6, size=n)
+    scrambling = rng.random(size=n) < 0.4
+    cold = rng.integers(1, 6, size=n)
+    lat = rng.uniform(39.0, 40.5, size=n)
+    lon = rng.uniform(-106.0, -104.8, size=n)
+    gear = _pick_tags(rng, GEAR, n, 4)
+
+    return [
+        {
+            "fitness": {"pace": str(paces[i]), "max_hours": int(max_hours[i]), "max_elevation_gain": int(max_gain[i])},
+            "technical": {"exposure_comfort": int(exposure_comfort[i]), "scrambling_comfort": bool(scrambling[i])},
+            "personal": {"cold_tolerance": int(cold[i])},
+            "location": {"lat": float(lat[i]), "lon": float(lon[i])},
+            "gear_inventory": gear[i]
+        }
+        for i in range(n)
+    ]
+
+
+def make_forecasts(trails: list[dict], start: date, days: int = 1, hours: int = 24, seed: int = 0):
+    """
+    Yield hourly trailhead forecast rows for every trail.
+
+    A generator, since 1M trails x 24 hours doesn't fit comfortably in memory.
+    """
+    rng = np.random.default_rng(seed + 2)
+
+    for trail in trails:
+        for offset in range(days):
+            forecast_date = start + timedelta(days=offset)
+            base_temp = rng.integers(10, 80)
+            temperature = base_temp + rng.integers(-5, 15, size=hours)
+            precipitation = rng.integers(0, 101, size=hours)
+            wind = rng.integers(0, 40, size=hours)
+            summaries = rng.choice(SUMMARIES, size=hours)
+
+            for hour in range(hours):
+                yield {
+                    "trail_id": trail["id"],
+                    "location_type": "trailhead",
+                    "forecast_date": forecast_date,
+                    "forecast_hour": hour,
+                    "temperature_f": int(temperature[hour]),
+                    "precipitation_prob": int(precipitation[hour]),
+                    "precipitation_type": None,
+                    "wind_speed_mph": int(wind[hour]),
+                    "wind_gust_mph": int(wind[hour] * 1.5),
+                    "sky_cover": None,
+                    "weather_summary": str(summaries[hour])
+                }
+
+
+def make_conditions(trails: list[dict], today: date, fraction: float = 0.3, seed: int = 0) -> list[dict]:
+    """One recent condition report for a random fraction of trails"""
+    rng = np.random.default_rng(seed + 3)
+    reported = np.flatnonzero(rng.random(size=len(trails)) < fraction)
+    statuses = rng.choice(TRAIL_STATUSES, size=len(reported), p=[0.6, 0.15, 0.1, 0.1, 0.05])
+    ages = rng.integers(0, 14, size=len(reported))
+    ids = _uuids(rng, len(reported))
+
+    return [
+        {
+            "id": condition_id,
+            "trail_id": trails[row]["id"],
+            "report_date": today - timedelta(days=int(age)),
+            "snow_level_ft": 11000 if status == "snowy" else None,
+            "trail_status": str(status),
+            "hazards": [],
+            "required_gear": ["microspikes"] if status == "icy" else [],
+            "source": "synthetic"
+        }
+        for condition_id, row, status, age in zip(ids, reported, statuses, ages)
+    ]
+
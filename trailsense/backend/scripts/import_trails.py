@@ -8,6 +8,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import async_session_maker
 from app.models.trail import Trail
+from app.services.trail_catalog import bump_catalog_version
 
 
 async def import_trails_from_csv(csv_path: str):
@@ -49,8 +50,10 @@ async def import_trails_from_csv(csv_path: str):
                 session.add(trail)
                 print(f"Added trail: {trail.name}")
 
+            version = await bump_catalog_version(session)
             await session.commit()
-            print(f"\nSuccessfully imported trails from {csv_path}")
+            print(f"\nTrail catalog is now at version {version}")
+            print(f"Successfully imported trails from {csv_path}")
 
 
 if __name__ == "__main__":
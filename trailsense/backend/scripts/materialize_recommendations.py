@@ -0,0 +1,23 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import async_session_maker
+from app.services.recommendation_materializer import materialize_recommendations
+
+
+async def main():
+    """Precompute recommendation lists for active users. Run nightly or after a forecast refresh."""
+    async with async_session_maker() as session:
+        stats = await materialize_recommendations(session)
+
+    print(
+        f"Materialized {stats['lists_written']} lists for {stats['users']} users "
+        f"across {stats['dates']} days in {stats['duration_ms']} ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import async_session_maker
+from app.services.llm_service import get_llm_client, close_llm_client
+from app.services.parse_cache import evict_parse_cache
+from app.services.scraper_service import process_report_backlog
+
+# Reports parsed and committed together, so an interrupted run keeps its progress
+CHUNK = 1_000
+
+
+async def main(path: str):
+    """Parse a backlog of trip reports, one {"trail_id": ..., "text": ...} JSON object per line."""
+    with open(path) as f:
+        reports = [(item["trail_id"], item["text"]) for item in map(json.loads, f) if item.get("text")]
+
+    started = time.perf_counter()
+    stored = 0
+    client = get_llm_client()
+    for start in range(0, len(reports), CHUNK):
+        async with async_session_maker() as session:
+            stored += await process_report_backlog(reports[start:start + CHUNK], session, client=client)
+        print(f"{min(start + CHUNK, len(reports))}/{len(reports)} reports parsed, {stored} conditions stored")
+
+    # Trim the parse cache once for the whole run rather than after every chunk
+    async with async_session_maker() as session:
+        evicted = await evict_parse_cache(session)
+        await session.commit()
+
+    stats = client.stats()
+    await close_llm_client()
+    duration = time.perf_counter() - started
+    print(
+        f"Parsed {len(reports)} reports in {duration:.1f}s ({len(reports) / duration:.1f}/s): "
+        f"{stats['requests']} LLM requests ({stats['batch_requests']} batched, {stats['fallbacks']} fallbacks, "
+        f"{stats['failures']} failed, {stats['http_retries']} retries), "
+        f"{stats['tokens_used']} tokens, {evicted} cached parses evicted"
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("usage: python scripts/parse_reports.py reports.jsonl")
+    asyncio.run(main(sys.argv[1]))
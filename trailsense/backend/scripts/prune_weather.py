@@ -0,0 +1,21 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.database import async_session_maker
+from app.services.weather_service import prune_past_forecasts
+
+
+async def main():
+    """Delete forecasts for past dates. Run daily."""
+    async with async_session_maker() as session:
+        deleted = await prune_past_forecasts(session)
+        await session.commit()
+
+    print(f"Deleted {deleted} past forecast rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,30 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.weather_refresh import run_weather_refresh
+
+
+async def main():
+    """Refresh forecasts for every trail in the catalog, one NWS request per grid cell."""
+    stats = await run_weather_refresh()
+
+    print(
+        f"Updated {stats['trails_updated']}/{stats['trails']} trails in {stats['duration_ms']} ms "
+        f"({stats['trails_per_second']} trails/s)"
+    )
+    print(
+        f"Grid cells: {stats['cells_updated']} updated, {stats['cells_unchanged']} unchanged, "
+        f"{stats['cells_failed']} failed; {stats['points_requests']} points lookups, "
+        f"{stats['http_attempts']} HTTP attempts, {stats['http_retries']} retries"
+    )
+    print(
+        f"Staleness: max {stats['max_staleness_minutes']} min, "
+        f"{stats['never_refreshed']} trails never refreshed"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,9 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# app.config requires these; nothing under tests/ connects to the database
+os.environ.setdefault("DATABASE_URL", "postgresql://localhost/trailsense_test")
+os.environ.setdefault("SECRET_KEY", "test")
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+import numpy as np
+
+from app.services.start_time_optimizer import SERIES_HOURS, HourlySeries, optimize_start_time
+
+
+EXPOSED_TRAIL = {
+    "distance_miles": 6.0,
+    "elevation_gain_ft": 2000,
+    "exposure_level": 4,
+    "technical_class": 2,
+    "required_gear": []
+}
+USER_PROFILE = {
+    "fitness": {"pace": "moderate", "max_hours": 8, "max_elevation_gain": 5000},
+    "technical": {"exposure_comfort": 5, "scrambling_comfort": True},
+    "personal": {"cold_tolerance": 3}
+}
+
+
+def calm_series(gust_hours: range = range(0), gust_mph: float = 0) -> HourlySeries:
+    """Clear, mild weather for every hour, with `gust_mph` gusts over `gust_hours`"""
+    gust = np.zeros(SERIES_HOURS)
+    gust[gust_hours.start:gust_hours.stop] = gust_mph
+    return HourlySeries(
+        present=np.ones(SERIES_HOURS, dtype=bool),
+        temperature=np.full(SERIES_HOURS, 55.0),
+        precipitation=np.zeros(SERIES_HOURS),
+        gust=gust,
+        thunder=np.zeros(SERIES_HOURS, dtype=bool),
+        summary_codes=np.zeros(SERIES_HOURS, dtype=np.int16),
+        summaries=["Sunny"]
+    )
+
+
+def test_gusty_window_on_exposed_terrain_loses_to_calm_one():
+    forecast_date = date(2026, 7, 1)
+    # Gales through the morning; the afternoon is calm
+    series = calm_series(range(0, 12), 55)
+
+    result = optimize_start_time(
+        EXPOSED_TRAIL, USER_PROFILE, None, [], series, forecast_date,
+        now=datetime(2026, 6, 30, 12)
+    )
+
+    assert result is not None
+    assert result["start_hour"] >= 12
+    curve = {point["hour"]: point["confidence"] for point in result["curve"]}
+    assert curve[4] <= 50
+    assert curve[4] < result["confidence"]
+
+
+def test_gusts_do_not_cap_unexposed_trails():
+    forecast_date = date(2026, 7, 1)
+    sheltered = {**EXPOSED_TRAIL, "exposure_level": 1}
+
+    result = optimize_start_time(
+        sheltered, USER_PROFILE, None, [], calm_series(range(0, 12), 55), forecast_date,
+        now=datetime(2026, 6, 30, 12)
+    )
+
+    assert result is not None
+    assert result["start_hour"] == 4